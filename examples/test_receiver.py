@@ -5,6 +5,10 @@ import os
 
 sys.path.append("./library")
 from sx127x import LoRa
+from link_stats import LinkStats
+from delta_codec import decode_frame, is_frame
+from log_writer import LogWriter
+from capture import CaptureWriter
 
 try:
     import ujson as json
@@ -19,6 +23,19 @@ LORA_CS_PIN = 18  # Pin Chip Select (CS/NSS)
 LORA_RST_PIN = 14  # Pin de Reset del módulo
 LORA_DIO0_PIN = 26  # Pin de interrupción DIO0
 
+FORWARD_SERIAL = True  # Reenviar cada registro por USB serie al host
+STATS_INTERVAL_S = 10  # Cada cuanto imprimir las estadisticas del enlace
+LOG_BUFFER_BYTES = 4096  # Se escribe a flash al juntar esto...
+LOG_FLUSH_MS = 5000  # ...o cuando el registro más viejo espera esto
+LOG_MAX_FILE_BYTES = 1024 * 1024  # Luego sigue en ensayo_N_1.txt, ensayo_N_2.txt...
+CAPTURE_BINARY = True  # Además guarda ensayo_N.cap/.bin (captura binaria, ver src/capture_reader.py)
+SEND_ACKS = True  # Confirmar las tramas de los nodos con store-and-forward
+# El ACK sale cuando el nodo lleva este tiempo sin transmitir: así no se
+# pierde mientras manda la ráfaga siguiente. Debe superar el tiempo en el
+# aire de una trama (cientos de ms a SF7, segundos a SF11-12).
+ACK_DELAY_MS = 1500
+ACK_MAX_RANGES = 20  # "ACK:<nodo>:<a>-<b>,..." debe entrar en 255 bytes
+
 
 def get_next_ensayo_number():
     """Encuentra el siguiente número de ensayo disponible."""
@@ -43,14 +60,91 @@ def format_datetime():
     )
 
 
-def save_packet_data(filename, mensaje, rssi):
-    """Guarda los datos del paquete recibido en el archivo JSON."""
+def parse_link_info(mensaje):
+    """Devuelve (nodo, secuencia) del mensaje: JSON con "seq"/"n", trama delta o "Envio #N"."""
+    if is_frame(mensaje):
+        try:
+            frame = decode_frame(mensaje)
+            return str(frame["node_id"]), frame["seq"]
+        except ValueError:
+            return "?", None
+    if mensaje.startswith("{"):
+        try:
+            data = json.loads(mensaje)
+            node = data.get("node_id", data.get("id", "?"))
+            return str(node), data.get("seq", data.get("n"))
+        except ValueError:
+            return "?", None
+    i = mensaje.find("#")
+    if i >= 0:
+        try:
+            return "tx", int(mensaje[i + 1 :])
+        except ValueError:
+            pass
+    return "?", None
+
+
+def queue_ack(acks, node, seq):
+    """Anota la secuencia para el próximo ACK del nodo y reinicia su espera."""
+    entry = acks.get(node)
+    if entry is None:
+        acks[node] = [[seq], time.ticks_ms()]
+    else:
+        entry[0].append(seq)
+        entry[1] = time.ticks_ms()
+
+
+def format_ack(node, seqs):
+    """Arma "ACK:<nodo>:<a>-<b>,<c>" con los tramos de secuencias consecutivas."""
+    seqs = sorted(set(seqs))
+    ranges = []
+    first = last = seqs[0]
+    for seq in seqs[1:]:
+        if seq != last + 1:
+            ranges.append((first, last))
+            first = seq
+        last = seq
+    ranges.append((first, last))
+    # Los más nuevos; lo que quede afuera el nodo lo reenvía y se confirma luego
+    parts = [str(a) if a == b else "{}-{}".format(a, b) for a, b in ranges[-ACK_MAX_RANGES:]]
+    return "ACK:{}:{}".format(node, ",".join(parts))
+
+
+def send_due_acks(lora, acks):
+    """Envía un ACK por cada nodo que terminó su ráfaga hace ACK_DELAY_MS."""
+    now = time.ticks_ms()
+    for node in list(acks):
+        seqs, last_ms = acks[node]
+        if time.ticks_diff(now, last_ms) < ACK_DELAY_MS:
+            continue
+        del acks[node]
+        try:
+            lora.send(format_ack(node, seqs))
+        except Exception as e:
+            print(f"  Error al enviar ACK: {e}")
+
+
+def print_link_stats(stats):
+    """Imprime una linea por nodo con PDR de ventana, RSSI/SNR y jitter."""
+    for node, s in stats.snapshot().items():
+        pdr = "-" if s["pdr"] is None else "{:.1f}%".format(100 * s["pdr"])
+        rssi = "-" if s["rssi"] is None else "{:.1f}".format(s["rssi"])
+        snr = "-" if s["snr"] is None else "{:.1f}".format(s["snr"])
+        print(
+            "  [Enlace {}] PDR {} RSSI {} dBm SNR {} dB jitter {:.0f} ms dup {} reord {}".format(
+                node, pdr, rssi, snr, s["jitter_ms"], s["duplicates"], s["reordered"]
+            )
+        )
+
+
+def save_packet_data(log, mensaje, rssi, snr=None):
+    """Agrega el paquete al buffer del registro (se escribe por lotes)."""
     try:
-        data = {"fecha": format_datetime(), "mensaje_recibido": mensaje, "rssi": rssi}
+        line = log.write(mensaje, rssi, snr)
 
-        with open(filename, "a") as f:
-            f.write(json.dumps(data))
-            f.write("\n")
+        if FORWARD_SERIAL:
+            # Una linea JSON por paquete para src/ingest_gateway.py
+            print(line)
 
         return True
     except Exception as e:
@@ -60,6 +154,13 @@ def save_packet_data(filename, mensaje, rssi):
 
 ensayo_num = get_next_ensayo_number()
 ensayo_filename = f"ensayo_{ensayo_num}.txt"
+log = LogWriter(
+    ensayo_filename,
+    buffer_size=LOG_BUFFER_BYTES,
+    flush_ms=LOG_FLUSH_MS,
+    max_file_size=LOG_MAX_FILE_BYTES,
+)
+capture = CaptureWriter(f"ensayo_{ensayo_num}") if CAPTURE_BINARY else None
 
 # Configurar SPI y LoRa
 spi = SoftSPI(
@@ -72,6 +173,10 @@ spi = SoftSPI(
 )
 lora = LoRa(spi, cs_pin=LORA_CS_PIN, reset_pin=LORA_RST_PIN, dio0_pin=LORA_DIO0_PIN)
 
+link_stats = LinkStats(window=64, max_nodes=16)
+last_stats_ms = time.ticks_ms()
+
+pending_acks = {}  # nodo -> [secuencias, ticks de la última trama]
 packet_count = 0
 error_count = 0
 save_error_count = 0
@@ -79,40 +184,68 @@ save_error_count = 0
 try:
     while True:
         if lora.is_packet_received():
-            packet = lora.get_packet(rssi=True, crc_info=True)
+            packet = lora.get_packet(rssi=True, crc_info=True, snr=True, raw=True)
 
             if packet:
                 packet_count += 1
                 payload = packet["payload"]
                 rssi = packet["rssi"]
 
+                node, seq = parse_link_info(payload)
+                link_stats.update(node, seq, rssi, packet["snr"])
+                crc_error = packet.get("crc_error", False)
+
+                if capture is not None:
+                    capture.write(packet["raw"], rssi, packet["snr"], crc_error,
+                                  lora.spreading_factor, lora.frequency)
+
+                if SEND_ACKS and not crc_error and seq is not None and node not in ("?", "tx"):
+                    queue_ack(pending_acks, node, seq)
+
                 print(f"\n[Paquete #{packet_count}]")
                 print(f"  Mensaje: {payload}")
                 print(f"  RSSI: {rssi} dBm")
                 print(f"  Fecha: {format_datetime()}")
 
-                if packet.get("crc_error", False):
+                if crc_error:
                     error_count += 1
                     print("  Estado: ERROR CRC (corrupto)")
                 else:
                     print("  Estado: OK")
 
-                if save_packet_data(ensayo_filename, payload, rssi):
-                    print(f"  Guardado en: {ensayo_filename} ✓")
+                if save_packet_data(log, payload, rssi, packet["snr"]):
+                    print(f"  Guardado en: {log.path} ✓")
                 else:
                     save_error_count += 1
                     print("Error al guardar ✗")
 
+        if pending_acks:
+            send_due_acks(lora, pending_acks)
+
+        log.poll()
+        if capture is not None:
+            capture.poll()
+
+        if time.ticks_diff(time.ticks_ms(), last_stats_ms) >= STATS_INTERVAL_S * 1000:
+            last_stats_ms = time.ticks_ms()
+            print_link_stats(link_stats)
+
         time.sleep(0.1)
 
 except KeyboardInterrupt:
     print(f"\n\n{'=' * 50}")
     print("Recepción detenida")
-    print(f"Archivo generado: {ensayo_filename}")
+    print(f"Archivo generado: {log.path}")
     print(f"Total de paquetes recibidos: {packet_count}")
     print(f"Errores CRC: {error_count}")
-    print(f"Errores al guardar: {save_error_count}")
+    print(f"Errores al guardar: {save_error_count + log.errors}")
+    print_link_stats(link_stats)
     if packet_count > 0:
         success_rate = ((packet_count - error_count) / packet_count) * 100
         print(f"Tasa de éxito: {success_rate:.1f}%")
     print(f"{'=' * 50}")
+finally:
+    # Lo que quedó en el buffer se escribe aunque el lazo termine con error
+    log.close()
+    if capture is not None:
+        capture.close()
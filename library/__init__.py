@@ -17,6 +17,7 @@ Example:
 
 __version__ = "1.0.0"
 __author__ = "FranFer03"
-__all__ = ["LoRa"]
+__all__ = ["LoRa", "SPIBus"]
 
 from .sx127x import LoRa
+from .spi_bus import SPIBus
@@ -0,0 +1,149 @@
+"""
+On-node aggregation of sensor samples before transmit.
+
+Sensors are sampled at a high rate but only windowed aggregates (mean, min,
+max, count) go on air, and a window whose mean stays within a deadband of
+the last transmitted value is not sent at all (a heartbeat still forces one
+every so often). A sample jumping more than ``event_delta`` away from the
+last transmitted value closes the window immediately, so fast events are not
+delayed to the end of the window.
+
+All state lives in arrays preallocated per channel; ``add()`` and ``poll()``
+do not allocate except for the tuple returned when a window is emitted.
+
+Example:
+    agg = Aggregator(channels=2, window_ms=60000, deadband=(0.2, 30))
+    agg.add(0, temperature)
+    agg.add(1, pressure)
+    out = agg.poll(0)   # None or (mean, min, max, count)
+"""
+
+from array import array
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    from time import monotonic
+
+    def ticks_ms():
+        return int(monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+def _per_channel(value, channels):
+    if isinstance(value, (tuple, list)):
+        return array('f', value)
+    return array('f', [value] * channels)
+
+
+class Aggregator:
+    def __init__(self, channels=1, window_ms=60000, deadband=0.0,
+                 event_delta=None, heartbeat_ms=600000):
+        """Windowed aggregator with deadband suppression.
+
+        Args:
+            channels: Number of independent signals.
+            window_ms: Window length; ``poll()`` emits once it has elapsed.
+            deadband: Minimum change of the window mean against the last
+                transmitted mean to transmit (scalar or one per channel).
+            event_delta: Change of a single sample that closes the window at
+                once (scalar or one per channel); None disables it.
+            heartbeat_ms: Transmit at least this often even within the
+                deadband; None disables it.
+        """
+        self.channels = channels
+        self.window_ms = window_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.deadband = _per_channel(deadband, channels)
+        self.event_delta = None if event_delta is None else _per_channel(event_delta, channels)
+
+        # Sums are kept relative to the window's first sample so that large
+        # values (pressure in Pa) keep their precision in single floats
+        self._ref = array('f', [0.0] * channels)
+        self._sum = array('f', [0.0] * channels)
+        self._min = array('f', [0.0] * channels)
+        self._max = array('f', [0.0] * channels)
+        self._count = array('I', [0] * channels)
+        self._start = [None] * channels
+        self._event = bytearray(channels)
+        self._sent = array('f', [0.0] * channels)
+        self._sent_ms = [None] * channels
+        self.suppressed = 0
+
+    def add(self, ch, value, now_ms=None):
+        """Add one sample to channel ``ch``.
+
+        Returns:
+            True if the sample is an event that makes the next ``poll()`` emit.
+        """
+        if now_ms is None:
+            now_ms = ticks_ms()
+        if self._count[ch] == 0:
+            self._ref[ch] = value
+            self._sum[ch] = 0.0
+            self._min[ch] = value
+            self._max[ch] = value
+            self._start[ch] = now_ms
+        else:
+            if value < self._min[ch]:
+                self._min[ch] = value
+            if value > self._max[ch]:
+                self._max[ch] = value
+        self._sum[ch] += value - self._ref[ch]
+        self._count[ch] += 1
+
+        if self.event_delta is not None and self._sent_ms[ch] is not None:
+            d = value - self._sent[ch]
+            if (d if d >= 0 else -d) > self.event_delta[ch]:
+                self._event[ch] = 1
+                return True
+        return False
+
+    def mean(self, ch):
+        """Mean of the open window, or None if it has no samples."""
+        n = self._count[ch]
+        if n == 0:
+            return None
+        return self._ref[ch] + self._sum[ch] / n
+
+    def poll(self, ch, now_ms=None):
+        """Close the window of ``ch`` if due and decide whether to transmit.
+
+        Returns:
+            ``(mean, min, max, count)`` to transmit, or None while the window
+            is open or when the closed window was within the deadband.
+        """
+        n = self._count[ch]
+        if n == 0:
+            return None
+        if now_ms is None:
+            now_ms = ticks_ms()
+        event = self._event[ch]
+        if not event and ticks_diff(now_ms, self._start[ch]) < self.window_ms:
+            return None
+
+        mean = self._ref[ch] + self._sum[ch] / n
+        out = (mean, self._min[ch], self._max[ch], n)
+        self._count[ch] = 0
+        self._event[ch] = 0
+
+        last_ms = self._sent_ms[ch]
+        if not event and last_ms is not None:
+            d = mean - self._sent[ch]
+            heartbeat = (self.heartbeat_ms is not None
+                         and ticks_diff(now_ms, last_ms) >= self.heartbeat_ms)
+            if (d if d >= 0 else -d) < self.deadband[ch] and not heartbeat:
+                self.suppressed += 1
+                return None
+        self._sent[ch] = mean
+        self._sent_ms[ch] = now_ms
+        return out
+
+    def flush(self, ch):
+        """Emit whatever the window of ``ch`` holds, ignoring the deadband."""
+        if self._count[ch] == 0:
+            return None
+        self._event[ch] = 1
+        return self.poll(ch)
@@ -25,15 +25,48 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 '''
 
-from ustruct import unpack as unp
-from machine import I2C, Pin
+try:
+    from ustruct import unpack as unp
+except ImportError:  # CPython (host tests)
+    from struct import unpack as unp
 import math
-import time
+
+try:
+    from time import ticks_ms, ticks_diff, sleep_ms
+except ImportError:  # CPython
+    from time import monotonic, sleep
+
+    def ticks_ms():
+        return int(monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+    def sleep_ms(ms):
+        sleep(ms / 1000)
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# Conversion times in ms (datasheet maximum, rounded up) per oversampling
+_TEMP_DELAY_MS = 5
+_PRESSURE_DELAY_MS = (5, 8, 14, 26)
+
 
 # BMP180 class
 class BMP180():
     '''
     Module for the BMP180 pressure sensor.
+
+    Three ways to refresh the measurement:
+    - ``temperature``/``pressure``/``altitude`` properties advance the
+      ``gauge`` generator one step (non-blocking polling).
+    - ``read()`` / ``blocking_read()`` sleep through the conversions.
+    - ``await read_async()`` yields to other tasks during the conversions.
+    Temperature and pressure always come from the same sample, and the
+    compensation runs once per sample.
     '''
 
     _bmp_addr = 119             # adress of BMP180 is hardcoded on the sensor
@@ -46,18 +79,10 @@ class BMP180():
         self._bmp_i2c = i2c_bus
         ## self._bmp_i2c.start()
         self.chip_id = self._bmp_i2c.readfrom_mem(_bmp_addr, 0xD0, 2)
-        # read calibration data from EEPROM
-        self._AC1 = unp('>h', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xAA, 2))[0]
-        self._AC2 = unp('>h', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xAC, 2))[0]
-        self._AC3 = unp('>h', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xAE, 2))[0]
-        self._AC4 = unp('>H', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xB0, 2))[0]
-        self._AC5 = unp('>H', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xB2, 2))[0]
-        self._AC6 = unp('>H', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xB4, 2))[0]
-        self._B1 = unp('>h', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xB6, 2))[0]
-        self._B2 = unp('>h', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xB8, 2))[0]
-        self._MB = unp('>h', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xBA, 2))[0]
-        self._MC = unp('>h', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xBC, 2))[0]
-        self._MD = unp('>h', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xBE, 2))[0]
+        # read calibration data from EEPROM (AC1..MD, one 22-byte burst)
+        (self._AC1, self._AC2, self._AC3, self._AC4, self._AC5, self._AC6,
+         self._B1, self._B2, self._MB, self._MC, self._MD) = unp(
+            '>hhhHHHhhhhh', self._bmp_i2c.readfrom_mem(_bmp_addr, 0xAA, 22))
 
         # settings to be adjusted by user
         self.oversample_setting = 3
@@ -69,10 +94,15 @@ class BMP180():
         self.MSB_raw = None
         self.LSB_raw = None
         self.XLSB_raw = None
+
+        # compensated values of the last sample
+        self._dirty = False
+        self._sample_oss = self.oversample_setting
+        self._temperature = 0.0
+        self._pressure = 0.0
+
         self.gauge = self.makegauge() # Generator instance
-        for _ in range(128):
-            next(self.gauge)
-            time.sleep_ms(1)
+        self.blocking_read()
 
     def compvaldump(self):
         '''
@@ -81,39 +111,137 @@ class BMP180():
         return [self._AC1, self._AC2, self._AC3, self._AC4, self._AC5, self._AC6, 
                 self._B1, self._B2, self._MB, self._MC, self._MD, self.oversample_setting]
 
+    # conversion steps shared by the generator, blocking and async reads
+    def _start_temperature(self):
+        self._bmp_i2c.writeto_mem(self._bmp_addr, 0xF4, bytearray([0x2E]))
+
+    def _start_pressure(self, oss):
+        self._bmp_i2c.writeto_mem(self._bmp_addr, 0xF4, bytearray([0x34+(oss << 6)]))
+
+    def _read_ut(self):
+        return self._bmp_i2c.readfrom_mem(self._bmp_addr, 0xF6, 2)
+
+    def _read_up(self):
+        return self._bmp_i2c.readfrom_mem(self._bmp_addr, 0xF6, 3)
+
+    def _store(self, ut, up, oss):
+        '''
+        Publish one complete sample (raw temperature and pressure together).
+        '''
+        self.UT_raw = ut
+        self.MSB_raw = up[0:1]
+        self.LSB_raw = up[1:2]
+        self.XLSB_raw = up[2:3]
+        self._sample_oss = oss
+        self._dirty = True
+
     # gauge raw
     def makegauge(self):
         '''
-        Generator refreshing the raw measurments.
+        Generator refreshing the raw measurments. Yields None while a
+        conversion is running and True when a new sample is available.
         '''
-        delays = (5, 8, 14, 25)
         while True:
-            self._bmp_i2c.writeto_mem(self._bmp_addr, 0xF4, bytearray([0x2E]))
-            t_start = time.ticks_ms()
-            while (time.ticks_ms() - t_start) <= 5: # 5mS delay
+            self._start_temperature()
+            t_start = ticks_ms()
+            # <=: ticks_ms counts whole ms, so < could exit after 4.0 ms
+            while ticks_diff(ticks_ms(), t_start) <= _TEMP_DELAY_MS:
                 yield None
             try:
-                self.UT_raw = self._bmp_i2c.readfrom_mem(self._bmp_addr, 0xF6, 2)
+                ut = self._read_ut()
             except:
                 yield None
-            self._bmp_i2c.writeto_mem(self._bmp_addr, 0xF4, bytearray([0x34+(self.oversample_setting << 6)]))
-            t_pressure_ready = delays[self.oversample_setting]
-            t_start = time.ticks_ms()
-            while (time.ticks_ms() - t_start) <= t_pressure_ready:
+                continue
+            oss = self.oversample_setting
+            self._start_pressure(oss)
+            t_start = ticks_ms()
+            while ticks_diff(ticks_ms(), t_start) <= _PRESSURE_DELAY_MS[oss]:
                 yield None
             try:
-                self.MSB_raw = self._bmp_i2c.readfrom_mem(self._bmp_addr, 0xF6, 1)
-                self.LSB_raw = self._bmp_i2c.readfrom_mem(self._bmp_addr, 0xF7, 1)
-                self.XLSB_raw = self._bmp_i2c.readfrom_mem(self._bmp_addr, 0xF8, 1)
+                up = self._read_up()
             except:
                 yield None
+                continue
+            self._store(ut, up, oss)
             yield True
 
     def blocking_read(self):
-        if next(self.gauge) is not None: # Discard old data
-            pass
-        while next(self.gauge) is None:
-            pass
+        '''
+        Take a new sample, sleeping through the conversion times.
+        '''
+        oss = self.oversample_setting
+        self._start_temperature()
+        sleep_ms(_TEMP_DELAY_MS)
+        ut = self._read_ut()
+        self._start_pressure(oss)
+        sleep_ms(_PRESSURE_DELAY_MS[oss])
+        self._store(ut, self._read_up(), oss)
+        # Restart the polling gauge: its conversion in flight was overwritten
+        self.gauge = self.makegauge()
+
+    def read(self):
+        '''
+        Take a new sample and return (temperature in C, pressure in Pa).
+        '''
+        self.blocking_read()
+        return self._compensate()
+
+    async def read_async(self):
+        '''
+        Like ``read()``, but awaits the conversion times so other tasks run
+        meanwhile. Do not mix with polling ``gauge`` from another task.
+        '''
+        oss = self.oversample_setting
+        self._start_temperature()
+        await asyncio.sleep(_TEMP_DELAY_MS / 1000)
+        ut = self._read_ut()
+        self._start_pressure(oss)
+        await asyncio.sleep(_PRESSURE_DELAY_MS[oss] / 1000)
+        self._store(ut, self._read_up(), oss)
+        self.gauge = self.makegauge()
+        return self._compensate()
+
+    def _compensate(self):
+        '''
+        Compensate the last sample once with the datasheet integer algorithm;
+        returns (temperature in C, pressure in Pa).
+        '''
+        if not self._dirty:
+            return self._temperature, self._pressure
+        self._dirty = False
+        ut = self.UT_raw
+        if ut is None:
+            return self._temperature, self._pressure
+        oss = self._sample_oss
+        UT = (ut[0] << 8) | ut[1]
+        UP = ((self.MSB_raw[0] << 16) | (self.LSB_raw[0] << 8) | self.XLSB_raw[0]) >> (8-oss)
+
+        X1 = ((UT-self._AC6)*self._AC5) >> 15
+        X2 = (self._MC << 11)//(X1+self._MD)
+        B5 = X1+X2
+        self.B5_raw = B5
+        self._temperature = ((B5+8) >> 4)/10
+
+        B6 = B5-4000
+        B6_2 = (B6*B6) >> 12
+        X1 = (self._B2*B6_2) >> 11
+        X2 = (self._AC2*B6) >> 11
+        X3 = X1+X2
+        B3 = (((self._AC1*4+X3) << oss)+2) >> 2
+        X1 = (self._AC3*B6) >> 13
+        X2 = (self._B1*B6_2) >> 16
+        X3 = ((X1+X2)+2) >> 2
+        B4 = (self._AC4*(X3+32768)) >> 15
+        B7 = (UP-B3)*(50000 >> oss)
+        if B7 < 0x80000000:
+            p = (B7*2)//B4
+        else:
+            p = (B7//B4)*2
+        X1 = (p >> 8)*(p >> 8)
+        X1 = (X1*3038) >> 16
+        X2 = (-7357*p) >> 16
+        self._pressure = p+((X1+X2+3791) >> 4)
+        return self._temperature, self._pressure
 
     @property
     def oversample_sett(self):
@@ -133,47 +261,15 @@ class BMP180():
         Temperature in degree C.
         '''
         next(self.gauge)
-        try:
-            UT = unp('>H', self.UT_raw)[0]
-        except:
-            return 0.0
-        X1 = (UT-self._AC6)*self._AC5/2**15
-        X2 = self._MC*2**11/(X1+self._MD)
-        self.B5_raw = X1+X2
-        return (((X1+X2)+8)/2**4)/10
+        return self._compensate()[0]
 
     @property
     def pressure(self):
         '''
-        Pressure in mbar.
+        Pressure in Pa.
         '''
         next(self.gauge)
-        self.temperature  # Populate self.B5_raw
-        try:
-            MSB = unp('B', self.MSB_raw)[0]
-            LSB = unp('B', self.LSB_raw)[0]
-            XLSB = unp('B', self.XLSB_raw)[0]
-        except:
-            return 0.0
-        UP = ((MSB << 16)+(LSB << 8)+XLSB) >> (8-self.oversample_setting)
-        B6 = self.B5_raw-4000
-        X1 = (self._B2*(B6**2/2**12))/2**11
-        X2 = self._AC2*B6/2**11
-        X3 = X1+X2
-        B3 = ((int((self._AC1*4+X3)) << self.oversample_setting)+2)/4
-        X1 = self._AC3*B6/2**13
-        X2 = (self._B1*(B6**2/2**12))/2**16
-        X3 = ((X1+X2)+2)/2**2
-        B4 = abs(self._AC4)*(X3+32768)/2**15
-        B7 = (abs(UP)-B3) * (50000 >> self.oversample_setting)
-        if B7 < 0x80000000:
-            pressure = (B7*2)/B4
-        else:
-            pressure = (B7/B4)*2
-        X1 = (pressure/2**8)**2
-        X1 = (X1*3038)/2**16
-        X2 = (-7357*pressure)/2**16
-        return pressure+(X1+X2+3791)/2**4
+        return self._compensate()[1]
 
     @property
     def altitude(self):
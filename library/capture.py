@@ -0,0 +1,175 @@
+"""
+Binary packet capture for the gateway (compact alternative to ensayo text).
+
+A capture is two files:
+
+``<name>.cap``: a 16-byte header followed by one fixed 16-byte record per
+frame, little endian::
+
+    header  magic "LCAP", version u8, record size u8, reserved u16,
+            start time u32 (Unix seconds), reserved u32
+    record  t_ms u32      ms since the start time (wraps after 49.7 days)
+            offset u32    payload position in the .bin file
+            rssi i16      dBm
+            channel u16   carrier frequency in 25 kHz steps
+            length u8     payload bytes
+            snr i8        SNR in 0.25 dB steps (register units)
+            sf u8         spreading factor
+            flags u8      bit 0: CRC error
+
+``<name>.bin``: the raw payloads back to back.
+
+Records and payloads are buffered in preallocated buffers and appended in
+one write each; the payload blob is always written before the records that
+point into it, so a reset never leaves a record without its payload. The
+host reads the index with ``numpy.memmap`` (``src/capture_reader.py``).
+
+Example:
+    cap = CaptureWriter("ensayo_0")
+    packet = lora.get_packet(rssi=True, snr=True, raw=True)
+    cap.write(packet["raw"], packet["rssi"], packet["snr"],
+              sf=lora.spreading_factor, frequency=lora.frequency)
+    cap.close()
+"""
+
+import os
+import time
+
+try:
+    from ustruct import pack_into
+except ImportError:  # CPython
+    from struct import pack_into
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    from time import monotonic
+
+    def ticks_ms():
+        return int(monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+MAGIC = b"LCAP"
+VERSION = 1
+HEADER_SIZE = 16
+RECORD_SIZE = 16
+RECORD_FORMAT = "<IIhHBbBB"
+FLAG_CRC_ERROR = 0x01
+CHANNEL_STEP_HZ = 25000
+
+# Seconds between the port's epoch and the Unix epoch (2000 on older ports)
+_EPOCH_OFFSET = 946684800 if time.gmtime(0)[0] == 2000 else 0
+
+
+class CaptureWriter:
+    def __init__(self, name, buffer_records=64, flush_ms=5000):
+        """Start a new capture ``<name>.cap`` / ``<name>.bin``.
+
+        Args:
+            name: Path without extension; existing files are replaced.
+            buffer_records: Frames buffered in RAM before a flush.
+            flush_ms: Maximum time a frame waits in RAM.
+        """
+        self.index_path = name + ".cap"
+        self.payload_path = name + ".bin"
+        self.flush_ms = flush_ms
+        self.frames = 0
+        self.errors = 0
+        self._records = bytearray(buffer_records * RECORD_SIZE)
+        self._payloads = bytearray(buffer_records * 255)
+        self._n = 0
+        self._payload_len = 0
+        self._offset = 0
+        self._first_ms = None
+        # Elapsed time is accumulated call to call (write and poll):
+        # ticks_ms wraps (every 2^30 ms on ESP32) and ticks_diff is only
+        # valid within half of that, so one difference from the start
+        # would go wrong after about 6 days.
+        self._last_ms = ticks_ms()
+        self._elapsed_ms = 0
+        header = bytearray(HEADER_SIZE)
+        header[0:4] = MAGIC
+        header[4] = VERSION
+        header[5] = RECORD_SIZE
+        pack_into("<I", header, 8, int(time.time()) + _EPOCH_OFFSET)
+        with open(self.index_path, "wb") as f:
+            f.write(header)
+        with open(self.payload_path, "wb"):
+            pass
+
+    def write(self, payload, rssi, snr=None, crc_error=False, sf=0, frequency=None):
+        """Buffer one received frame.
+
+        Args:
+            payload: Raw payload (bytes-like; a str is stored as latin-1).
+            rssi: Packet RSSI in dBm.
+            snr: Packet SNR in dB.
+            crc_error: Frame failed the payload CRC.
+            sf: Spreading factor the frame was received with.
+            frequency: Carrier frequency in Hz.
+        """
+        if isinstance(payload, str):
+            payload = bytes([ord(c) & 0xFF for c in payload])
+        n = len(payload)
+        if self._n * RECORD_SIZE >= len(self._records):
+            self.flush()
+        now = self._tick()
+        channel = 0 if frequency is None else int(frequency / CHANNEL_STEP_HZ + 0.5)
+        snr_q = 0 if snr is None else int(round(snr * 4))
+        pack_into(RECORD_FORMAT, self._records, self._n * RECORD_SIZE,
+                  self._elapsed_ms, self._offset + self._payload_len,
+                  int(rssi or 0), channel, n, max(-128, min(127, snr_q)), sf or 0,
+                  FLAG_CRC_ERROR if crc_error else 0)
+        self._payloads[self._payload_len:self._payload_len + n] = payload
+        self._payload_len += n
+        self._n += 1
+        self.frames += 1
+        if self._first_ms is None:
+            self._first_ms = now
+
+    def _tick(self):
+        now = ticks_ms()
+        self._elapsed_ms = (self._elapsed_ms + ticks_diff(now, self._last_ms)) & 0xFFFFFFFF
+        self._last_ms = now
+        return now
+
+    def poll(self):
+        """Flush if the oldest buffered frame has waited ``flush_ms``."""
+        now = self._tick()
+        if self._first_ms is not None and ticks_diff(now, self._first_ms) >= self.flush_ms:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered payloads, then their records."""
+        if not self._n:
+            return True
+        try:
+            with open(self.payload_path, "ab") as f:
+                f.write(memoryview(self._payloads)[:self._payload_len])
+            with open(self.index_path, "ab") as f:
+                f.write(memoryview(self._records)[:self._n * RECORD_SIZE])
+        except OSError as e:
+            self.errors += 1
+            print("Error al guardar captura:", e)
+            # Drop the batch: a retry could duplicate payloads already written
+            self._offset = self._file_size()
+            self._n = 0
+            self._payload_len = 0
+            self._first_ms = None
+            return False
+        self._offset += self._payload_len
+        self._n = 0
+        self._payload_len = 0
+        self._first_ms = None
+        return True
+
+    def _file_size(self):
+        try:
+            return os.stat(self.payload_path)[6]
+        except OSError:
+            return self._offset
+
+    def close(self):
+        return self.flush()
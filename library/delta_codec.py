@@ -0,0 +1,200 @@
+"""
+Compact binary frames carrying a batch of readings of one sensor.
+
+Timestamps are encoded as delta-of-delta and values as deltas of scaled
+integers (``round(value * 10**decimals)``), both zigzag + LEB128 varints and
+interleaved per reading, so a steady sampling period costs one byte per
+timestamp and a slow signal one byte per value. Readings are appended in
+place to a preallocated buffer until the next one would not fit.
+
+Frame layout (version 1):
+
+    0      0xD0 | decimals          (never '{', so JSON frames still parse)
+    1      node_id (0-255)
+    2      sensor_type_id
+    3      number of readings
+    4-5    frame sequence number, big endian
+    ...    varint(t0) zigzag(v0), then per reading zigzag(dod) zigzag(dv)
+
+Example:
+    enc = DeltaEncoder(node_id=64, sensor_type_id=1, decimals=2)
+    while enc.append(time.ticks_ms(), temperature):
+        ...
+    lora.send(enc.frame(seq))
+    enc.reset()
+"""
+
+MAGIC = 0xD0
+HEADER_SIZE = 6
+MAX_FRAME = 255
+
+
+def _zigzag(v):
+    return (v << 1) if v >= 0 else ((-v << 1) - 1)
+
+
+def _unzigzag(z):
+    return (z >> 1) if not z & 1 else -((z + 1) >> 1)
+
+
+def _varint_len(v):
+    n = 1
+    while v >= 0x80:
+        v >>= 7
+        n += 1
+    return n
+
+
+def _put_varint(buf, pos, v):
+    while v >= 0x80:
+        buf[pos] = (v & 0x7F) | 0x80
+        v >>= 7
+        pos += 1
+    buf[pos] = v
+    return pos + 1
+
+
+def _get_varint(buf, pos):
+    v = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        v |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return v, pos
+        shift += 7
+
+
+def is_frame(payload):
+    """True if ``payload`` (bytes or a latin-1 str) starts like a delta frame."""
+    if not payload:
+        return False
+    first = payload[0]
+    if isinstance(first, str):
+        first = ord(first)
+    return first & 0xF0 == MAGIC
+
+
+class DeltaEncoder:
+    def __init__(self, node_id, sensor_type_id, decimals=2, seq=0, size=MAX_FRAME):
+        """Incremental encoder over a preallocated buffer.
+
+        Args:
+            node_id: Sender id, 0-255.
+            sensor_type_id: Sensor type of every reading in the frame.
+            decimals: Decimal digits kept from each value (0-15).
+            seq: Sequence number of the first frame.
+            size: Buffer size, at most one LoRa payload (255).
+        """
+        if not 0 <= int(node_id) <= 255:
+            raise ValueError("node_id must fit in one byte")
+        if not 0 <= decimals <= 15:
+            raise ValueError("decimals must be 0-15")
+        self.buf = bytearray(size)
+        self.node_id = int(node_id)
+        self.sensor_type_id = sensor_type_id
+        self.decimals = decimals
+        self._scale = 10 ** decimals
+        self.reset(seq)
+
+    def reset(self, seq=None):
+        """Empty the buffer, optionally setting the next frame's sequence."""
+        if seq is not None:
+            self.seq = seq & 0xFFFF
+        buf = self.buf
+        buf[0] = MAGIC | self.decimals
+        buf[1] = self.node_id
+        buf[2] = self.sensor_type_id
+        buf[3] = 0
+        buf[4] = self.seq >> 8
+        buf[5] = self.seq & 0xFF
+        self.length = HEADER_SIZE
+        self.count = 0
+        self._last_t = 0
+        self._last_delta = 0
+        self._last_v = 0
+
+    def append(self, timestamp_ms, value):
+        """Add one reading; False (buffer untouched) when it does not fit.
+
+        Args:
+            timestamp_ms: Non-negative integer timestamp (e.g. ticks_ms()).
+            value: Reading, rounded to ``decimals`` digits.
+        """
+        if self.count == 255:
+            return False
+        t = int(timestamp_ms)
+        v = int(round(value * self._scale))
+        if self.count == 0:
+            a = t
+            b = _zigzag(v)
+        else:
+            delta = t - self._last_t
+            a = _zigzag(delta - self._last_delta)
+            b = _zigzag(v - self._last_v)
+        if self.length + _varint_len(a) + _varint_len(b) > len(self.buf):
+            return False
+        pos = _put_varint(self.buf, self.length, a)
+        self.length = _put_varint(self.buf, pos, b)
+        if self.count:
+            self._last_delta = t - self._last_t
+        self._last_t = t
+        self._last_v = v
+        self.count += 1
+        self.buf[3] = self.count
+        return True
+
+    def frame(self, seq=None):
+        """The encoded frame so far (a view into the buffer, no copy).
+
+        Args:
+            seq: Sequence number to stamp now instead of the one set by
+                ``reset()`` (e.g. a counter shared with other frames).
+        """
+        if seq is not None:
+            self.seq = seq & 0xFFFF
+            self.buf[4] = self.seq >> 8
+            self.buf[5] = self.seq & 0xFF
+        return memoryview(self.buf)[:self.length]
+
+
+def decode_frame(frame):
+    """Decode one frame (bytes, or the latin-1 str the driver returns).
+
+    Returns:
+        Dictionary with node_id, sensor_type_id, seq and readings, a list of
+        ``(timestamp_ms, value)``.
+
+    Raises:
+        ValueError: If the frame is not a version 1 delta frame.
+    """
+    if isinstance(frame, str):
+        frame = bytes(ord(c) for c in frame)
+    if len(frame) < HEADER_SIZE or frame[0] & 0xF0 != MAGIC:
+        raise ValueError("not a delta frame")
+    scale = 10 ** (frame[0] & 0x0F)
+    count = frame[3]
+    readings = []
+    pos = HEADER_SIZE
+    t = v = delta = 0
+    try:
+        for i in range(count):
+            a, pos = _get_varint(frame, pos)
+            b, pos = _get_varint(frame, pos)
+            if i == 0:
+                t = a
+                v = _unzigzag(b)
+            else:
+                delta += _unzigzag(a)
+                t += delta
+                v += _unzigzag(b)
+            readings.append((t, v / scale))
+    except IndexError:
+        raise ValueError("truncated delta frame")
+    return {
+        "node_id": frame[1],
+        "sensor_type_id": frame[2],
+        "seq": (frame[4] << 8) | frame[5],
+        "readings": readings,
+    }
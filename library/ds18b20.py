@@ -0,0 +1,131 @@
+"""
+Non-blocking DS18B20 acquisition for every sensor on a 1-Wire bus.
+
+One broadcast Convert T (skip ROM) starts the conversion on all sensors at
+once; the caller keeps working (BMP180 read, radio TX, ...) and collects the
+temperatures when the conversion time has elapsed, instead of sleeping 750 ms
+per sensor and per retry.
+
+Example:
+    import onewire, ds18x20
+    from ds18b20 import DS18B20Reader
+
+    reader = DS18B20Reader(ds18x20.DS18X20(onewire.OneWire(Pin(33))))
+    reader.start()
+    ...                       # other work while the sensors convert
+    temps = reader.collect()  # {"28ff...": 21.5, ...}
+"""
+
+from time import ticks_ms, ticks_diff, sleep_ms
+
+# Conversion time per resolution (9..12 bits), datasheet maximum
+CONVERSION_MS = {9: 94, 10: 188, 11: 375, 12: 750}
+
+
+def valid_temp(t):
+    """False for missing or sentinel readings (85.0 power-on, -127.0 error)."""
+    if t is None or t == 85.0 or t == -127.0:
+        return False
+    return -60.0 <= t <= 130.0
+
+
+class DS18B20Reader:
+    def __init__(self, ds, roms=None, resolution=12, retries=3, poll_bus=False):
+        """Conversion pipeline over a ``ds18x20.DS18X20`` driver.
+
+        Args:
+            ds: ``ds18x20.DS18X20`` instance.
+            roms: ROMs to read; scanned from the bus when None.
+            resolution: Configured resolution in bits (sets the wait time).
+            retries: Scratchpad reads per ROM before giving up (a CRC error
+                is retried without a new conversion).
+            poll_bus: Finish early when the bus reports the conversion done.
+                Only valid for externally powered sensors: in parasite mode
+                the line reads high during conversion.
+        """
+        self.ds = ds
+        self.roms = list(ds.scan() if roms is None else roms)
+        self.conversion_ms = CONVERSION_MS[resolution]
+        self.retries = retries
+        self.poll_bus = poll_bus
+        self.errors = 0
+        self._started = None
+
+    @property
+    def busy(self):
+        """True while a conversion started with ``start()`` is pending."""
+        return self._started is not None
+
+    def start(self):
+        """Broadcast Convert T to every sensor and return immediately.
+
+        Returns:
+            True if the conversion was started.
+        """
+        if not self.roms:
+            return False
+        try:
+            self.ds.convert_temp()
+        except Exception:
+            self.errors += 1
+            self._started = None
+            return False
+        self._started = ticks_ms()
+        return True
+
+    def ready(self):
+        """True once the started conversion can be read."""
+        if self._started is None:
+            return False
+        if ticks_diff(ticks_ms(), self._started) >= self.conversion_ms:
+            return True
+        return self.poll_bus and self.ds.ow.readbit() == 1
+
+    def remaining_ms(self):
+        """Milliseconds left until ``ready()``, 0 when idle or done."""
+        if self._started is None:
+            return 0
+        left = self.conversion_ms - ticks_diff(ticks_ms(), self._started)
+        return left if left > 0 else 0
+
+    def poll(self):
+        """Non-blocking collect: temperatures if ready, otherwise None."""
+        if not self.ready():
+            return None
+        return self._read_all()
+
+    def collect(self):
+        """Wait only for what is left of the conversion and read every ROM.
+
+        Returns:
+            Dictionary rom_hex -> temperature in C, or None for a sensor that
+            failed; empty if no conversion was started.
+        """
+        if self._started is None:
+            return {}
+        while not self.ready():
+            left = self.remaining_ms()
+            if self.poll_bus and left > 10:
+                left = 10
+            sleep_ms(left if left > 0 else 1)
+        return self._read_all()
+
+    def _read_all(self):
+        self._started = None
+        out = {}
+        for rom in self.roms:
+            t = None
+            for _ in range(self.retries):
+                try:
+                    t = self.ds.read_temp(rom)
+                except Exception:
+                    t = None
+                if valid_temp(t):
+                    break
+                t = None
+            if t is None:
+                self.errors += 1
+            else:
+                t = float(t)
+            out[rom.hex()] = t
+        return out
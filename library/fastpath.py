@@ -0,0 +1,40 @@
+"""
+Viper implementations of the byte loops in the driver and the framing code.
+
+``sx127x.py`` and ``ring_log.py`` import these at load time and fall back
+to their pure Python loops when the import fails: on CPython (there is no
+``micropython`` module) and on ports built without the native emitters,
+where compiling a ``@micropython.viper`` function is a SyntaxError. A
+``.mpy`` of this module holds machine code, so it must be built for the
+board's architecture (``mpy-cross -march=xtensawin fastpath.py`` on ESP32).
+
+Viper functions take the buffer length as an argument: ``ptr8`` only gives
+the address, and calling ``len()`` from viper code goes back to the
+runtime.
+"""
+
+import micropython
+
+
+@micropython.viper
+def crc16(data, n: int, crc: int) -> int:
+    """CRC-16/CCITT-FALSE of the first ``n`` bytes of ``data``, from ``crc``."""
+    p = ptr8(data)  # noqa: F821
+    for i in range(n):
+        crc ^= int(p[i]) << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+@micropython.viper
+def is_ascii(data, n: int) -> bool:
+    """True if none of the first ``n`` bytes of ``data`` has the high bit set."""
+    p = ptr8(data)  # noqa: F821
+    for i in range(n):
+        if int(p[i]) & 0x80:
+            return False
+    return True
@@ -0,0 +1,257 @@
+"""
+Incremental link-quality statistics for the gateway RX path.
+
+Every update is O(1) in time and memory per node, so the accumulator runs on
+the MicroPython gateway next to ``LoRa.get_packet()`` as well as on the host
+ingestion side (plain CPython, no dependencies).
+
+Per node it keeps:
+- Sliding-window PDR over the last ``window`` sequence numbers (bitmap ring).
+- Duplicate, reordered and counter-reset counts.
+- EWMA of RSSI and SNR.
+- Inter-arrival jitter (RFC 3550 style smoothed |D|) and streaming
+  inter-arrival quantiles (P-square estimator, five markers each).
+
+Example:
+    stats = LinkStats(window=64, max_nodes=16)
+    stats.update("64", seq, rssi=packet["rssi"], snr=packet["snr"])
+    print(stats.snapshot())
+"""
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    from time import monotonic
+
+    def ticks_ms():
+        return int(monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+class P2Quantile:
+    """Streaming quantile estimate (Jain & Chlamtac P-square), O(1) memory."""
+
+    def __init__(self, p):
+        self.p = p
+        self._q = []        # marker heights
+        self._n = [0, 1, 2, 3, 4]
+        self._np = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._dn = (0, p / 2, p, (1 + p) / 2, 1)
+
+    def add(self, x):
+        q = self._q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        n = self._n
+        for i in range(k + 1, 5):
+            n[i] += 1
+        np_ = self._np
+        dn = self._dn
+        for i in range(5):
+            np_[i] += dn[i]
+        for i in range(1, 4):
+            d = np_[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                # Parabolic prediction, linear if it leaves the neighbours
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        """Current estimate, or None before the first sample."""
+        q = self._q
+        if not q:
+            return None
+        if len(q) < 5:
+            return q[min(len(q) - 1, int(self.p * len(q)))]
+        return q[2]
+
+
+class NodeStats:
+    """Link statistics for one node. Use through ``LinkStats``."""
+
+    def __init__(self, window, alpha, quantiles):
+        self.window = window
+        self.alpha = alpha
+        self._seen = bytearray(window)
+        self._in_window = 0
+        self.first_seq = None
+        self.top_seq = None
+        self.received = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.resets = 0
+        self.rssi = None
+        self.snr = None
+        self.last_ms = None
+        self.last_interval = None
+        self.jitter_ms = 0.0
+        self.interval_q = [P2Quantile(p) for p in quantiles]
+
+    def _restart(self, seq):
+        seen = self._seen
+        for i in range(self.window):
+            seen[i] = 0
+        seen[seq % self.window] = 1
+        self._in_window = 1
+        self.first_seq = seq
+        self.top_seq = seq
+
+    def _track_seq(self, seq):
+        window = self.window
+        top = self.top_seq
+        seen = self._seen
+        if top is None:
+            self._restart(seq)
+            return
+        if seq > top:
+            gap = seq - top
+            if gap >= window:
+                for i in range(window):
+                    seen[i] = 0
+                self._in_window = 0
+            else:
+                for s in range(top + 1, seq):
+                    i = s % window
+                    self._in_window -= seen[i]
+                    seen[i] = 0
+                self._in_window -= seen[seq % window]
+            seen[seq % window] = 1
+            self._in_window += 1
+            self.top_seq = seq
+        elif seq > top - window:
+            i = seq % window
+            if seen[i]:
+                self.duplicates += 1
+            else:
+                seen[i] = 1
+                self._in_window += 1
+                self.reordered += 1
+        else:
+            # Far behind the window: the node restarted its counter
+            self.resets += 1
+            self._restart(seq)
+
+    def update(self, seq, rssi, snr, now_ms):
+        self.received += 1
+        if seq is not None:
+            self._track_seq(seq)
+
+        a = self.alpha
+        if rssi is not None:
+            self.rssi = rssi if self.rssi is None else self.rssi + a * (rssi - self.rssi)
+        if snr is not None:
+            self.snr = snr if self.snr is None else self.snr + a * (snr - self.snr)
+
+        if self.last_ms is not None:
+            interval = ticks_diff(now_ms, self.last_ms)
+            if self.last_interval is not None:
+                d = interval - self.last_interval
+                self.jitter_ms += ((d if d >= 0 else -d) - self.jitter_ms) / 16
+            self.last_interval = interval
+            for q in self.interval_q:
+                q.add(interval)
+        self.last_ms = now_ms
+
+    def pdr(self):
+        """Delivery ratio over the last ``window`` sequence numbers."""
+        if self.top_seq is None:
+            return None
+        span = self.top_seq - self.first_seq + 1
+        if span > self.window:
+            span = self.window
+        return self._in_window / span
+
+    def snapshot(self, now_ms):
+        return {
+            "received": self.received,
+            "pdr": self.pdr(),
+            "seq": self.top_seq,
+            "duplicates": self.duplicates,
+            "reordered": self.reordered,
+            "resets": self.resets,
+            "rssi": self.rssi,
+            "snr": self.snr,
+            "jitter_ms": self.jitter_ms,
+            "interval_ms": [q.value() for q in self.interval_q],
+            "age_ms": None if self.last_ms is None else ticks_diff(now_ms, self.last_ms),
+        }
+
+
+class LinkStats:
+    def __init__(self, window=64, max_nodes=16, alpha=0.1, quantiles=(0.5, 0.95)):
+        """Per-node link statistics with bounded memory.
+
+        Args:
+            window: Sequence numbers covered by the sliding-window PDR.
+            max_nodes: Nodes tracked at once; adding one more evicts the node
+                heard from least recently.
+            alpha: EWMA weight of a new RSSI/SNR sample (0..1].
+            quantiles: Inter-arrival quantiles estimated per node.
+        """
+        self.window = window
+        self.max_nodes = max_nodes
+        self.alpha = alpha
+        self.quantiles = quantiles
+        self.nodes = {}
+        self.evicted = 0
+
+    def update(self, node_id, seq=None, rssi=None, snr=None, now_ms=None):
+        """Account one received packet.
+
+        Args:
+            node_id: Sender identifier.
+            seq: Transmitter sequence counter, if the frame carries one.
+            rssi: Packet RSSI in dBm.
+            snr: Packet SNR in dB.
+            now_ms: Arrival time in ms (defaults to ``ticks_ms()``).
+        """
+        if now_ms is None:
+            now_ms = ticks_ms()
+        node = self.nodes.get(node_id)
+        if node is None:
+            if len(self.nodes) >= self.max_nodes:
+                self._evict(now_ms)
+            node = NodeStats(self.window, self.alpha, self.quantiles)
+            self.nodes[node_id] = node
+        node.update(seq, rssi, snr, now_ms)
+
+    def _evict(self, now_ms):
+        oldest = None
+        oldest_age = -1
+        for node_id, node in self.nodes.items():
+            age = ticks_diff(now_ms, node.last_ms) if node.last_ms is not None else 0
+            if age > oldest_age:
+                oldest, oldest_age = node_id, age
+        del self.nodes[oldest]
+        self.evicted += 1
+
+    def snapshot(self, now_ms=None):
+        """Current statistics of every tracked node.
+
+        Returns:
+            Dictionary node_id -> dictionary of metrics (see NodeStats).
+        """
+        if now_ms is None:
+            now_ms = ticks_ms()
+        return {node_id: node.snapshot(now_ms) for node_id, node in self.nodes.items()}
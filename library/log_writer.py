@@ -0,0 +1,200 @@
+"""
+Buffered JSON-lines writer for the gateway recordings.
+
+Records are kept in RAM and appended to the file in one open/write/close
+when the buffer reaches ``buffer_size`` bytes or ``flush_ms`` has passed
+since the first unflushed record, instead of opening the file for every
+packet. Lines keep the ``ensayo`` format read by ``src/ensayos.py``
+(``fecha``, ``mensaje_recibido``, ``rssi``, ``snr``); they are formatted
+directly instead of building a dictionary, and the date string is only
+recomputed when the second changes. Files roll over to ``<name>_<k>.txt``
+at ``max_file_size`` bytes.
+
+When a flush fails (full or failing filesystem) the records already on
+disk are dropped from the buffer and the rest are retried by the next
+flush; a record cut by the failure is written again on a new line, and
+the fragment is skipped by the reader. The buffer is capped at
+``max_buffer`` bytes: beyond that the oldest records are dropped and
+counted in ``dropped``.
+
+Example:
+    log = LogWriter("ensayo_0.txt")
+    line = log.write(payload, rssi, snr)
+    ...
+    log.poll()    # in the main loop: time-based flush
+    log.close()   # on shutdown
+"""
+
+import os
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    from time import monotonic
+
+    def ticks_ms():
+        return int(monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+from time import localtime, time
+
+
+class LogWriter:
+    def __init__(self, path, buffer_size=4096, flush_ms=5000, max_file_size=1024 * 1024,
+                 max_buffer=None):
+        """Buffered writer appending to ``path``.
+
+        Args:
+            path: First log file; rolled files get a ``_<k>`` suffix.
+            buffer_size: Buffered bytes that trigger a flush.
+            flush_ms: Maximum time a record waits in RAM.
+            max_file_size: Size in bytes at which the next flush starts a
+                new file.
+            max_buffer: Bytes kept in RAM while flushes fail (default
+                ``4 * buffer_size``); older records are dropped beyond it.
+        """
+        self.base = path
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_ms = flush_ms
+        self.max_file_size = max_file_size
+        self.max_buffer = 4 * buffer_size if max_buffer is None else max_buffer
+        self.records = 0
+        self.flushes = 0
+        self.errors = 0
+        self.dropped = 0
+        self._part = 0
+        self._lines = []
+        self._pending = 0
+        self._torn = False
+        self._first_ms = None
+        self._second = None
+        self._date = None
+        try:
+            self._file_size = os.stat(path)[6]
+        except OSError:
+            self._file_size = 0
+
+    def _fecha(self):
+        now = int(time())
+        if now != self._second:
+            self._second = now
+            t = localtime(now)
+            self._date = "%04d-%02d-%02d %02d:%02d:%02d" % (t[0], t[1], t[2], t[3], t[4], t[5])
+        return self._date
+
+    def write(self, mensaje, rssi, snr=None):
+        """Buffer one record and return its JSON line (without newline)."""
+        line = '{"fecha": "%s", "mensaje_recibido": %s, "rssi": %s, "snr": %s}' % (
+            self._fecha(),
+            json.dumps(mensaje),
+            "null" if rssi is None else rssi,
+            "null" if snr is None else snr,
+        )
+        self._lines.append(line)
+        # Bytes, not characters: ujson keeps non-ASCII payload characters
+        self._pending += len(line.encode()) + 1
+        self.records += 1
+        if self._pending > self.max_buffer:
+            self._drop_oldest()
+        if self._first_ms is None:
+            self._first_ms = ticks_ms()
+        if self._pending >= self.buffer_size:
+            self.flush()
+        return line
+
+    def poll(self):
+        """Flush if the oldest buffered record has waited ``flush_ms``."""
+        if self._first_ms is not None and ticks_diff(ticks_ms(), self._first_ms) >= self.flush_ms:
+            self.flush()
+
+    def _drop_oldest(self):
+        lines = self._lines
+        while self._pending > self.max_buffer and len(lines) > 1:
+            self._pending -= len(lines.pop(0).encode()) + 1
+            self.dropped += 1
+
+    def _roll(self):
+        self._part += 1
+        stem, dot, ext = self.base.rpartition(".")
+        if not dot:
+            stem, ext = self.base, ""
+        self.path = "%s_%d%s%s" % (stem, self._part, dot, ext)
+        self._file_size = 0
+        self._torn = False
+
+    def flush(self):
+        """Append every buffered record to the file in one open."""
+        if not self._lines:
+            return True
+        if self._file_size >= self.max_file_size:
+            self._roll()
+        torn = self._torn
+        try:
+            with open(self.path, "a") as f:
+                if torn:
+                    f.write("\n")
+                for line in self._lines:
+                    f.write(line)
+                    f.write("\n")
+        except OSError as e:
+            self.errors += 1
+            print("Error al guardar datos:", e)
+            self._keep_unwritten(torn)
+            return False
+        self._file_size += self._pending + torn
+        self._torn = False
+        self._lines = []
+        self._pending = 0
+        self._first_ms = None
+        self.flushes += 1
+        return True
+
+    def _keep_unwritten(self, torn):
+        """Drop the records a failed flush did write; the rest are retried."""
+        try:
+            size = os.stat(self.path)[6]
+        except OSError:
+            # Unknown: retry everything on a new line
+            self._torn = True
+            return
+        written = size - self._file_size
+        self._file_size = size
+        if written <= 0:
+            return
+        if torn:
+            written -= 1
+            self._torn = False
+        lines = self._lines
+        done = 0
+        while done < len(lines) and written > 0:
+            n = len(lines[done].encode()) + 1
+            if written < n:
+                # Part of this record is on disk: rewrite it on a new line
+                self._torn = True
+                break
+            written -= n
+            self._pending -= n
+            done += 1
+        del lines[:done]
+
+    def close(self):
+        """Flush what is left (call on shutdown) and sync the filesystem."""
+        ok = self.flush()
+        sync = getattr(os, "sync", None)
+        if sync is not None:
+            sync()
+        return ok
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,16 @@
+# Freeze the drivers into a custom MicroPython firmware build:
+#   make -C ports/esp32 BOARD=ESP32_GENERIC FROZEN_MANIFEST=/path/to/library/manifest.py
+include("$(PORT_DIR)/boards/manifest.py")
+
+module("sx127x.py")
+# fastpath.py (viper) is left out until test/fastpath_benchmark.py has been
+# run on the board; the drivers fall back to Python without it
+module("spi_bus.py")
+module("bmp180.py")
+module("ds18b20.py")
+module("aggregator.py")
+module("delta_codec.py")
+module("ring_log.py")
+module("link_stats.py")
+module("log_writer.py")
+module("capture.py")
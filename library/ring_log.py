@@ -0,0 +1,319 @@
+"""
+Flash-backed store-and-forward log of outgoing readings.
+
+The log is one file preallocated with ``slots`` fixed-size records used as a
+ring: appending writes a single record in place, never rewriting the file.
+Each record carries a magic byte, the payload length, a monotonically
+increasing 32-bit sequence number and a CRC16 over all of it, so a record
+torn by a reset is simply invalid. On boot the head is recovered by scanning
+the slots for the valid record with the highest sequence.
+
+Acknowledgements are selective (a live frame may be acknowledged before an
+older one being drained). Only the oldest unacknowledged sequence (the
+tail) is persisted, and only every ``ack_every`` advances, to a small
+separate file replaced atomically. After a reset the records between the
+persisted tail and the real one are sent again: delivery is at least once
+and the gateway drops duplicates by (node, seq).
+
+Example:
+    log = RingLog("ring.log", slots=256, record_size=96)
+    seq = log.append(payload)       # before sending it live
+    ...
+    item = log.next_to_drain()      # (seq, payload) to resend, or None
+    log.ack_range(first, last)      # on "ACK:<node>:<first>-<last>" from the gateway
+"""
+
+import os
+from array import array
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    from time import monotonic
+
+    def ticks_ms():
+        return int(monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+MAGIC = 0xA5
+HEADER_SIZE = 8  # magic, length, seq (4), crc16 (2)
+
+
+def crc16_py(data, crc=0xFFFF):
+    """CRC-16/CCITT-FALSE of a bytes-like object (pure Python)."""
+    for b in data:
+        crc ^= b << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+try:
+    from fastpath import crc16 as _crc16_viper
+except (ImportError, SyntaxError, ValueError):  # CPython, or no native emitter
+    crc16 = crc16_py
+else:
+    def crc16(data, crc=0xFFFF):
+        """CRC-16/CCITT-FALSE of a bytes-like object (viper)."""
+        return _crc16_viper(data, len(data), crc)
+
+
+class RingLog:
+    def __init__(self, path="ring.log", slots=256, record_size=96,
+                 ack_every=16, retry_ms=30000):
+        """Open (or create) the ring log and recover its state.
+
+        Args:
+            path: Log file; the tail cursor is kept in ``path + ".ack"``.
+            slots: Records held; when full, the oldest unacknowledged record
+                is overwritten.
+            record_size: Bytes per record, payload limit is 8 less.
+            ack_every: Persist the tail after this many advances.
+            retry_ms: Minimum time before resending the same record.
+        """
+        self.path = path
+        self.ack_path = path + ".ack"
+        self.slots = slots
+        self.record_size = record_size
+        self.max_payload = record_size - HEADER_SIZE
+        self.ack_every = ack_every
+        self.retry_ms = retry_ms
+
+        self._rec = bytearray(record_size)
+        self._acked = bytearray(slots)
+        self._sent_at = array('l', [0] * slots)
+        self._sent = bytearray(slots)
+        self._unsaved = 0
+        self.overwritten = 0
+
+        try:
+            self._f = open(path, "r+b")
+            if os.stat(path)[6] != slots * record_size:
+                raise OSError("size mismatch")
+        except OSError:
+            self._f = open(path, "w+b")
+            # Preallocate once; records are then only rewritten in place
+            zero = bytes(record_size)
+            for _ in range(slots):
+                self._f.write(zero)
+            self._f.flush()
+        self._recover()
+
+    def _slot(self, seq):
+        return seq % self.slots
+
+    def _read(self, slot):
+        """Payload of a slot as (seq, payload), or None if invalid."""
+        f = self._f
+        f.seek(slot * self.record_size)
+        rec = f.read(self.record_size)
+        if len(rec) < HEADER_SIZE or rec[0] != MAGIC:
+            return None
+        n = rec[1]
+        if n > self.max_payload:
+            return None
+        seq = (rec[2] << 24) | (rec[3] << 16) | (rec[4] << 8) | rec[5]
+        if crc16(rec[HEADER_SIZE:HEADER_SIZE + n], crc16(rec[0:6])) != (rec[6] << 8) | rec[7]:
+            return None
+        return seq, rec[HEADER_SIZE:HEADER_SIZE + n]
+
+    def _recover(self):
+        head = 0
+        for slot in range(self.slots):
+            item = self._read(slot)
+            if item is not None and item[0] + 1 > head:
+                head = item[0] + 1
+        self.head = head
+        tail = 0
+        try:
+            with open(self.ack_path, "rb") as f:
+                raw = f.read(6)
+            if len(raw) == 6 and crc16(raw[0:4]) == (raw[4] << 8) | raw[5]:
+                tail = (raw[0] << 24) | (raw[1] << 16) | (raw[2] << 8) | raw[3]
+        except OSError:
+            pass
+        if tail > head:
+            tail = head
+        if tail < head - self.slots:
+            tail = head - self.slots
+        self.tail = tail
+        self._drain = tail
+        # Slots without a valid record in the pending range count as acked
+        for seq in range(tail, head):
+            item = self._read(self._slot(seq))
+            if item is None or item[0] != seq:
+                self._acked[self._slot(seq)] = 1
+        self._advance_tail()
+
+    def pending(self):
+        """Number of records not yet acknowledged (upper bound)."""
+        return self.head - self.tail
+
+    def append(self, payload):
+        """Store one payload and return its sequence number.
+
+        Raises:
+            ValueError: If the payload exceeds ``max_payload`` bytes.
+        """
+        if isinstance(payload, str):
+            payload = payload.encode()
+        n = len(payload)
+        if n > self.max_payload:
+            raise ValueError("payload too long for the ring record")
+        seq = self.head
+        if seq - self.tail >= self.slots:
+            # Full: drop the oldest unacknowledged record
+            self.tail += 1
+            self.overwritten += 1
+            self._advance_tail()
+        slot = self._slot(seq)
+        rec = self._rec
+        rec[0] = MAGIC
+        rec[1] = n
+        rec[2] = (seq >> 24) & 0xFF
+        rec[3] = (seq >> 16) & 0xFF
+        rec[4] = (seq >> 8) & 0xFF
+        rec[5] = seq & 0xFF
+        rec[HEADER_SIZE:HEADER_SIZE + n] = payload
+        crc = crc16(memoryview(rec)[HEADER_SIZE:HEADER_SIZE + n], crc16(memoryview(rec)[0:6]))
+        rec[6] = crc >> 8
+        rec[7] = crc & 0xFF
+        f = self._f
+        f.seek(slot * self.record_size)
+        f.write(memoryview(rec)[:HEADER_SIZE + n])
+        f.flush()
+        self._acked[slot] = 0
+        self._sent[slot] = 0
+        self.head = seq + 1
+        return seq
+
+    def mark_sent(self, seq, now_ms=None):
+        """Record that ``seq`` went on air (delays its resend by retry_ms)."""
+        if self.tail <= seq < self.head:
+            slot = self._slot(seq)
+            self._sent[slot] = 1
+            self._sent_at[slot] = ticks_ms() if now_ms is None else now_ms
+
+    def ack(self, seq, bits=32):
+        """Mark ``seq`` delivered.
+
+        Args:
+            seq: Acknowledged sequence number.
+            bits: Width of ``seq`` when the frame only carried its low bits
+                (16 for delta frames); it is matched to the closest record.
+        """
+        seq = self._resolve(seq, bits)
+        if not self.tail <= seq < self.head:
+            return False
+        self._acked[self._slot(seq)] = 1
+        self._advance_tail()
+        return True
+
+    def ack_range(self, first, last, bits=32):
+        """Mark ``first`` to ``last`` (inclusive) delivered.
+
+        Args:
+            first: First acknowledged sequence number.
+            last: Last acknowledged sequence number.
+            bits: Width of the sequence numbers, as in ``ack``.
+
+        Returns:
+            Number of records newly acknowledged.
+        """
+        first = self._resolve(first, bits)
+        if bits < 32:
+            last = first + ((last - first) & ((1 << bits) - 1))
+        acked = self._acked
+        n = 0
+        for seq in range(max(first, self.tail), min(last + 1, self.head)):
+            slot = self._slot(seq)
+            if not acked[slot]:
+                acked[slot] = 1
+                n += 1
+        if n:
+            self._advance_tail()
+        return n
+
+    def _resolve(self, seq, bits):
+        # Only the low ``bits`` were sent: pick the closest record at or before the head
+        if bits < 32:
+            mask = (1 << bits) - 1
+            seq = self.head - 1 - ((self.head - 1 - seq) & mask)
+        return seq
+
+    def _advance_tail(self):
+        moved = 0
+        acked = self._acked
+        while self.tail < self.head and acked[self._slot(self.tail)]:
+            self.tail += 1
+            moved += 1
+        if self._drain < self.tail:
+            self._drain = self.tail
+        if moved:
+            self._unsaved += moved
+            if self._unsaved >= self.ack_every:
+                self.save()
+
+    def next_to_drain(self, now_ms=None):
+        """Next unacknowledged record due for (re)transmission.
+
+        Walks the pending range round-robin, skipping acknowledged records
+        and those sent less than ``retry_ms`` ago; call it at the rate the
+        backlog may use the channel.
+
+        Returns:
+            ``(seq, payload)`` (already marked as sent) or None.
+        """
+        if self.tail >= self.head:
+            return None
+        if now_ms is None:
+            now_ms = ticks_ms()
+        seq = self._drain
+        for _ in range(self.head - self.tail):
+            if seq >= self.head:
+                seq = self.tail
+            slot = self._slot(seq)
+            if not self._acked[slot] and (
+                    not self._sent[slot]
+                    or ticks_diff(now_ms, self._sent_at[slot]) >= self.retry_ms):
+                item = self._read(slot)
+                self._drain = seq + 1
+                if item is None or item[0] != seq:
+                    self._acked[slot] = 1
+                    self._advance_tail()
+                    return None
+                self.mark_sent(seq, now_ms)
+                return item
+            seq += 1
+        return None
+
+    def save(self):
+        """Persist the tail cursor (temp file + rename)."""
+        t = self.tail
+        raw = bytearray(6)
+        raw[0] = (t >> 24) & 0xFF
+        raw[1] = (t >> 16) & 0xFF
+        raw[2] = (t >> 8) & 0xFF
+        raw[3] = t & 0xFF
+        crc = crc16(raw[0:4])
+        raw[4] = crc >> 8
+        raw[5] = crc & 0xFF
+        tmp = self.ack_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        try:
+            os.rename(tmp, self.ack_path)
+        except OSError:
+            # Some ports refuse to rename over an existing file
+            os.remove(self.ack_path)
+            os.rename(tmp, self.ack_path)
+        self._unsaved = 0
+
+    def close(self):
+        self.save()
+        self._f.close()
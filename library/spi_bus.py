@@ -0,0 +1,165 @@
+"""
+Shared SPI bus arbitration for several devices on one SPI instance.
+
+Each device brackets its chip-select transactions with ``acquire``/``release``
+so only one of them drives the bus at a time. Work requested from interrupt
+handlers goes through ``defer`` and runs as soon as the bus is free, instead
+of issuing SPI transfers in the middle of another device's transaction.
+
+Example:
+    from spi_bus import SPIBus
+    from sx127x import LoRa
+
+    bus = SPIBus(spi)
+    radio_a = LoRa(spi, cs_pin=18, reset_pin=14, dio0_pin=26, bus=bus)
+    radio_b = LoRa(spi, cs_pin=17, reset_pin=16, dio0_pin=4, bus=bus)
+"""
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+
+class _FlagLock:
+    """Minimal lock for ports built without ``_thread``.
+
+    Without threads the only contender is interrupt code, which never blocks,
+    so a blocking acquire of a held lock is a programming error.
+    """
+
+    def __init__(self):
+        self._locked = False
+
+    def acquire(self, waitflag=1):
+        if self._locked:
+            if waitflag:
+                raise RuntimeError('SPI bus busy')
+            return False
+        self._locked = True
+        return True
+
+    def release(self):
+        self._locked = False
+
+
+def _get_ident():
+    return _thread.get_ident() if _thread else 0
+
+
+class SPIBus:
+    def __init__(self, spi, max_pending=8):
+        """Wrap an SPI object shared by several chip-select devices.
+
+        Args:
+            spi: Configured SPI object shared by all devices.
+            max_pending: Size of the deferred-work queue. Work requested while
+                the queue is full is dropped and counted in ``dropped``.
+        """
+        self.spi = spi
+        self._lock = _thread.allocate_lock() if _thread else _FlagLock()
+        self._owner = None
+        self._owner_ident = None
+        self._depth = 0
+
+        # Deferred work ring: written by interrupt code (tail), consumed by
+        # whoever holds the bus (head).
+        self._devices = [None] * (max_pending + 1)
+        self._funcs = [None] * (max_pending + 1)
+        self._head = 0
+        self._tail = 0
+
+        self.dropped = 0
+        self.last_error = None
+
+    def acquire(self, device):
+        """Take ownership of the bus for a device, blocking until free.
+
+        Re-entrant for the device (and thread) that already owns the bus, so
+        a multi-register operation can wrap the single-register helpers.
+
+        Args:
+            device: Object identifying the device (usually the driver).
+        """
+        ident = _get_ident()
+        if self._owner is device and self._owner_ident == ident:
+            self._depth += 1
+            return
+        self._lock.acquire()
+        self._owner = device
+        self._owner_ident = ident
+        self._depth = 1
+
+    def release(self, device):
+        """Release one level of ownership and run deferred work if any.
+
+        Args:
+            device: Device that called ``acquire``.
+        """
+        self._depth -= 1
+        if self._depth:
+            return
+        self._owner = None
+        self._owner_ident = None
+        self._lock.release()
+        if self._head != self._tail:
+            self.run_pending()
+
+    def is_busy(self):
+        """Check whether some device currently owns the bus.
+
+        Returns:
+            True if the bus is owned, False otherwise.
+        """
+        return self._owner is not None
+
+    def defer(self, device, func):
+        """Queue work for a device and run it as soon as the bus is free.
+
+        Safe to call from interrupt handlers: it never blocks. A request that
+        is already queued for the same device is coalesced.
+
+        Args:
+            device: Device the work belongs to.
+            func: Callable taking no arguments, run while owning the bus.
+        """
+        size = len(self._funcs)
+        i = self._head
+        while i != self._tail:
+            if self._devices[i] is device and self._funcs[i] is func:
+                break
+            i = (i + 1) % size
+        else:
+            tail = (self._tail + 1) % size
+            if tail == self._head:
+                self.dropped += 1
+                return
+            self._devices[self._tail] = device
+            self._funcs[self._tail] = func
+            self._tail = tail
+        self.run_pending()
+
+    def run_pending(self):
+        """Run queued work while the bus can be taken without blocking."""
+        size = len(self._funcs)
+        while self._head != self._tail and self._lock.acquire(0):
+            try:
+                while self._head != self._tail:
+                    head = self._head
+                    device = self._devices[head]
+                    func = self._funcs[head]
+                    self._devices[head] = None
+                    self._funcs[head] = None
+                    self._head = (head + 1) % size
+                    self._owner = device
+                    self._owner_ident = _get_ident()
+                    self._depth = 1
+                    try:
+                        func()
+                    except Exception as e:
+                        self.last_error = e
+            finally:
+                self._owner = None
+                self._owner_ident = None
+                self._depth = 0
+                self._lock.release()
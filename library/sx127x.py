@@ -1,13 +1,110 @@
 """
 MicroPython LoRa SX127x Library
 Supports SX1276/77/78/79 chips for long-range wireless communication
+
+Register addresses, masks and modes are ``const()`` module constants: the
+compiler inlines them (no attribute lookup) and, being underscore-prefixed,
+they take no RAM at runtime. The module can be precompiled with
+``mpy-cross`` or frozen into the firmware (``library/manifest.py``).
+
+Packets move through the FIFO in one SPI burst per direction. Converting
+the payload to a string uses the viper check in ``fastpath.py`` when the
+port has the native emitters, and a pure Python loop otherwise.
 """
 
 import time
 from machine import SPI, Pin #ignore # noqa: F401
 
+try:
+    from micropython import const
+except ImportError:  # CPython
+    def const(x):
+        return x
+
+try:
+    from fastpath import is_ascii as _is_ascii
+except (ImportError, SyntaxError, ValueError):  # CPython, or no native emitter
+    _is_ascii = None
+
+# SX127x register addresses
+_REG_RSSI_VALUE = const(0x1A)
+_RSSI_OFFSET = const(157)
+_TX_BASE_ADDR = const(0x00)
+_RX_BASE_ADDR = const(0x00)
+_REG_FIFO = const(0x00)
+_REG_OP_MODE = const(0x01)
+_REG_FRF_MSB = const(0x06)
+_REG_FRF_MID = const(0x07)
+_REG_FRF_LSB = const(0x08)
+_REG_PA_CONFIG = const(0x09)
+_REG_LNA = const(0x0c)
+_REG_FIFO_ADDR_PTR = const(0x0d)
+_REG_FIFO_TX_BASE_ADDR = const(0x0e)
+_REG_FIFO_RX_BASE_ADDR = const(0x0f)
+_REG_FIFO_RX_CURRENT_ADDR = const(0x10)
+_REG_IRQ_FLAGS = const(0x12)
+_REG_RX_NB_BYTES = const(0x13)
+_REG_PKT_RSSI_VALUE = const(0x1a)
+_REG_PKT_SNR_VALUE = const(0x19)
+_REG_MODEM_CONFIG_1 = const(0x1d)
+_REG_MODEM_CONFIG_2 = const(0x1e)
+_REG_PREAMBLE_MSB = const(0x20)
+_REG_PREAMBLE_LSB = const(0x21)
+_REG_PAYLOAD_LENGTH = const(0x22)
+_REG_MODEM_CONFIG_3 = const(0x26)
+_REG_DETECTION_OPTIMIZE = const(0x31)
+_REG_DETECTION_THRESHOLD = const(0x37)
+_REG_SYNC_WORD = const(0x39)
+_REG_DIO_MAPPING_1 = const(0x40)
+_REG_VERSION = const(0x42)
+_REG_PA_DAC = const(0x4d)
+
+# Interrupt flags
+_IRQ_RX_DONE_MASK = const(0x40)
+_IRQ_TX_DONE_MASK = const(0x08)
+_IRQ_PAYLOAD_CRC_ERROR_MASK = const(0x20)
+
+# Operating modes
+_MODE_RX_SINGLE = const(0x06)
+_MODE_LORA = const(0x80)
+_MODE_SLEEP = const(0x00)
+_MODE_STDBY = const(0x01)
+_MODE_TX = const(0x03)
+_MODE_RX_CONTINUOUS = const(0x05)
+
+MAX_PKT_LENGTH = const(255)
+
+# First byte of a FIFO burst: register address with the read/write bit
+_FIFO_READ = b'\x00'
+_FIFO_WRITE = b'\x80'
+
+
+def payload_str(payload):
+    """Payload bytes as a string, one character per byte (Latin-1).
+
+    Args:
+        payload: Bytes read from the FIFO.
+
+    Returns:
+        String of ``len(payload)`` characters.
+    """
+    # ASCII decodes the same as Latin-1, without a str object per byte
+    if _is_ascii is not None and _is_ascii(payload, len(payload)):
+        return payload.decode()
+    return ''.join([chr(byte) for byte in payload])
+
+
 class LoRa:
-    def __init__(self, spi, cs_pin, reset_pin, dio0_pin):
+    # Fixed attribute set: no per-instance dict on CPython
+    __slots__ = (
+        "spi", "bus", "cs", "reset_pin", "dio0", "_irq_work",
+        "packet_received", "received_payload", "received_raw", "last_payload",
+        "received_rssi", "received_snr", "crc_error", "last_crc_error",
+        "last_receive_time", "receive_delay",
+        "frequency", "bandwidth", "spreading_factor",
+    )
+
+    def __init__(self, spi, cs_pin, reset_pin, dio0_pin, bus=None):
         """Initialize LoRa module with SPI interface and control pins.
         
         Args:
@@ -15,73 +112,37 @@ class LoRa:
             cs_pin: GPIO pin number for chip select (CS/NSS).
             reset_pin: GPIO pin number for hardware reset.
             dio0_pin: GPIO pin number for DIO0 interrupt.
+            bus: Optional SPIBus wrapping ``spi`` when the SPI instance is
+                shared with other devices. Register access is then serialized
+                through the bus and interrupt work is deferred until it is free.
         """
         self.spi = spi
+        self.bus = bus
         self.cs = Pin(cs_pin, Pin.OUT)
         self.reset_pin = Pin(reset_pin, Pin.OUT)
         self.dio0 = Pin(dio0_pin, Pin.IN)
         
         # Set up interrupt handler for packet reception
+        self._irq_work = self.check_for_packet
         self.dio0.irq(trigger=Pin.IRQ_RISING, handler=self._irq_recv)
         
         # Packet reception state
         self.packet_received = False
         self.received_payload = None
+        self.received_raw = None
         self.last_payload = None
         self.received_rssi = None
+        self.received_snr = None
         self.crc_error = False
         self.last_crc_error = False
         
         self.last_receive_time = 0
         self.receive_delay = 2
         
-        # SX127x register addresses
-        self.REG_RSSI_VALUE = 0x1A
-        self.RSSI_OFFSET = 157
-        self.TX_BASE_ADDR = 0x00
-        self.RX_BASE_ADDR = 0x00
-        self.REG_FIFO = 0x00
-        self.REG_OP_MODE = 0x01
-        self.REG_FRF_MSB = 0x06
-        self.REG_FRF_MID = 0x07
-        self.REG_FRF_LSB = 0x08
-        self.REG_PA_CONFIG = 0x09
-        self.REG_LNA = 0x0c
-        self.REG_FIFO_ADDR_PTR = 0x0d
-        self.REG_FIFO_TX_BASE_ADDR = 0x0e
-        self.REG_FIFO_RX_BASE_ADDR = 0x0f
-        self.REG_FIFO_RX_CURRENT_ADDR = 0x10
-        self.REG_IRQ_FLAGS = 0x12
-        self.REG_RX_NB_BYTES = 0x13
-        self.REG_PKT_RSSI_VALUE = 0x1a
-        self.REG_PKT_SNR_VALUE = 0x1b
-        self.REG_MODEM_CONFIG_1 = 0x1d
-        self.REG_MODEM_CONFIG_2 = 0x1e
-        self.REG_PREAMBLE_MSB = 0x20
-        self.REG_PREAMBLE_LSB = 0x21
-        self.REG_PAYLOAD_LENGTH = 0x22
-        self.REG_MODEM_CONFIG_3 = 0x26
-        self.REG_DETECTION_OPTIMIZE = 0x31
-        self.REG_DETECTION_THRESHOLD = 0x37
-        self.REG_SYNC_WORD = 0x39
-        self.REG_DIO_MAPPING_1 = 0x40
-        self.REG_VERSION = 0x42
-        self.REG_PA_DAC = 0x4d
-        
-        # Interrupt flags
-        self.IRQ_RX_DONE_MASK = 0x40
-        self.IRQ_TX_DONE_MASK = 0x08
-        self.IRQ_PAYLOAD_CRC_ERROR_MASK = 0x20
-        
-        # Operating modes
-        self.MODE_RX_SINGLE = 0x06
-        self.MODE_LORA = 0x80
-        self.MODE_SLEEP = 0x00
-        self.MODE_STDBY = 0x01
-        self.MODE_TX = 0x03
-        self.MODE_RX_CONTINUOUS = 0x05
-        
-        self.MAX_PKT_LENGTH = 255
+        # Current radio settings (recorded by the setters)
+        self.frequency = None
+        self.bandwidth = None
+        self.spreading_factor = None
         
         self.init_lora()
 
@@ -105,7 +166,7 @@ class LoRa:
         
         # Verify chip version (should be 0x12 for SX127x)
         while init_try and re_try < 5:
-            version = self.read_register(self.REG_VERSION)
+            version = self.read_register(_REG_VERSION)
             re_try = re_try + 1
             if version != 0:
                 init_try = False
@@ -121,37 +182,69 @@ class LoRa:
         self.set_tx_power(17, use_pa_boost=True)
         self.enable_crc()  # Enable CRC by default
         # Set FIFO base addresses
-        self.write_register(self.REG_FIFO_TX_BASE_ADDR, self.TX_BASE_ADDR)
-        self.write_register(self.REG_FIFO_RX_BASE_ADDR, self.RX_BASE_ADDR)
+        self.write_register(_REG_FIFO_TX_BASE_ADDR, _TX_BASE_ADDR)
+        self.write_register(_REG_FIFO_RX_BASE_ADDR, _RX_BASE_ADDR)
         
         # Enable LNA gain
-        self.write_register(self.REG_LNA, self.read_register(self.REG_LNA) | 0x03)
-        self.write_register(self.REG_MODEM_CONFIG_3, 0x04)
+        self.write_register(_REG_LNA, self.read_register(_REG_LNA) | 0x03)
+        self.write_register(_REG_MODEM_CONFIG_3, 0x04)
         self.set_mode_standby()
         self.set_mode_rx_continuous()
-        self.write_register(self.REG_DIO_MAPPING_1, 0x00)
+        self.write_register(_REG_DIO_MAPPING_1, 0x00)
         print("Lora Conected")
     
     def send(self, data):
-        """Send data string via LoRa.
+        """Send data via LoRa.
         
         Args:
-            data: String data to transmit (max 255 bytes).
+            data: String or bytes-like data to transmit (max 255 bytes).
+                A string is sent one byte per character (Latin-1), as
+                ``payload_str`` reads it back.
+
+        Raises:
+            ValueError: If the payload is longer than 255 bytes or a
+                character is beyond Latin-1.
         """
-        self.set_mode_standby()
-        self.write_register(self.REG_FIFO_ADDR_PTR, self.TX_BASE_ADDR)
-        
-        # Write payload to FIFO
-        for byte in data:
-            self.write_register(self.REG_FIFO, ord(byte))
-        self.write_register(self.REG_PAYLOAD_LENGTH, len(data))
-        self.set_mode_tx()
-        
-        # Wait for transmission to complete
-        while not (self.read_register(self.REG_IRQ_FLAGS) & self.IRQ_TX_DONE_MASK):
+        if isinstance(data, str):
+            encoded = data.encode()
+            if len(encoded) != len(data):
+                # Not ASCII; MicroPython's encode() ignores 'latin-1'
+                codes = [ord(c) for c in data]
+                if max(codes) > 0xFF:
+                    raise ValueError('Payload characters must be Latin-1')
+                encoded = bytes(codes)
+            data = encoded
+        if len(data) > MAX_PKT_LENGTH:
+            raise ValueError('Payload longer than 255 bytes')
+        bus = self.bus
+        if bus:
+            bus.acquire(self)
+        try:
+            self.set_mode_standby()
+            if bus:
+                # A packet whose interrupt is still deferred would be
+                # overwritten by the TX payload (TX and RX share the FIFO)
+                self._read_packet()
+            self.write_register(_REG_FIFO_ADDR_PTR, _TX_BASE_ADDR)
+            
+            self.write_fifo(data)
+            self.write_register(_REG_PAYLOAD_LENGTH, len(data))
+            self.set_mode_tx()
+        finally:
+            if bus:
+                bus.release(self)
+        
+        # Wait for transmission to complete (bus is free between polls)
+        while not (self.read_register(_REG_IRQ_FLAGS) & _IRQ_TX_DONE_MASK):
             time.sleep(0.01)
-        self.write_register(self.REG_IRQ_FLAGS, self.IRQ_TX_DONE_MASK)
-        self.set_mode_rx_continuous()
+        if bus:
+            bus.acquire(self)
+        try:
+            self.write_register(_REG_IRQ_FLAGS, _IRQ_TX_DONE_MASK)
+            self.set_mode_rx_continuous()
+        finally:
+            if bus:
+                bus.release(self)
 
     def _irq_recv(self, pin):
         """Interrupt handler for packet reception.
@@ -159,7 +252,11 @@ class LoRa:
         Args:
             pin: Pin object that triggered the interrupt.
         """
-        self.check_for_packet()
+        if self.bus:
+            # Another device may be mid-transaction: run once the bus is free
+            self.bus.defer(self, self._irq_work)
+        else:
+            self.check_for_packet()
         
     def check_for_packet(self):
         """Check and process received packet.
@@ -167,19 +264,30 @@ class LoRa:
         Reads the packet from FIFO if available and updates internal state.
         Checks for CRC errors and marks packets accordingly.
         """
-        irq_flags = self.read_register(self.REG_IRQ_FLAGS)
+        bus = self.bus
+        if bus:
+            bus.acquire(self)
+        try:
+            self._read_packet()
+        finally:
+            if bus:
+                bus.release(self)
+
+    def _read_packet(self):
+        """Read the FIFO and update reception state (bus already held)."""
+        irq_flags = self.read_register(_REG_IRQ_FLAGS)
         
         # Check for CRC error
-        if irq_flags & self.IRQ_PAYLOAD_CRC_ERROR_MASK:
+        if irq_flags & _IRQ_PAYLOAD_CRC_ERROR_MASK:
             self.crc_error = True
             self.last_crc_error = True
             # Clear CRC error flag
-            self.write_register(self.REG_IRQ_FLAGS, self.IRQ_PAYLOAD_CRC_ERROR_MASK)
+            self.write_register(_REG_IRQ_FLAGS, _IRQ_PAYLOAD_CRC_ERROR_MASK)
             return
         
-        if irq_flags & self.IRQ_RX_DONE_MASK:
+        if irq_flags & _IRQ_RX_DONE_MASK:
             # Check if packet has CRC error (double check)
-            if irq_flags & self.IRQ_PAYLOAD_CRC_ERROR_MASK:
+            if irq_flags & _IRQ_PAYLOAD_CRC_ERROR_MASK:
                 self.crc_error = True
                 self.last_crc_error = True
             else:
@@ -187,51 +295,53 @@ class LoRa:
                 self.last_crc_error = False
             
             # Read packet from FIFO
-            current_addr = self.read_register(self.REG_FIFO_RX_CURRENT_ADDR)
-            self.write_register(self.REG_FIFO_ADDR_PTR, current_addr)
-            packet_length = self.read_register(self.REG_RX_NB_BYTES)
-            payload = [self.read_register(self.REG_FIFO) for _ in range(packet_length)]
-            payload_string = ''.join([chr(byte) for byte in payload])
+            current_addr = self.read_register(_REG_FIFO_RX_CURRENT_ADDR)
+            self.write_register(_REG_FIFO_ADDR_PTR, current_addr)
+            packet_length = self.read_register(_REG_RX_NB_BYTES)
+            payload = self.read_fifo(packet_length)
+            payload_string = payload_str(payload)
             
             self.get_rssi()
+            self.get_snr()
             
             # Update reception state (only if no CRC error)
             if not self.crc_error:
                 self.packet_received = True
                 self.received_payload = payload_string
+                self.received_raw = payload
                 self.last_payload = payload_string
             
-            # Clear interrupt flags
-            self.write_register(self.REG_IRQ_FLAGS, self.IRQ_RX_DONE_MASK)
-            self.write_register(self.REG_IRQ_FLAGS, 0xFF)
+            # Clear interrupt flags, leaving TX_DONE to a send() in progress
+            self.write_register(_REG_IRQ_FLAGS, _IRQ_RX_DONE_MASK)
+            self.write_register(_REG_IRQ_FLAGS, 0xFF ^ _IRQ_TX_DONE_MASK)
         
     def set_mode_tx(self):
         """Set transmission mode.
         
         Places the module in transmit mode to send packets.
         """
-        self.write_register(self.REG_OP_MODE, self.MODE_LORA | self.MODE_TX)
+        self.write_register(_REG_OP_MODE, _MODE_LORA | _MODE_TX)
 
     def set_mode_rx_continuous(self):
         """Set continuous reception mode.
         
         Places the module in continuous receive mode to listen for packets.
         """
-        self.write_register(self.REG_OP_MODE, self.MODE_LORA | self.MODE_RX_CONTINUOUS)
+        self.write_register(_REG_OP_MODE, _MODE_LORA | _MODE_RX_CONTINUOUS)
 
     def set_mode_sleep(self):
         """Set sleep mode for low power consumption.
         
         Places the module in sleep mode to minimize power consumption.
         """
-        self.write_register(self.REG_OP_MODE, self.MODE_LORA | self.MODE_SLEEP)
+        self.write_register(_REG_OP_MODE, _MODE_LORA | _MODE_SLEEP)
 
     def set_mode_standby(self):
         """Set standby mode.
         
         Places the module in standby mode, ready for configuration changes.
         """
-        self.write_register(self.REG_OP_MODE, self.MODE_LORA | self.MODE_STDBY)
+        self.write_register(_REG_OP_MODE, _MODE_LORA | _MODE_STDBY)
 
     def set_tx_power(self, power, use_pa_boost=False):
         """Set transmission power in dBm.
@@ -246,14 +356,14 @@ class LoRa:
             # Enable high power mode for +20dBm
             if power > 17:
                 power = 20
-                self.write_register(self.REG_PA_DAC, 0x87)  # Enable +20dBm
+                self.write_register(_REG_PA_DAC, 0x87)  # Enable +20dBm
             else:
-                self.write_register(self.REG_PA_DAC, 0x84)
+                self.write_register(_REG_PA_DAC, 0x84)
             power = max(2, min(power, 20))
-            self.write_register(self.REG_PA_CONFIG, 0x80 | (power - 2))
+            self.write_register(_REG_PA_CONFIG, 0x80 | (power - 2))
         else:
             power = max(0, min(power, 14))
-            self.write_register(self.REG_PA_CONFIG, 0x70 | power)
+            self.write_register(_REG_PA_CONFIG, 0x70 | power)
 
     def set_frequency(self, frequency):
         """Set carrier frequency in Hz.
@@ -262,10 +372,11 @@ class LoRa:
             frequency: Carrier frequency in Hz (e.g., 915E6 for 915 MHz).
                 Common values: 433E6, 868E6, 915E6.
         """
+        self.frequency = frequency
         frf = int(frequency / 61.03515625)
-        self.write_register(self.REG_FRF_MSB, (frf >> 16) & 0xFF)
-        self.write_register(self.REG_FRF_MID, (frf >> 8) & 0xFF)
-        self.write_register(self.REG_FRF_LSB, frf & 0xFF)
+        self.write_register(_REG_FRF_MSB, (frf >> 16) & 0xFF)
+        self.write_register(_REG_FRF_MID, (frf >> 8) & 0xFF)
+        self.write_register(_REG_FRF_LSB, frf & 0xFF)
 
     def set_bandwidth(self, bw):
         """Set signal bandwidth in Hz.
@@ -280,8 +391,9 @@ class LoRa:
             if bw <= bws[j]:
                 i = j
                 break
-        x = self.read_register(self.REG_MODEM_CONFIG_1) & 0x0f
-        self.write_register(self.REG_MODEM_CONFIG_1, x | (i << 4))
+        self.bandwidth = bws[i] if i < len(bws) else 500000
+        x = self.read_register(_REG_MODEM_CONFIG_1) & 0x0f
+        self.write_register(_REG_MODEM_CONFIG_1, x | (i << 4))
 
     def set_spreading_factor(self, sf):
         """Set spreading factor.
@@ -296,10 +408,11 @@ class LoRa:
         """
         if sf < 6 or sf > 12:
             raise ValueError('Spreading factor must be between 6-12')
-        self.write_register(self.REG_DETECTION_OPTIMIZE, 0xc5 if sf == 6 else 0xc3)
-        self.write_register(self.REG_DETECTION_THRESHOLD, 0x0c if sf == 6 else 0x0a)
-        reg2 = self.read_register(self.REG_MODEM_CONFIG_2)
-        self.write_register(self.REG_MODEM_CONFIG_2, (reg2 & 0x0f) | ((sf << 4) & 0xf0))
+        self.spreading_factor = sf
+        self.write_register(_REG_DETECTION_OPTIMIZE, 0xc5 if sf == 6 else 0xc3)
+        self.write_register(_REG_DETECTION_THRESHOLD, 0x0c if sf == 6 else 0x0a)
+        reg2 = self.read_register(_REG_MODEM_CONFIG_2)
+        self.write_register(_REG_MODEM_CONFIG_2, (reg2 & 0x0f) | ((sf << 4) & 0xf0))
         # Note: Low data rate optimization disabled (requires bandwidth context)
 
     def set_coding_rate(self, denom):
@@ -313,24 +426,24 @@ class LoRa:
         """
         denom = min(max(denom, 5), 8)
         cr = denom - 4
-        reg1 = self.read_register(self.REG_MODEM_CONFIG_1)
-        self.write_register(self.REG_MODEM_CONFIG_1, (reg1 & 0xf1) | (cr << 1))
+        reg1 = self.read_register(_REG_MODEM_CONFIG_1)
+        self.write_register(_REG_MODEM_CONFIG_1, (reg1 & 0xf1) | (cr << 1))
 
     def enable_crc(self):
         """Enable CRC checking on received packets.
         
         When enabled, packets with CRC errors will be rejected.
         """
-        reg2 = self.read_register(self.REG_MODEM_CONFIG_2)
-        self.write_register(self.REG_MODEM_CONFIG_2, reg2 | 0x04)
+        reg2 = self.read_register(_REG_MODEM_CONFIG_2)
+        self.write_register(_REG_MODEM_CONFIG_2, reg2 | 0x04)
 
     def disable_crc(self):
         """Disable CRC checking on received packets.
         
         When disabled, all packets will be accepted regardless of CRC status.
         """
-        reg2 = self.read_register(self.REG_MODEM_CONFIG_2)
-        self.write_register(self.REG_MODEM_CONFIG_2, reg2 & 0xFB)
+        reg2 = self.read_register(_REG_MODEM_CONFIG_2)
+        self.write_register(_REG_MODEM_CONFIG_2, reg2 & 0xFB)
 
     def has_crc_error(self):
         """Check if the last received packet had a CRC error.
@@ -347,9 +460,16 @@ class LoRa:
             reg: Register address to write to.
             value: Byte value to write.
         """
-        self.cs.value(0)
-        self.spi.write(bytearray([reg | 0x80, value]))
-        self.cs.value(1)
+        bus = self.bus
+        if bus:
+            bus.acquire(self)
+        try:
+            self.cs.value(0)
+            self.spi.write(bytearray([reg | 0x80, value]))
+            self.cs.value(1)
+        finally:
+            if bus:
+                bus.release(self)
 
     def read_register(self, reg):
         """Read value from SX127x register.
@@ -360,12 +480,62 @@ class LoRa:
         Returns:
             Byte value read from the register.
         """
-        self.cs.value(0)
-        self.spi.write(bytearray([reg & 0x7F]))
-        value = self.spi.read(1)
-        self.cs.value(1)
+        bus = self.bus
+        if bus:
+            bus.acquire(self)
+        try:
+            self.cs.value(0)
+            self.spi.write(bytearray([reg & 0x7F]))
+            value = self.spi.read(1)
+            self.cs.value(1)
+        finally:
+            if bus:
+                bus.release(self)
         return value[0]
 
+    def read_fifo(self, length):
+        """Read ``length`` bytes from the FIFO in one SPI burst.
+
+        The FIFO address pointer must already be set; the chip advances it
+        after every byte.
+
+        Args:
+            length: Number of bytes to read.
+
+        Returns:
+            Bytes read.
+        """
+        bus = self.bus
+        if bus:
+            bus.acquire(self)
+        try:
+            self.cs.value(0)
+            self.spi.write(_FIFO_READ)
+            data = self.spi.read(length)
+            self.cs.value(1)
+        finally:
+            if bus:
+                bus.release(self)
+        return data
+
+    def write_fifo(self, data):
+        """Write bytes to the FIFO in one SPI burst.
+
+        Args:
+            data: Bytes-like data, written from the FIFO address pointer.
+        """
+        bus = self.bus
+        if bus:
+            bus.acquire(self)
+        try:
+            self.cs.value(0)
+            self.spi.write(_FIFO_WRITE)
+            self.spi.write(data)
+            self.cs.value(1)
+        finally:
+            if bus:
+                bus.release(self)
+
     def reset_lora(self):
         """Hardware reset of the LoRa module.
         
@@ -390,20 +560,35 @@ class LoRa:
         Returns:
             RSSI value in dBm (negative number).
         """
-        rssi_value = self.read_register(self.REG_RSSI_VALUE)
-        self.received_rssi  = rssi_value - self.RSSI_OFFSET  
+        rssi_value = self.read_register(_REG_RSSI_VALUE)
+        self.received_rssi  = rssi_value - _RSSI_OFFSET  
         return self.received_rssi 
 
-    def get_packet(self, rssi=False, crc_info=False):
+    def get_snr(self):
+        """Get SNR value in dB of last received packet.
+        
+        Returns:
+            SNR value in dB (0.25 dB resolution, negative below noise floor).
+        """
+        snr_value = self.read_register(_REG_PKT_SNR_VALUE)
+        if snr_value > 127:
+            snr_value -= 256
+        self.received_snr = snr_value / 4
+        return self.received_snr
+
+    def get_packet(self, rssi=False, crc_info=False, snr=False, raw=False):
         """Retrieve received packet and clear reception state.
         
         Args:
             rssi: If True, include RSSI value in returned dictionary.
             crc_info: If True, include CRC error status in returned dictionary.
+            snr: If True, include SNR value in returned dictionary.
+            raw: If True, include the payload bytes as read from the FIFO.
         
         Returns:
             Dictionary with 'payload' key (always), 'rssi' key (if requested),
-            and 'crc_error' key (if requested).
+            'crc_error' key (if requested), 'snr' key (if requested) and
+            'raw' key (if requested).
             Returns None if no packet is available.
         """
         if self.packet_received:
@@ -417,9 +602,17 @@ class LoRa:
             if crc_info:
                 packet_info["crc_error"] = self.last_crc_error
             
+            if snr:
+                packet_info["snr"] = self.received_snr
+            
+            if raw:
+                packet_info["raw"] = self.received_raw
+            
             self.packet_received = False
             self.received_payload = None
+            self.received_raw = None
             self.received_rssi = None
+            self.received_snr = None
             return packet_info
         else:
             return None
\ No newline at end of file
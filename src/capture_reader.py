@@ -0,0 +1,136 @@
+"""
+Reader for the gateway binary captures (``library/capture.py``).
+
+The fixed-size index is memory-mapped as a NumPy structured array, so
+opening a capture reads nothing but the 16-byte header, and every column
+(time, RSSI, SNR, flags, SF, channel, payload offset/length) is a zero-copy
+strided view into the file. Payloads are sliced from the memory-mapped blob
+on demand.
+
+Usage:
+    from capture_reader import read_capture
+    cap = read_capture("ensayo_0.cap")
+    df = cap.to_dataframe()          # one row per frame
+    cap.payload(0)                   # raw bytes of the first frame
+"""
+
+import struct
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"LCAP"
+HEADER_SIZE = 16
+CHANNEL_STEP_HZ = 25000
+FLAG_CRC_ERROR = 0x01
+
+RECORD_DTYPE = np.dtype([
+    ("t_ms", "<u4"),
+    ("offset", "<u4"),
+    ("rssi", "<i2"),
+    ("channel", "<u2"),
+    ("length", "u1"),
+    ("snr_q", "i1"),
+    ("sf", "u1"),
+    ("flags", "u1"),
+])
+
+
+class Capture:
+    """Memory-mapped capture. Build it with ``read_capture``.
+
+    Attributes:
+        index: Structured array (``RECORD_DTYPE``) mapped from the .cap file.
+        blob: uint8 array mapped from the .bin file.
+        start: Capture start time (UTC pandas Timestamp).
+    """
+
+    def __init__(self, index, blob, start):
+        self.index = index
+        self.blob = blob
+        self.start = start
+
+    def __len__(self):
+        return len(self.index)
+
+    def payload(self, i):
+        """Raw payload of frame ``i`` as a read-only memoryview."""
+        rec = self.index[i]
+        off = int(rec["offset"])
+        return memoryview(self.blob[off:off + int(rec["length"])])
+
+    def t_ms(self):
+        """Milliseconds since the start as int64, with the u32 wraps undone."""
+        t = self.index["t_ms"].astype(np.int64)
+        # Records are in time order: every decrease is one 2^32 ms wrap
+        wraps = np.cumsum(np.diff(t, prepend=t[:1]) < 0)
+        return t + (wraps << 32)
+
+    def payloads(self):
+        """Every payload as ``bytes`` (copies; use ``payload(i)`` for views)."""
+        data = self.blob.tobytes()
+        offsets = self.index["offset"].tolist()
+        lengths = self.index["length"].tolist()
+        return [data[o:o + n] for o, n in zip(offsets, lengths)]
+
+    def to_dataframe(self, payloads=False):
+        """Frames as a DataFrame.
+
+        Args:
+            payloads: Add a ``payload`` column with the raw bytes (slower).
+
+        Returns:
+            DataFrame with fecha, t_ms, rssi, snr, crc_error, sf,
+            frequency_mhz, offset and length.
+        """
+        idx = self.index
+        t_ms = self.t_ms()
+        df = pd.DataFrame({
+            "fecha": self.start.tz_localize(None) + pd.to_timedelta(t_ms, unit="ms"),
+            "t_ms": t_ms,
+            "rssi": idx["rssi"],
+            "snr": idx["snr_q"] / 4.0,
+            "crc_error": (idx["flags"] & FLAG_CRC_ERROR).astype(bool),
+            "sf": idx["sf"],
+            "frequency_mhz": idx["channel"] * (CHANNEL_STEP_HZ / 1e6),
+            "offset": idx["offset"],
+            "length": idx["length"],
+        }, copy=False)
+        if payloads:
+            df["payload"] = self.payloads()
+        return df
+
+
+def read_capture(path):
+    """Open ``<name>.cap`` (and its ``<name>.bin``) without reading the frames.
+
+    A partially written last record (power loss) is ignored.
+
+    Raises:
+        ValueError: If the file is not a capture.
+    """
+    path = Path(path)
+    if path.suffix != ".cap":
+        path = path.with_suffix(".cap")
+    with path.open("rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[0:4] != MAGIC:
+        raise ValueError("%s is not a capture file" % path)
+    record_size = header[5]
+    if record_size != RECORD_DTYPE.itemsize:
+        raise ValueError("unsupported record size %d" % record_size)
+    (start_s,) = struct.unpack_from("<I", header, 8)
+
+    n = (path.stat().st_size - HEADER_SIZE) // record_size
+    if n > 0:
+        index = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n,))
+    else:
+        index = np.zeros(0, dtype=RECORD_DTYPE)
+
+    blob_path = path.with_suffix(".bin")
+    if blob_path.stat().st_size > 0:
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+    else:
+        blob = np.zeros(0, dtype=np.uint8)
+    return Capture(index, blob, pd.Timestamp(start_s, unit="s", tz="UTC"))
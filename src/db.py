@@ -0,0 +1,417 @@
+"""
+Shared database access for the ingestion and export scripts.
+
+``Database`` wraps PostgreSQL (credentials from ``.env``: HOST, PORT,
+DATABASE, USER, PASSWORD) or SQLite (local stand-in for tests) behind a
+small thread-safe connection pool: connections are reused across batches
+and queries, and one that fails with a connection error is discarded
+instead of going back to the pool.
+
+``MeasurementWriter`` inserts measurement batches (``COPY ... FROM STDIN`` on
+PostgreSQL, ``executemany`` on SQLite). When the database is unreachable (a
+connection error) the batch is appended to a local spool file instead of
+blocking the caller; the spool is replayed in one transaction, ahead of new
+rows, as soon as a write succeeds again. Delivery is at least once: a crash
+between the replay commit and the spool removal replays it again. A batch
+the database rejects (constraint, type, missing table) is not spooled but
+raised to the caller, and a spool whose replay is rejected is moved aside
+to ``<spool>.bad`` so it cannot block later writes.
+
+``BatchSizer`` picks the batch size that keeps a write near a latency
+target, and ``AsyncDatabase`` exposes the same operations to asyncio code
+(each call runs in a worker thread).
+
+Example:
+    db = Database.postgres()              # or Database.sqlite("data/ingest.db")
+    rows = db.query("SELECT * FROM sensor_types")
+    writer = MeasurementWriter(db, spool_path="data/spool/measurements.csv")
+    writer.write([("64", 1, 21.5, datetime.now())])
+"""
+
+import asyncio
+import csv
+import io
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+MEASUREMENTS_TABLE = "measurements"
+MEASUREMENT_COLUMNS = ("node_id", "sensor_type_id", "value", "timestamp")
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def postgres_params():
+    """Connection keyword arguments from the environment / ``.env``."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+    return {
+        "host": os.getenv("HOST"),
+        "port": os.getenv("PORT"),
+        "database": os.getenv("DATABASE"),
+        "user": os.getenv("USER"),
+        "password": os.getenv("PASSWORD"),
+    }
+
+
+def connect_postgres():
+    """New psycopg2 connection with the ``.env`` credentials."""
+    import psycopg2
+
+    return psycopg2.connect(**postgres_params())
+
+
+class Database:
+    """Connection pool over PostgreSQL or SQLite.
+
+    Build it with ``Database.postgres()`` or ``Database.sqlite(path)``.
+
+    Args:
+        connect: Callable returning a new DB-API connection.
+        backend: ``"postgres"`` or ``"sqlite"``.
+        max_connections: Connections open at once; ``connection()`` waits
+            for a free one beyond that.
+        disconnect_errors: Exception classes meaning the connection is dead.
+    """
+
+    def __init__(self, connect, backend, max_connections=4, disconnect_errors=()):
+        self._connect = connect
+        self.backend = backend
+        self.placeholder = "?" if backend == "sqlite" else "%s"
+        self.max_connections = max_connections
+        self.disconnect_errors = disconnect_errors
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._all = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def postgres(cls, max_connections=4, **params):
+        """Pool of PostgreSQL connections (``.env`` credentials by default)."""
+        import psycopg2
+
+        kwargs = postgres_params()
+        kwargs.update(params)
+        return cls(lambda: psycopg2.connect(**kwargs), "postgres", max_connections,
+                   (psycopg2.OperationalError, psycopg2.InterfaceError))
+
+    @classmethod
+    def sqlite(cls, path, max_connections=4):
+        """Pool of SQLite connections (one for ``:memory:``, which is per connection)."""
+        import sqlite3
+
+        if path == ":memory:":
+            max_connections = 1
+        return cls(lambda: sqlite3.connect(path, check_same_thread=False), "sqlite",
+                   max_connections)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; the transaction is committed on success.
+
+        On an exception the transaction is rolled back, and the connection
+        is closed if the error says it is unusable.
+        """
+        self._slots.acquire()
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                with self._lock:
+                    self._all.add(conn)
+            yield conn
+            conn.commit()
+        except BaseException as e:
+            if conn is not None:
+                if isinstance(e, self.disconnect_errors):
+                    self._discard(conn)
+                    conn = None
+                else:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        self._discard(conn)
+                        conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
+
+    def _discard(self, conn):
+        with self._lock:
+            self._all.discard(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def execute(self, sql, params=()):
+        """Run a statement in its own transaction; returns the row count."""
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, params)
+                return cur.rowcount
+            finally:
+                cur.close()
+
+    def query(self, sql, params=()):
+        """Rows of a query as dictionaries."""
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, params)
+                columns = [d[0] for d in cur.description]
+                return [dict(zip(columns, r)) for r in cur.fetchall()]
+            finally:
+                cur.close()
+
+    def ensure_measurements_table(self, table=MEASUREMENTS_TABLE):
+        """Create the measurements table on SQLite (PostgreSQL has its schema)."""
+        if self.backend == "sqlite":
+            self.execute(
+                "CREATE TABLE IF NOT EXISTS %s (measurement_id INTEGER PRIMARY KEY, "
+                "node_id TEXT, sensor_type_id INTEGER, value REAL, timestamp TEXT)" % table
+            )
+
+    def insert_measurements(self, conn, rows, table=MEASUREMENTS_TABLE):
+        """Insert ``(node_id, sensor_type_id, value, timestamp)`` rows on ``conn``."""
+        if self.backend == "postgres":
+            buf = io.StringIO()
+            csv.writer(buf).writerows(rows)
+            buf.seek(0)
+            with conn.cursor() as cur:
+                cur.copy_expert(
+                    "COPY %s (%s) FROM STDIN WITH (FORMAT csv)" % (table, ", ".join(MEASUREMENT_COLUMNS)),
+                    buf,
+                )
+        else:
+            conn.executemany(
+                "INSERT INTO %s (%s) VALUES (?, ?, ?, ?)" % (table, ", ".join(MEASUREMENT_COLUMNS)),
+                [(n, s, v, t.strftime(DATE_FORMAT) if isinstance(t, datetime) else t)
+                 for n, s, v, t in rows],
+            )
+
+    def close(self):
+        """Close every pooled connection."""
+        with self._lock:
+            conns, self._all = self._all, set()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class BatchSizer:
+    """Batch size keeping each write close to ``target_s`` seconds.
+
+    The throughput of every write (rows/s) is smoothed and the next size is
+    that throughput times the target, clamped to ``[min_size, max_size]``.
+    """
+
+    def __init__(self, target_s=0.5, min_size=100, max_size=20000, initial=1000, alpha=0.3):
+        self.target_s = target_s
+        self.min_size = min_size
+        self.max_size = max_size
+        self.alpha = alpha
+        self.size = initial
+        self._rate = None
+
+    def update(self, rows, elapsed):
+        """Account one write; returns the new batch size."""
+        if rows <= 0 or elapsed <= 0:
+            return self.size
+        rate = rows / elapsed
+        self._rate = rate if self._rate is None else self._rate + self.alpha * (rate - self._rate)
+        self.size = int(max(self.min_size, min(self.max_size, self._rate * self.target_s)))
+        return self.size
+
+
+class MeasurementWriter:
+    """Measurement batches to the database, spooled locally during outages.
+
+    ``write`` may be called from several threads (``AsyncDatabase``); the
+    calls are serialized so only one of them replays the spool.
+
+    Args:
+        db: Database to write to.
+        table: Measurements table.
+        spool_path: File holding batches that could not be written (CSV);
+            None disables spooling and ``write`` raises instead.
+        retry_interval: Seconds to keep spooling after a failure before
+            trying the database again.
+        rollups: Optional ``rollups.Rollups`` updated in the same
+            transaction as every insert.
+    """
+
+    def __init__(self, db, table=MEASUREMENTS_TABLE, spool_path=None, retry_interval=5.0,
+                 rollups=None):
+        self.db = db
+        self.table = table
+        self.spool_path = spool_path
+        self.retry_interval = retry_interval
+        self.rollups = rollups
+        self.spooled = 0
+        self.replayed = 0
+        self.quarantined = 0
+        self._retry_at = 0.0
+        # One write at a time: a replay reads and removes the whole spool
+        self._lock = threading.Lock()
+        db.ensure_measurements_table(table)
+        if rollups is not None:
+            rollups.ensure_tables(db)
+
+    def _insert(self, conn, rows):
+        self.db.insert_measurements(conn, rows, self.table)
+        if self.rollups is not None:
+            self.rollups.update(self.db, conn, rows)
+
+    def write(self, rows):
+        """Write one batch; returns False if it went to the spool.
+
+        Raises:
+            Exception: The database rejected the batch (anything but a
+                connection error); it is not spooled, since replaying it
+                would fail again.
+        """
+        with self._lock:
+            return self._write(rows)
+
+    def _write(self, rows):
+        if self.spool_path is None:
+            with self.db.connection() as conn:
+                self._insert(conn, rows)
+            return True
+        if time.monotonic() < self._retry_at:
+            self._spool(rows)
+            return False
+        try:
+            if os.path.exists(self.spool_path) and self._replay(rows):
+                return True
+            with self.db.connection() as conn:
+                self._insert(conn, rows)
+            return True
+        except self.db.disconnect_errors as e:
+            print(f"Base de datos no disponible ({e}); {len(rows)} filas al spool", file=sys.stderr)
+            self._retry_at = time.monotonic() + self.retry_interval
+            self._spool(rows)
+            return False
+
+    def _replay(self, rows):
+        """Replay the spool and ``rows`` in one transaction.
+
+        Returns:
+            True if both were written. False if the database rejected the
+            transaction: the spool is then written alone (or moved to
+            ``<spool>.bad`` if it is the part rejected) and ``rows`` is
+            left to the caller.
+        """
+        pending = self._pending_spool()
+        try:
+            with self.db.connection() as conn:
+                self._insert(conn, pending)
+                self._insert(conn, rows)
+        except self.db.disconnect_errors:
+            raise
+        except Exception:
+            try:
+                with self.db.connection() as conn:
+                    self._insert(conn, pending)
+            except self.db.disconnect_errors:
+                raise
+            except Exception as e:
+                self._quarantine(pending, e)
+                return False
+            self._replayed(pending)
+            return False
+        self._replayed(pending)
+        return True
+
+    def _replayed(self, pending):
+        os.remove(self.spool_path)
+        self.replayed += len(pending)
+        print(f"Reenviadas {len(pending)} filas del spool", file=sys.stderr)
+
+    def _quarantine(self, pending, error):
+        bad_path = self.spool_path + ".bad"
+        with open(self.spool_path, "rb") as src, open(bad_path, "ab") as dst:
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(self.spool_path)
+        self.quarantined += len(pending)
+        print(f"Spool rechazado por la base ({error}); {len(pending)} filas movidas a {bad_path}",
+              file=sys.stderr)
+
+    def _pending_spool(self):
+        if not os.path.exists(self.spool_path):
+            return None
+        rows = []
+        with open(self.spool_path, "r", newline="", encoding="utf-8") as f:
+            for r in csv.reader(f):
+                # A line torn by a crash while spooling is skipped
+                if len(r) != 4:
+                    continue
+                try:
+                    rows.append((r[0], int(r[1]), float(r[2]), datetime.strptime(r[3], DATE_FORMAT)))
+                except ValueError:
+                    continue
+        return rows
+
+    def _spool(self, rows):
+        folder = os.path.dirname(self.spool_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.spool_path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(
+                (n, s, v, t.strftime(DATE_FORMAT) if isinstance(t, datetime) else t)
+                for n, s, v, t in rows
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        self.spooled += len(rows)
+
+    def close(self):
+        self.db.close()
+
+
+class AsyncDatabase:
+    """asyncio front end of a ``Database``; every call runs in a thread.
+
+    Example:
+        adb = AsyncDatabase(Database.postgres())
+        rows = await adb.query("SELECT * FROM device_nodes")
+        await adb.write_measurements(rows)
+    """
+
+    def __init__(self, db, table=MEASUREMENTS_TABLE, spool_path=None):
+        self.db = db
+        self.writer = MeasurementWriter(db, table, spool_path)
+
+    async def execute(self, sql, params=()):
+        return await asyncio.to_thread(self.db.execute, sql, params)
+
+    async def query(self, sql, params=()):
+        return await asyncio.to_thread(self.db.query, sql, params)
+
+    async def write_measurements(self, rows):
+        return await asyncio.to_thread(self.writer.write, rows)
+
+    async def close(self):
+        await asyncio.to_thread(self.db.close)
@@ -0,0 +1,223 @@
+"""
+Deduplication and reordering of frames heard by several gateways.
+
+Frames are keyed by (node, sequence). Each node keeps a bitmap ring of the
+last ``window`` sequence numbers already released, so memory per node is
+``window / 8`` bytes plus the frames being held, however long the node
+runs. A frame is held for ``latency`` seconds: copies arriving from other
+gateways in that time replace it when their RSSI is better, and frames of a
+node are released in sequence order. Copies of a frame already released
+(late duplicates, or node resends after a reboot of ``library/ring_log.py``)
+are dropped.
+
+Sequences are compared modulo 2**16, the width carried by delta frames, so
+JSON readings (32-bit counter) and delta frames of one node share a key
+space. A sequence far behind the window means the node restarted its
+counter: its state is reset and the frame accepted.
+
+Example:
+    dedup = Deduplicator(window=1024, latency=2.0)
+    for item in dedup.push(item, node_id, seq, rssi):
+        write(item)
+    for item in dedup.poll():         # periodically
+        write(item)
+"""
+
+import heapq
+import time
+
+SEQ_MOD = 1 << 16
+_HALF = SEQ_MOD // 2
+
+
+class _NodeState:
+    __slots__ = ("released", "top", "heap", "held", "last_seen")
+
+    def __init__(self, window):
+        self.released = bytearray(window // 8)
+        self.top = None       # highest unwrapped sequence accepted
+        self.heap = []        # [seq, deadline, rssi, item] ordered by seq
+        self.held = {}        # seq -> heap entry
+        self.last_seen = 0.0
+
+
+class Deduplicator:
+    """(node, seq) dedup window plus a per-node reorder buffer.
+
+    Args:
+        window: Sequence numbers remembered per node (multiple of 8, below
+            32768).
+        latency: Seconds a frame is held waiting for better copies and
+            earlier sequences; 0 releases frames immediately (dedup only).
+        max_nodes: Nodes tracked; the one heard from least recently (with no
+            held frames) is forgotten first.
+    """
+
+    def __init__(self, window=1024, latency=2.0, max_nodes=4096):
+        if window % 8 or not 0 < window < _HALF:
+            raise ValueError("window must be a multiple of 8 below 32768")
+        self.window = window
+        self.latency = latency
+        self.max_nodes = max_nodes
+        self._nodes = {}
+        self.accepted = 0
+        self.duplicates = 0
+        self.replaced = 0
+        self.late = 0
+        self.resets = 0
+        self.evicted = 0
+
+    def __len__(self):
+        """Frames currently held."""
+        return sum(len(s.heap) for s in self._nodes.values())
+
+    def _state(self, node, now):
+        state = self._nodes.get(node)
+        if state is None:
+            if len(self._nodes) >= self.max_nodes:
+                self._evict()
+            state = _NodeState(self.window)
+            self._nodes[node] = state
+        state.last_seen = now
+        return state
+
+    def _evict(self):
+        idle = [(s.last_seen, n) for n, s in self._nodes.items() if not s.heap]
+        if idle:
+            del self._nodes[min(idle)[1]]
+            self.evicted += 1
+
+    def _is_released(self, state, seq):
+        i = seq % self.window
+        return state.released[i >> 3] & (1 << (i & 7))
+
+    def _mark_released(self, state, seq):
+        i = seq % self.window
+        state.released[i >> 3] |= 1 << (i & 7)
+
+    def _advance(self, state, seq):
+        """Move the window top to ``seq``, clearing the slots it reuses."""
+        top = state.top
+        if seq - top >= self.window:
+            state.released[:] = bytes(len(state.released))
+        else:
+            window = self.window
+            released = state.released
+            for s in range(top + 1, seq + 1):
+                i = s % window
+                released[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+        state.top = seq
+
+    def push(self, item, node, seq, rssi=None, now=None):
+        """Offer one frame.
+
+        Args:
+            item: Opaque object released as is.
+            node: Node identifier.
+            seq: Frame sequence number, or None (released immediately).
+            rssi: Reception RSSI; the strongest copy is kept.
+            now: Current time in seconds (``time.monotonic()`` by default).
+
+        Returns:
+            List of items released by this call (due frames of the node).
+        """
+        if seq is None:
+            self.accepted += 1
+            return [item]
+        if now is None:
+            now = time.monotonic()
+        state = self._state(node, now)
+        seq %= SEQ_MOD
+        if state.top is None:
+            state.top = seq
+        else:
+            d = (seq - state.top) % SEQ_MOD
+            if d >= _HALF:
+                d -= SEQ_MOD
+            seq = state.top + d
+            if d > 0:
+                self._advance(state, seq)
+            elif d <= -self.window:
+                # Counter restarted on the node: drop its history
+                self.resets += 1
+                released = self._drain(state)
+                state.released[:] = bytes(len(state.released))
+                state.top = seq
+                self._hold(state, seq, rssi, item, now)
+                return released + self._due(state, now)
+
+        entry = state.held.get(seq)
+        if entry is not None:
+            self.duplicates += 1
+            if rssi is not None and (entry[2] is None or rssi > entry[2]):
+                entry[2] = rssi
+                entry[3] = item
+                self.replaced += 1
+        elif self._is_released(state, seq):
+            self.duplicates += 1
+            self.late += 1
+        else:
+            self._hold(state, seq, rssi, item, now)
+        return self._due(state, now)
+
+    def _hold(self, state, seq, rssi, item, now):
+        entry = [seq, now + self.latency, rssi, item]
+        heapq.heappush(state.heap, entry)
+        state.held[seq] = entry
+        self.accepted += 1
+
+    def _due(self, state, now):
+        """Release the node's frames, in sequence order, whose hold expired."""
+        heap = state.heap
+        out = []
+        while heap and heap[0][1] <= now:
+            entry = heapq.heappop(heap)
+            self._release(state, entry)
+            out.append(entry[3])
+        return out
+
+    def _drain(self, state):
+        heap = state.heap
+        out = []
+        while heap:
+            entry = heapq.heappop(heap)
+            self._release(state, entry)
+            out.append(entry[3])
+        return out
+
+    def _release(self, state, entry):
+        seq = entry[0]
+        del state.held[seq]
+        # A frame held while the window moved past it has no slot left
+        if state.top - seq < self.window:
+            self._mark_released(state, seq)
+
+    def poll(self, now=None):
+        """Release every held frame whose hold expired (call periodically)."""
+        if now is None:
+            now = time.monotonic()
+        out = []
+        for state in self._nodes.values():
+            if state.heap and state.heap[0][1] <= now:
+                out.extend(self._due(state, now))
+        return out
+
+    def flush(self):
+        """Release every held frame (on shutdown)."""
+        out = []
+        for state in self._nodes.values():
+            out.extend(self._drain(state))
+        return out
+
+    def snapshot(self):
+        """Counters: frames accepted, duplicates dropped or replaced, etc."""
+        return {
+            "nodes": len(self._nodes),
+            "held": len(self),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "replaced": self.replaced,
+            "late": self.late,
+            "resets": self.resets,
+            "evicted": self.evicted,
+        }
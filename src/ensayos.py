@@ -0,0 +1,141 @@
+"""
+Loader for the gateway test recordings (``ensayos/<distancia>M_<nombre>.txt``).
+
+Each file holds the JSON lines written by ``examples/test_receiver.py``
+(``fecha``, ``mensaje_recibido``, ``rssi``). Files are parsed in parallel, one
+process per file, with pandas' vectorized JSON-lines reader, and the combined
+table is cached next to the recordings as Parquet, keyed by the name, size
+and mtime of every file, so reloading an unchanged directory is a single
+columnar read.
+
+Usage:
+    from ensayos import load_ensayos
+    df_ensayos = load_ensayos("../ensayos")
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+ENSAYOS_DIR = Path("ensayos")
+CACHE_NAME = ".ensayos_cache.parquet"
+CACHE_KEY = b"ensayos_fingerprint"
+
+COLUMNS = ["archivo", "distancia", "nombre", "fecha", "rssi", "mensaje_recibido"]
+
+
+def parse_name(path):
+    """Split ``100M_antena_chica.txt`` into ``("100M", 100, "antena_chica")``."""
+    distancia, nombre = Path(path).stem.split("_", 1)
+    return distancia, int(distancia.rstrip("Mm")), nombre
+
+
+def read_ensayo(path):
+    """Parse one recording into a DataFrame (raw columns plus file metadata)."""
+    path = Path(path)
+    try:
+        df = pd.read_json(path, lines=True, dtype=False, convert_dates=False)
+    except ValueError:
+        # Blank or truncated lines (e.g. power loss mid-write): parse line by line
+        records = []
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        df = pd.DataFrame.from_records(records)
+    for column in ("fecha", "mensaje_recibido", "rssi"):
+        if column not in df:
+            df[column] = pd.NA
+
+    _, distancia_m, nombre = parse_name(path)
+    df["archivo"] = path.name.lower()
+    df["distancia"] = distancia_m
+    df["nombre"] = nombre
+    return df
+
+
+def _fingerprint(files):
+    return json.dumps([[f.name, f.stat().st_size, f.stat().st_mtime_ns] for f in files])
+
+
+def _read_cache(cache_path, fingerprint):
+    import pyarrow.parquet as pq
+
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+    except (OSError, ValueError):
+        return None
+    if metadata.get(CACHE_KEY) != fingerprint.encode():
+        return None
+    return pd.read_parquet(cache_path)
+
+
+def _write_cache(cache_path, df, fingerprint):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[CACHE_KEY] = fingerprint.encode()
+    pq.write_table(table.replace_schema_metadata(metadata), cache_path)
+
+
+def normalize(df):
+    """Apply the notebook's cleaning to the concatenated raw records.
+
+    Parses ``fecha``, normalizes ``nombre`` ("antena_chica" -> "antena chica"),
+    and replaces ``mensaje_recibido`` with the transmitter counter extracted
+    from ``"Envio #N"`` (nullable integer).
+    """
+    df = df.assign(
+        fecha=pd.to_datetime(df["fecha"], errors="coerce"),
+        distancia=df["distancia"].astype("Int64"),
+        nombre=df["nombre"].astype(str).str.replace("_", " ", regex=False).str.lower(),
+        mensaje_recibido=pd.to_numeric(
+            df["mensaje_recibido"].astype(str).str.extract(r"(\d+)", expand=False),
+            errors="coerce",
+        ).astype("Int64"),
+    )
+    return df[COLUMNS].sort_values(["distancia", "nombre", "fecha"]).reset_index(drop=True)
+
+
+def load_ensayos(directory=ENSAYOS_DIR, workers=None, cache=True):
+    """Load every ``*.txt`` recording of a directory into one DataFrame.
+
+    Args:
+        directory: Directory with the ``<distancia>M_<nombre>.txt`` files.
+        workers: Processes used to parse files (None = one per CPU,
+            1 = parse in this process).
+        cache: Read/write the Parquet cache in the directory.
+
+    Returns:
+        DataFrame with columns archivo, distancia, nombre, fecha, rssi and
+        mensaje_recibido (transmitter counter), sorted by distance, name and
+        date.
+    """
+    directory = Path(directory)
+    files = sorted(directory.glob("*.txt"))
+    if not files:
+        return pd.DataFrame(columns=COLUMNS)
+
+    cache_path = directory / CACHE_NAME
+    fingerprint = _fingerprint(files)
+    if cache:
+        cached = _read_cache(cache_path, fingerprint)
+        if cached is not None:
+            return cached
+
+    if workers == 1 or len(files) == 1:
+        frames = [read_ensayo(f) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(read_ensayo, files))
+
+    df = normalize(pd.concat(frames, ignore_index=True))
+    if cache:
+        _write_cache(cache_path, df, fingerprint)
+    return df
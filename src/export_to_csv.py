@@ -1,40 +1,534 @@
 import os
+import re
 import csv
-import psycopg2
-from dotenv import load_dotenv
+import sys
+import json
+import time
+import argparse
+from psycopg2 import sql
 
-load_dotenv()
-
-HOST = os.getenv("HOST")
-PORT = os.getenv("PORT")
-DATABASE = os.getenv("DATABASE")
-USER = os.getenv("USER")
-PASSWORD = os.getenv("PASSWORD")
+from db import Database
 
 TABLE_NAME = "device_nodes"
+MEASUREMENTS_TABLE = "measurements"
+OUTPUT_DIR = "data/raw"
+STATE_FILE = "_watermark.json"
+NULL_PARTITION = "undated"
+MAX_OPEN_PARTITIONS = 32
+COLUMNAR_DIR = "data/columnar"
 
+CHUNK_SIZE = 10000
+PROGRESS_EVERY = 100000
 
-def export_table_to_csv():
-    conn = psycopg2.connect(
-        host=HOST, port=PORT, database=DATABASE, user=USER, password=PASSWORD
-    )
-    cur = conn.cursor()
-    cur.execute(f"SELECT * FROM {TABLE_NAME}")
-    rows = cur.fetchall()
-    colnames = [desc[0] for desc in cur.description]
 
-    os.makedirs("data/raw", exist_ok=True)
-    output_path = f"data/raw/{TABLE_NAME}.csv"
+class Progress:
+    """Prints rows exported and throughput every ``every`` rows."""
+
+    def __init__(self, label, every=PROGRESS_EVERY):
+        self.label = label
+        self.every = every
+        self.rows = 0
+        self._next = every
+        self._t0 = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self._t0
+
+    def rate(self):
+        elapsed = self.elapsed()
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def add(self, n):
+        self.rows += n
+        if self.every and self.rows >= self._next:
+            self._next += self.every
+            print(f"{self.label}: {self.rows} filas ({self.rate():.0f} filas/s)", file=sys.stderr)
+
+    def done(self):
+        print(
+            f"{self.label}: {self.rows} filas en {self.elapsed():.1f} s ({self.rate():.0f} filas/s)",
+            file=sys.stderr,
+        )
+
+
+class _CountingWriter:
+    """File wrapper counting lines written by ``COPY ... TO STDOUT``."""
+
+    def __init__(self, f, progress):
+        self._f = f
+        self._progress = progress
+
+    def write(self, data):
+        self._progress.add(data.count("\n"))
+        return self._f.write(data)
 
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(colnames)
+
+def stream_rows(conn, query, params=None, chunk_size=CHUNK_SIZE, name="export_stream"):
+    """Run ``query`` on a named server-side cursor and yield row chunks.
+
+    Only ``chunk_size`` rows are held in memory at a time.
+
+    Returns:
+        Generator of ``(colnames, rows)`` tuples.
+    """
+    with conn.cursor(name=name) as cur:
+        cur.itersize = chunk_size
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            # Named cursors only fill description after the first fetch
+            yield [desc[0] for desc in cur.description], rows
+
+
+def _write_with_cursor(conn, table, f, chunk_size, progress):
+    writer = csv.writer(f)
+    query = sql.SQL("SELECT * FROM {}").format(sql.Identifier(table))
+    header_written = False
+    for colnames, rows in stream_rows(conn, query, chunk_size=chunk_size):
+        if not header_written:
+            writer.writerow(colnames)
+            header_written = True
         writer.writerows(rows)
+        progress.add(len(rows))
+    if not header_written:
+        # Empty table: still emit the header
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("SELECT * FROM {} LIMIT 0").format(sql.Identifier(table)))
+            writer.writerow([desc[0] for desc in cur.description])
+
+
+def _write_with_copy(conn, table, f, progress):
+    query = sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER true)").format(
+        sql.Identifier(table)
+    )
+    with conn.cursor() as cur:
+        cur.copy_expert(query.as_string(conn), _CountingWriter(f, progress))
+    # The header line was counted as a row
+    progress.rows -= 1
+
+
+def export_table_to_csv(table=TABLE_NAME, output_path=None, method="cursor",
+                        chunk_size=CHUNK_SIZE, db=None):
+    """Export a table to CSV with constant memory.
+
+    Args:
+        table: Table to export.
+        output_path: Destination file (default ``data/raw/<table>.csv``).
+        method: ``"cursor"`` streams through a named server-side cursor in
+            ``chunk_size`` rows; ``"copy"`` uses ``COPY ... TO STDOUT``.
+        chunk_size: Rows fetched per round trip with ``method="cursor"``.
+        db: ``Database`` to borrow the connection from (a one-connection
+            pool is opened and closed here if None).
 
-    cur.close()
-    conn.close()
+    Returns:
+        Number of rows exported.
+    """
+    if method not in ("cursor", "copy"):
+        raise ValueError(f"Unknown export method: {method}")
+
+    own_db = db is None
+    if own_db:
+        db = Database.postgres(max_connections=1)
+
+    if output_path is None:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        output_path = f"{OUTPUT_DIR}/{table}.csv"
+
+    progress = Progress(table)
+    try:
+        with db.connection() as conn, open(output_path, "w", newline="", encoding="utf-8") as f:
+            if method == "copy":
+                _write_with_copy(conn, table, f, progress)
+            else:
+                _write_with_cursor(conn, table, f, chunk_size, progress)
+    finally:
+        if own_db:
+            db.close()
+
+    progress.done()
     print(f"Exportado a {output_path}")
+    return progress.rows
+
+
+def _load_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"watermark": None, "rows": 0, "files": {}}
+
+
+def _save_state(path, state):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _rollback_partitions(output_dir, files, prefix):
+    """Truncate partitions to their committed size and drop uncommitted ones.
+
+    Undoes whatever a crashed run appended after the last saved state, so
+    re-running never duplicates rows. Only this table's partition files
+    (``<prefix>_YYYY-MM-DD*.csv`` and ``<prefix>_undated.csv``) are
+    touched; other files in ``output_dir`` are left alone.
+    """
+    pattern = re.compile(r"%s_(\d{4}-\d{2}-\d{2}.*|%s)\.csv$" % (re.escape(prefix), NULL_PARTITION))
+    for name in os.listdir(output_dir):
+        if not pattern.match(name):
+            continue
+        path = os.path.join(output_dir, name)
+        if name not in files:
+            os.remove(path)
+        elif os.path.getsize(path) != files[name]:
+            with open(path, "r+b") as f:
+                f.truncate(files[name])
+
+
+class _Partitions:
+    """Append-mode CSV files per day, with a bounded number kept open."""
+
+    def __init__(self, output_dir, prefix, colnames):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.colnames = colnames
+        self.touched = set()
+        self._open = {}
+
+    def writer(self, day):
+        entry = self._open.pop(day, None)
+        if entry is None:
+            if len(self._open) >= MAX_OPEN_PARTITIONS:
+                oldest = next(iter(self._open))
+                self._close(self._open.pop(oldest))
+            name = f"{self.prefix}_{day}.csv"
+            f = open(os.path.join(self.output_dir, name), "a", newline="", encoding="utf-8")
+            entry = (f, csv.writer(f))
+            if f.tell() == 0:
+                entry[1].writerow(self.colnames)
+            self.touched.add(name)
+        self._open[day] = entry  # most recently used last
+        return entry[1]
+
+    def _close(self, entry):
+        f = entry[0]
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+
+    def close(self):
+        for entry in self._open.values():
+            self._close(entry)
+        self._open.clear()
+
+
+def export_incremental(table=MEASUREMENTS_TABLE, key="measurement_id", ts_column="timestamp",
+                       output_dir=None, chunk_size=CHUNK_SIZE, db=None):
+    """Append rows newer than the stored high-water mark to daily CSV files.
+
+    Rows with ``key`` above the watermark are streamed in key order and
+    appended to ``<output_dir>/<table>_<YYYY-MM-DD>.csv`` by the date of
+    ``ts_column`` (``<table>_undated.csv`` when it is NULL). The watermark and the committed size of every partition
+    are saved atomically in ``_watermark.json`` only after the files are
+    synced and the row count has been checked against the database, so a
+    crashed run is rolled back on the next one and nothing is duplicated or
+    skipped.
+
+    Rows committed later with a key below the watermark (e.g. long-running
+    inserts holding an earlier serial value) are not picked up.
+
+    Args:
+        table: Table to export.
+        key: Monotonic column used as watermark (primary key or timestamp).
+        ts_column: Timestamp column used to choose the daily partition.
+        output_dir: Directory for partitions and state
+            (default ``data/raw/<table>``).
+        chunk_size: Rows fetched per round trip.
+        db: ``Database`` to borrow the connection from (a one-connection
+            pool is opened and closed here if None).
+
+    Returns:
+        Number of rows appended.
+
+    Raises:
+        RuntimeError: If the rows written do not match the database count
+            for the exported key range (the run is rolled back).
+    """
+    if output_dir is None:
+        output_dir = os.path.join(OUTPUT_DIR, table)
+    os.makedirs(output_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, STATE_FILE)
+    state = _load_state(state_path)
+    _rollback_partitions(output_dir, state["files"], table)
+
+    own_db = db is None
+    if own_db:
+        db = Database.postgres(max_connections=1)
+
+    watermark = state["watermark"]
+    table_id = sql.Identifier(table)
+    key_id = sql.Identifier(key)
+    if watermark is None:
+        query = sql.SQL("SELECT * FROM {} ORDER BY {}").format(table_id, key_id)
+        params = None
+    else:
+        query = sql.SQL("SELECT * FROM {} WHERE {} > %s ORDER BY {}").format(
+            table_id, key_id, key_id
+        )
+        params = (watermark,)
+
+    progress = Progress(f"{table} (incremental)")
+    partitions = None
+    last_key = None
+    try:
+        with db.connection() as conn:
+            for colnames, rows in stream_rows(conn, query, params, chunk_size, name="export_incremental"):
+                if partitions is None:
+                    partitions = _Partitions(output_dir, table, colnames)
+                    key_idx = colnames.index(key)
+                    ts_idx = colnames.index(ts_column)
+                for row in rows:
+                    ts = row[ts_idx]
+                    day = NULL_PARTITION if ts is None else ts.date().isoformat()
+                    partitions.writer(day).writerow(row)
+                last_key = rows[-1][key_idx]
+                progress.add(len(rows))
+            if partitions is not None:
+                partitions.close()
+
+            if progress.rows:
+                # No gaps: every row in (watermark, last_key] must have been written
+                count_query = sql.SQL("SELECT count(*) FROM {} WHERE {} <= %s").format(table_id, key_id)
+                count_params = (last_key,)
+                if watermark is not None:
+                    count_query = sql.SQL("SELECT count(*) FROM {} WHERE {} > %s AND {} <= %s").format(
+                        table_id, key_id, key_id
+                    )
+                    count_params = (watermark, last_key)
+                with conn.cursor() as cur:
+                    cur.execute(count_query, count_params)
+                    expected = cur.fetchone()[0]
+                if expected != progress.rows:
+                    raise RuntimeError(
+                        f"Incremental export of {table}: wrote {progress.rows} rows, "
+                        f"database has {expected} in ({watermark}, {last_key}]"
+                    )
+    except BaseException:
+        if partitions is not None:
+            partitions.close()
+        _rollback_partitions(output_dir, state["files"], table)
+        raise
+    finally:
+        if own_db:
+            db.close()
+
+    if progress.rows:
+        files = dict(state["files"])
+        for name in partitions.touched:
+            files[name] = os.path.getsize(os.path.join(output_dir, name))
+        state = {
+            "table": table,
+            "key": key,
+            "watermark": last_key if isinstance(last_key, int) else str(last_key),
+            "rows": state["rows"] + progress.rows,
+            "files": files,
+        }
+        _save_state(state_path, state)
+
+    progress.done()
+    print(f"Exportado incremental a {output_dir} (watermark: {state['watermark']})")
+    return progress.rows
+
+
+def measurements_schema():
+    """Arrow schema of exported measurements (partition column ``date`` last)."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("measurement_id", pa.int64()),
+        ("timestamp", pa.timestamp("ms")),
+        ("node_id", pa.dictionary(pa.int16(), pa.string())),
+        ("sensor_type_id", pa.int16()),
+        ("value", pa.float32()),
+        ("date", pa.string()),
+    ])
+
+
+def _partitioning(node_id_type=None):
+    """Hive ``date=.../node_id=...`` partitioning.
+
+    Writing passes the dictionary type of the exported batches. Reading
+    declares ``node_id`` as a string: a dictionary partition field would
+    need its dictionary up front, and ``load_measurements`` makes the
+    column categorical afterwards.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(
+        pa.schema([("date", pa.string()), ("node_id", node_id_type or pa.string())]),
+        flavor="hive",
+    )
+
+
+def _dataset_format(fmt):
+    if fmt not in ("parquet", "feather"):
+        raise ValueError(f"Unknown columnar format: {fmt}")
+    return "ipc" if fmt == "feather" else "parquet"
+
+
+def export_measurements_columnar(table=MEASUREMENTS_TABLE, output_dir=None, fmt="parquet",
+                                 chunk_size=CHUNK_SIZE * 10, db=None):
+    """Export measurements to a typed, partitioned Parquet or Feather dataset.
+
+    Rows are streamed from a server-side cursor and converted chunk by chunk
+    to Arrow record batches with an explicit schema (``node_id`` dictionary
+    encoded, ``sensor_type_id`` int16, ``value`` float32, ``timestamp`` in
+    ms), then written as ``date=YYYY-MM-DD/node_id=<id>/`` hive partitions.
+    Loading needs no text parsing or type inference; Feather (Arrow IPC)
+    files are additionally memory-mapped by ``load_measurements``.
+
+    Args:
+        table: Measurements table to export.
+        output_dir: Dataset root (default ``data/columnar/<table>``).
+        fmt: ``"parquet"`` or ``"feather"``.
+        chunk_size: Rows per record batch.
+        db: ``Database`` to borrow the connection from (a one-connection
+            pool is opened and closed here if None).
+
+    Returns:
+        Number of rows exported.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    file_format = _dataset_format(fmt)
+    if output_dir is None:
+        output_dir = os.path.join(COLUMNAR_DIR, table)
+    schema = measurements_schema()
+
+    own_db = db is None
+    if own_db:
+        db = Database.postgres(max_connections=1)
+
+    query = sql.SQL(
+        "SELECT measurement_id, timestamp, node_id::text, sensor_type_id, value, "
+        "timestamp::date::text AS date FROM {}"
+    ).format(sql.Identifier(table))
+    progress = Progress(f"{table} ({fmt})")
+
+    def batches(conn):
+        for _, rows in stream_rows(conn, query, chunk_size=chunk_size, name="export_columnar"):
+            columns = list(zip(*rows))
+            arrays = [
+                pa.array(columns[i], type=field.type)
+                if not pa.types.is_dictionary(field.type)
+                else pa.array(columns[i], type=pa.string()).dictionary_encode().cast(field.type)
+                for i, field in enumerate(schema)
+            ]
+            progress.add(len(rows))
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    try:
+        with db.connection() as conn:
+            ds.write_dataset(
+                batches(conn),
+                output_dir,
+                schema=schema,
+                format=file_format,
+                partitioning=_partitioning(schema.field("node_id").type),
+                existing_data_behavior="delete_matching",
+                basename_template="part-{i}." + ("feather" if fmt == "feather" else "parquet"),
+            )
+    finally:
+        if own_db:
+            db.close()
+
+    progress.done()
+    print(f"Exportado a {output_dir}")
+    return progress.rows
+
+
+def load_measurements(path=None, start=None, end=None, node_ids=None, fmt="parquet",
+                      columns=None):
+    """Load an exported measurements dataset into pandas.
+
+    Partition pruning on ``date`` and ``node_id`` means only the files of the
+    requested range are opened.
+
+    Args:
+        path: Dataset root (default ``data/columnar/measurements``).
+        start: First date to include, ``"YYYY-MM-DD"`` (inclusive).
+        end: Last date to include, ``"YYYY-MM-DD"`` (inclusive).
+        node_ids: Optional iterable of node ids to keep.
+        fmt: ``"parquet"`` or ``"feather"`` (memory-mapped).
+        columns: Optional subset of columns to read.
+
+    Returns:
+        DataFrame with ``node_id`` as categorical and typed numeric columns.
+    """
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    file_format = _dataset_format(fmt)
+    if path is None:
+        path = os.path.join(COLUMNAR_DIR, MEASUREMENTS_TABLE)
+    dataset = ds.dataset(
+        path,
+        format=file_format,
+        partitioning=_partitioning(),
+        filesystem=fs.LocalFileSystem(use_mmap=file_format == "ipc"),
+    )
+
+    expr = None
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field("date") >= start)
+    if end is not None:
+        conditions.append(ds.field("date") <= end)
+    if node_ids is not None:
+        conditions.append(ds.field("node_id").isin([str(n) for n in node_ids]))
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+
+    df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    if "node_id" in df:
+        df["node_id"] = df["node_id"].astype("category")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta una tabla de PostgreSQL a CSV")
+    parser.add_argument("--table", help=f"por defecto {TABLE_NAME} ({MEASUREMENTS_TABLE} con --incremental)")
+    parser.add_argument("--output", help="archivo (o directorio con --incremental)")
+    parser.add_argument("--method", choices=("cursor", "copy"), default="cursor")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--incremental", action="store_true",
+                        help="agregar solo filas nuevas en particiones diarias")
+    parser.add_argument("--key", default="measurement_id")
+    parser.add_argument("--ts-column", default="timestamp")
+    parser.add_argument("--format", choices=("csv", "parquet", "feather"), default="csv",
+                        help="parquet/feather: dataset columnar de mediciones")
+    args = parser.parse_args()
+
+    db = Database.postgres(max_connections=1)
+    try:
+        if args.format != "csv":
+            export_measurements_columnar(args.table or MEASUREMENTS_TABLE, args.output,
+                                         args.format, args.chunk_size * 10, db=db)
+        elif args.incremental:
+            export_incremental(args.table or MEASUREMENTS_TABLE, args.key, args.ts_column,
+                               args.output, args.chunk_size, db=db)
+        else:
+            export_table_to_csv(args.table or TABLE_NAME, args.output, args.method,
+                                args.chunk_size, db=db)
+    finally:
+        db.close()
 
 
 if __name__ == "__main__":
-    export_table_to_csv()
+    main()
@@ -0,0 +1,213 @@
+"""
+Frame router: parallel decoding of gateway records partitioned by node.
+
+The serial reader hands raw record lines to ``FrameRouter.put``. Each line is
+routed by a cheap scan for its node id (no JSON decoding in the reader) to
+one of ``workers`` decode workers, always the same one for a given node, so
+readings of a node are decoded in arrival order. Workers run
+``ingest_gateway.decode_record`` in threads or, to use several cores, in
+processes; lines travel in chunks to amortize the inter-process transfer.
+
+Every queue is bounded: when the workers or the database fall behind,
+``put`` blocks and the reader stops draining the serial port. A single
+collector thread takes the decoded chunks and passes them to the
+``IngestService`` (link statistics, batched writes); since each worker
+returns its chunks in order, per-node order is kept end to end.
+
+A line whose decoding raises is counted as skipped, like a line with no
+measurement. If a worker dies anyway (killed process, MemoryError), the
+lines routed to it are dropped and counted in ``lost`` instead of
+blocking the reader.
+
+Example:
+    service = IngestService(SQLiteSink("data/ingest.db")).start()
+    router = FrameRouter(service, workers=4, processes=True).start()
+    router.feed(serial_lines("/dev/ttyUSB0", 115200))
+    router.stop()
+    service.stop()
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import threading
+import zlib
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from ingest_gateway import decode_record
+
+# node_id inside the (JSON-escaped) payload: ..."mensaje_recibido": "{\"node_id\": \"64\", ...
+_NODE_RE = re.compile(r'node_id\\?"\s*:\s*\\?"?([^,"\\}]+)')
+_DELTA_MAGIC = 0xD0
+
+
+def route_key(line):
+    """Node id of a record line as a string ("" when it has none)."""
+    m = _NODE_RE.search(line)
+    if m is not None:
+        return m.group(1).strip()
+    # Delta frames carry the node id in their second byte
+    try:
+        mensaje = json.loads(line)["mensaje_recibido"]
+    except (ValueError, KeyError, TypeError):
+        return ""
+    if isinstance(mensaje, str) and len(mensaje) > 1 and ord(mensaje[0]) & 0xF0 == _DELTA_MAGIC:
+        return str(ord(mensaje[1]))
+    return ""
+
+
+# Seconds between liveness checks while waiting on a worker queue
+_POLL_INTERVAL = 0.5
+
+
+def _safe_decode(line):
+    try:
+        return decode_record(line)
+    except Exception:
+        return None
+
+
+def _decode_worker(inbox, outbox):
+    """Worker loop: decode chunks of lines until a None chunk arrives."""
+    while True:
+        chunk = inbox.get()
+        if chunk is None:
+            outbox.put(None)
+            return
+        outbox.put([_safe_decode(line) for line in chunk])
+
+
+class FrameRouter:
+    """Partition record lines by node over a pool of decode workers.
+
+    Args:
+        service: Started ``IngestService`` receiving the decoded rows.
+        workers: Number of decode workers.
+        processes: Use worker processes instead of threads.
+        chunk_size: Lines sent to a worker at once.
+        queue_chunks: Chunks buffered per worker before ``put`` blocks.
+        flush_interval: Maximum seconds a line waits for its chunk to fill.
+    """
+
+    def __init__(self, service, workers=4, processes=False, chunk_size=64,
+                 queue_chunks=16, flush_interval=0.2):
+        self.service = service
+        self.workers = workers
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        if processes:
+            ctx = multiprocessing.get_context()
+            self._inboxes = [ctx.Queue(maxsize=queue_chunks) for _ in range(workers)]
+            self._outbox = ctx.Queue(maxsize=queue_chunks * workers)
+            self._pool = [ctx.Process(target=_decode_worker, args=(q, self._outbox), daemon=True)
+                          for q in self._inboxes]
+        else:
+            self._inboxes = [queue.Queue(maxsize=queue_chunks) for _ in range(workers)]
+            self._outbox = queue.Queue(maxsize=queue_chunks * workers)
+            self._pool = [threading.Thread(target=_decode_worker, args=(q, self._outbox), daemon=True)
+                          for q in self._inboxes]
+        self._chunks = [[] for _ in range(workers)]
+        self._routes = {}
+        self.lost = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._ticker = threading.Thread(target=self._tick, daemon=True)
+
+    def start(self):
+        for w in self._pool:
+            w.start()
+        self._collector.start()
+        self._ticker.start()
+        return self
+
+    def worker_for(self, key):
+        """Worker index of a node id (stable across runs)."""
+        w = self._routes.get(key)
+        if w is None:
+            w = zlib.crc32(key.encode()) % self.workers
+            if len(self._routes) < 65536:
+                self._routes[key] = w
+        return w
+
+    def put(self, line):
+        """Route one record line, blocking while its worker is saturated."""
+        w = self.worker_for(route_key(line))
+        with self._lock:
+            self.service.lines += 1
+            chunk = self._chunks[w]
+            chunk.append(line)
+            if len(chunk) >= self.chunk_size:
+                self._chunks[w] = []
+                self._send(w, chunk)
+
+    def feed(self, lines):
+        """Route every line from an iterable of text lines."""
+        put = self.put
+        for line in lines:
+            put(line)
+
+    def flush(self):
+        """Send every partially filled chunk to its worker."""
+        with self._lock:
+            for w, chunk in enumerate(self._chunks):
+                if chunk:
+                    self._chunks[w] = []
+                    self._send(w, chunk)
+
+    def _send(self, w, chunk):
+        """Queue a chunk (or the None sentinel) for worker ``w``.
+
+        Blocks while the worker is busy; a chunk for a dead worker is dropped.
+        """
+        inbox = self._inboxes[w]
+        worker = self._pool[w]
+        while worker.is_alive():
+            try:
+                inbox.put(chunk, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+        if chunk is not None:
+            self.lost += len(chunk)
+            print(f"Decodificador {w} detenido: {len(chunk)} lineas perdidas", file=sys.stderr)
+
+    def stop(self):
+        """Decode what is pending and stop the workers.
+
+        The service is left running; stop it afterwards to flush its batches.
+        """
+        self._stopped.set()
+        self._ticker.join()
+        self.flush()
+        for w in range(self.workers):
+            self._send(w, None)
+        self._collector.join()
+        for w in self._pool:
+            w.join()
+
+    def _tick(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def _collect(self):
+        get = self._outbox.get
+        put_decoded = self.service.put_decoded
+        running = self.workers
+        while running:
+            try:
+                results = get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                # Workers that died never send their None
+                if not any(w.is_alive() for w in self._pool):
+                    return
+                continue
+            if results is None:
+                running -= 1
+                continue
+            for decoded in results:
+                put_decoded(decoded)
@@ -0,0 +1,527 @@
+"""
+Gateway ingestion service.
+
+Reads the JSON records the gateway (``examples/test_receiver.py``) prints on
+its USB serial port, decodes the node measurement carried in each payload
+(one JSON reading, or a batch of readings in a binary delta frame, see
+``library/delta_codec.py``) and writes the readings to the database in
+batched transactions (``COPY`` on PostgreSQL, ``executemany`` on the SQLite
+stand-in) through ``src/db.py``; with ``--spool`` batches are kept in a
+local file while the database is down.
+
+A bounded in-memory queue sits between the reader and the writer: when the
+database falls behind, the reader blocks on the queue and stops draining the
+serial port, so backpressure reaches the source instead of growing memory.
+With ``--workers`` the decoding is spread over threads or processes
+partitioned by node (``src/frame_router.py``).
+
+Usage:
+    python src/ingest_gateway.py --serial /dev/ttyUSB0
+    python src/ingest_gateway.py --input ensayo_0.txt --sqlite data/ingest.db
+    cat ensayo_0.txt | python src/ingest_gateway.py --input - --sqlite :memory:
+    python src/ingest_gateway.py --serial /dev/ttyUSB0 --workers 4 --processes
+    python src/ingest_gateway.py --serial /dev/ttyUSB0 /dev/ttyUSB1 --dedup
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "library"))
+from delta_codec import decode_frame, is_frame
+from link_stats import LinkStats
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db import BatchSizer, Database, MeasurementWriter
+from dedup import Deduplicator
+
+TABLE_NAME = "measurements"
+COLUMNS = ("node_id", "sensor_type_id", "value", "timestamp")
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Period of the nodes' ticks_ms() (ESP32), the clock of delta frame readings
+TICKS_PERIOD = 1 << 30
+# Longest span a delta frame's readings may cover; more means a corrupt
+# frame. Kept well below TICKS_PERIOD // 2 so wrapped differences are exact.
+MAX_FRAME_SPAN_MS = 3 * 24 * 3600 * 1000
+
+_STOP = object()
+
+
+def parse_line(line):
+    """Split one gateway record line into the record and its node payload.
+
+    Args:
+        line: Text line as written by the gateway, e.g.
+            ``{"fecha": "...", "mensaje_recibido": "{...}", "rssi": -60}``.
+
+    Returns:
+        Tuple ``(record, payload)`` of dictionaries, or None when the line is
+        not a record or its payload is neither JSON nor a delta frame. A
+        delta frame payload is the ``decode_frame()`` dictionary.
+    """
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        record = json.loads(line)
+        mensaje = record["mensaje_recibido"]
+        if is_frame(mensaje):
+            payload = decode_frame(mensaje)
+        else:
+            payload = json.loads(mensaje)
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    return record, payload
+
+
+def to_row(record, payload):
+    """Build a measurement row from a parsed record, or None if incomplete."""
+    try:
+        node_id = str(payload["node_id"])
+        sensor_type_id = int(payload["sensor_type_id"])
+        value = float(payload["value"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    try:
+        timestamp = datetime.strptime(record["fecha"], DATE_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        timestamp = datetime.now().replace(microsecond=0)
+    return (node_id, sensor_type_id, value, timestamp)
+
+
+def frame_rows(record, frame):
+    """Measurement rows of a delta frame.
+
+    Reading timestamps are node ``ticks_ms()`` values; they are placed
+    relative to the gateway arrival time, taking the last reading as sent
+    on arrival. Differences are taken modulo ``TICKS_PERIOD``, so a frame
+    spanning the wrap of the node's clock keeps its times. A frame with a
+    reading after the last one or more than ``MAX_FRAME_SPAN_MS`` before it
+    (garbage varints that passed the radio CRC) yields no rows.
+    """
+    try:
+        arrival = datetime.strptime(record["fecha"], DATE_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        arrival = datetime.now().replace(microsecond=0)
+    node_id = str(frame["node_id"])
+    sensor_type_id = frame["sensor_type_id"]
+    readings = frame["readings"]
+    if not readings:
+        return []
+    last_ms = readings[-1][0]
+    ages = []
+    for t, _ in readings:
+        age = (last_ms - t) & (TICKS_PERIOD - 1)
+        if age >= TICKS_PERIOD // 2:
+            age -= TICKS_PERIOD
+        if age < 0 or age > MAX_FRAME_SPAN_MS:
+            return []
+        ages.append(age)
+    return [
+        (node_id, sensor_type_id, value,
+         (arrival - timedelta(milliseconds=age)).replace(microsecond=0))
+        for (_, value), age in zip(readings, ages)
+    ]
+
+
+def arrival_ms(record):
+    """Gateway receive time of a record in ms (from ``fecha``), or None."""
+    try:
+        return int(datetime.strptime(record["fecha"], DATE_FORMAT).timestamp() * 1000)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def decode_record(line):
+    """Decode one gateway record line into all its measurement rows.
+
+    Returns:
+        Tuple ``(rows, seq, rssi, snr, arrival_ms)`` or None when the line
+        carries no measurement. ``rows`` is empty for a delta frame rejected
+        as corrupt (see ``frame_rows()``). ``arrival_ms`` is the gateway
+        receive time (see ``arrival_ms()``). The result only holds plain
+        values, so it can be returned from a worker process.
+    """
+    parsed = parse_line(line)
+    if parsed is None:
+        return None
+    record, payload = parsed
+    if "readings" in payload:
+        rows = frame_rows(record, payload)
+    else:
+        row = to_row(record, payload)
+        if row is None:
+            return None
+        rows = [row]
+    return rows, payload.get("seq"), record.get("rssi"), record.get("snr"), arrival_ms(record)
+
+
+def decode_line(line):
+    """Decode one gateway record line into a measurement row.
+
+    Returns:
+        Tuple ``(node_id, sensor_type_id, value, timestamp)`` or None when the
+        line is not a record or its payload is not a node measurement.
+    """
+    parsed = parse_line(line)
+    if parsed is None:
+        return None
+    return to_row(*parsed)
+
+
+class PostgresSink(MeasurementWriter):
+    """Writes batches to PostgreSQL with ``COPY ... FROM STDIN``."""
+
+    def __init__(self, table=TABLE_NAME, spool_path=None, rollups=None):
+        super().__init__(Database.postgres(max_connections=1), table, spool_path,
+                         rollups=rollups)
+
+
+class SQLiteSink(MeasurementWriter):
+    """Writes batches to a SQLite database (local stand-in for tests)."""
+
+    def __init__(self, path, table=TABLE_NAME, spool_path=None, rollups=None):
+        super().__init__(Database.sqlite(path, max_connections=1), table, spool_path,
+                         rollups=rollups)
+
+
+class IngestService:
+    """Bounded queue plus a writer thread flushing batches to a sink.
+
+    Args:
+        sink: Object with ``write(rows)`` and ``close()``.
+        batch_size: Maximum rows per transaction.
+        latency_target: Seconds a write should take; when set, the batch
+            size adapts to the measured throughput (up to ``batch_size``).
+        flush_interval: Maximum seconds a row waits before being written.
+        queue_size: Rows buffered in memory before ``put`` blocks.
+        retry_delay: Seconds to wait before retrying a failed batch.
+        max_attempts: Writes of a batch before giving up on it; the batch
+            is then appended to ``dead_letter`` and counted in
+            ``rows_failed``, so a permanent error (missing table, rejected
+            row) cannot stall the reader.
+        dead_letter: Optional CSV file receiving the batches given up on.
+        stats: Optional LinkStats updated with every decoded record, timed
+            by the record's gateway receive time (not when it is processed,
+            so replays and queue backlog do not distort the intervals).
+        registry: Optional NodeRegistry; readings are calibrated with their
+            sensor type scale/offset and unregistered nodes are counted.
+        dedup: Optional Deduplicator dropping copies of a (node, seq) heard
+            by several gateways and reordering each node's records.
+    """
+
+    def __init__(self, sink, batch_size=2000, flush_interval=1.0,
+                 queue_size=20000, retry_delay=1.0, stats=None, registry=None, dedup=None,
+                 latency_target=None, max_attempts=5, dead_letter=None):
+        self.sink = sink
+        self.sizer = None
+        if latency_target:
+            self.sizer = BatchSizer(latency_target, min_size=min(100, batch_size),
+                                    max_size=batch_size, initial=min(1000, batch_size))
+        self.stats = stats
+        self.registry = registry
+        self.dedup = dedup
+        self._lock = threading.Lock()
+        self.unknown_nodes = 0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.dead_letter = dead_letter
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lines = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.skipped = 0
+        self.bad_frames = 0
+        self.batches = 0
+        self._writer = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._writer.start()
+        return self
+
+    def put(self, row):
+        """Queue a decoded row, blocking while the queue is full."""
+        self.queue.put(row)
+
+    def feed(self, lines):
+        """Decode and queue every line from an iterable of text lines."""
+        for line in lines:
+            with self._lock:
+                self.lines += 1
+            self.put_decoded(decode_record(line))
+
+    def put_decoded(self, decoded):
+        """Queue the rows of a ``decode_record()`` result.
+
+        None is counted in ``skipped``; a rejected delta frame (no rows) in
+        ``skipped`` and ``bad_frames``.
+
+        With a deduplicator, the record may be held and released later (by
+        another call or by the writer thread) or dropped as a duplicate.
+        Safe to call from several reader threads (one per gateway).
+        """
+        with self._lock:
+            if decoded is None or not decoded[0]:
+                self.skipped += 1
+                if decoded is not None:
+                    self.bad_frames += 1
+                return
+            if self.dedup is None:
+                rows = self._accept(decoded)
+            else:
+                rows = []
+                for d in self.dedup.push(decoded, decoded[0][0][0], decoded[1], decoded[2]):
+                    rows.extend(self._accept(d))
+        put = self.queue.put
+        for row in rows:
+            put(row)
+
+    def _accept(self, decoded):
+        """Rows of a record going to the database (stats and registry applied)."""
+        rows, seq, rssi, snr, received_ms = decoded
+        if self.stats is not None:
+            self.stats.update(rows[0][0], seq, rssi, snr, received_ms)
+        registry = self.registry
+        if registry is not None:
+            if registry.node(rows[0][0]) is None:
+                self.unknown_nodes += 1
+            schema = registry.schema(rows[0][1])
+            if schema.scale != 1.0 or schema.offset != 0.0:
+                rows = [(n, s, schema.apply(v), t) for n, s, v, t in rows]
+        return rows
+
+    def _released(self, flush=False):
+        """Rows of the records the deduplicator releases now."""
+        rows = []
+        if self.dedup is not None:
+            with self._lock:
+                for d in self.dedup.flush() if flush else self.dedup.poll():
+                    rows.extend(self._accept(d))
+        return rows
+
+    def stop(self):
+        """Flush what is queued, stop the writer and close the sink."""
+        for row in self._released(flush=True):
+            self.queue.put(row)
+        self.queue.put(_STOP)
+        self._writer.join()
+        self.sink.close()
+
+    def _run(self):
+        get = self.queue.get
+        while True:
+            batch = self._released()
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            size = self.batch_size if self.sizer is None else self.sizer.size
+            while len(batch) < size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            t0 = time.perf_counter()
+            try:
+                self.sink.write(batch)
+                if self.sizer is not None:
+                    self.sizer.update(len(batch), time.perf_counter() - t0)
+                break
+            except Exception as e:
+                print(f"Error al escribir lote ({len(batch)} filas, intento {attempt}): {e}",
+                      file=sys.stderr)
+                if attempt < self.max_attempts:
+                    time.sleep(self.retry_delay)
+        else:
+            self._give_up(batch)
+            return
+        self.rows_written += len(batch)
+        self.batches += 1
+
+    def _give_up(self, batch):
+        """Drop a batch that kept failing, keeping it in the dead-letter file."""
+        self.rows_failed += len(batch)
+        if self.dead_letter is None:
+            print(f"Lote descartado ({len(batch)} filas)", file=sys.stderr)
+            return
+        folder = os.path.dirname(self.dead_letter)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.dead_letter, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(
+                (n, s, v, t.strftime(DATE_FORMAT) if isinstance(t, datetime) else t)
+                for n, s, v, t in batch
+            )
+        print(f"Lote descartado ({len(batch)} filas) en {self.dead_letter}", file=sys.stderr)
+
+
+def serial_lines(port, baudrate):
+    try:
+        import serial
+    except ImportError:
+        raise SystemExit("--serial requiere pyserial (pip install pyserial)")
+
+    with serial.Serial(port, baudrate, timeout=1) as ser:
+        while True:
+            raw = ser.readline()
+            if raw:
+                yield raw.decode("utf-8", errors="replace")
+
+
+def feed_ports(target, ports, baudrate):
+    """Feed ``target`` from every gateway port, one reader thread each."""
+    if len(ports) == 1:
+        target.feed(serial_lines(ports[0], baudrate))
+        return
+    readers = [
+        threading.Thread(target=target.feed, args=(serial_lines(p, baudrate),), daemon=True)
+        for p in ports
+    ]
+    for r in readers:
+        r.start()
+    for r in readers:
+        # Short joins keep Ctrl+C responsive
+        while r.is_alive():
+            r.join(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta de registros del gateway LoRa")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--serial", nargs="+",
+                        help="puerto(s) serie de los gateways (p. ej. /dev/ttyUSB0)")
+    source.add_argument("--input", help="archivo o '-' para stdin")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--sqlite", help="usar SQLite en lugar de PostgreSQL")
+    parser.add_argument("--table", default=TABLE_NAME)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--latency-target", type=float,
+                        help="segundos objetivo por lote (tamano de lote adaptativo)")
+    parser.add_argument("--spool", help="archivo donde guardar lotes si la base no responde")
+    parser.add_argument("--max-attempts", type=int, default=5,
+                        help="intentos de escritura de un lote antes de descartarlo")
+    parser.add_argument("--dead-letter",
+                        help="archivo CSV donde guardar los lotes descartados")
+    parser.add_argument("--rollups", action="store_true",
+                        help="actualizar los agregados por minuto/hora/dia (src/rollups.py)")
+    parser.add_argument("--queue-size", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="hilos/procesos de decodificacion por nodo (0 = en linea)")
+    parser.add_argument("--processes", action="store_true",
+                        help="decodificar en procesos en lugar de hilos")
+    parser.add_argument("--registry", action="store_true",
+                        help="resolver nodos y tipos de sensor (device_nodes, sensor_types)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="descartar copias (nodo, seq) recibidas por varios gateways")
+    parser.add_argument("--reorder-latency", type=float, default=2.0,
+                        help="segundos que se retiene cada trama con --dedup")
+    parser.add_argument("--stats", action="store_true",
+                        help="estadisticas de enlace por nodo al terminar")
+    args = parser.parse_args()
+
+    rollups = None
+    if args.rollups:
+        from rollups import Rollups
+
+        rollups = Rollups(args.table)
+    if args.sqlite:
+        sink = SQLiteSink(args.sqlite, args.table, args.spool, rollups)
+    else:
+        sink = PostgresSink(args.table, args.spool, rollups)
+
+    registry = None
+    if args.registry:
+        from node_registry import NodeRegistry
+
+        if args.sqlite:
+            registry = NodeRegistry(Database.sqlite(args.sqlite, max_connections=1))
+        else:
+            registry = NodeRegistry(Database.postgres(max_connections=1))
+
+    service = IngestService(
+        sink,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        queue_size=args.queue_size,
+        stats=LinkStats(window=256, max_nodes=1024) if args.stats else None,
+        registry=registry,
+        dedup=Deduplicator(latency=args.reorder_latency) if args.dedup else None,
+        latency_target=args.latency_target,
+        max_attempts=args.max_attempts,
+        dead_letter=args.dead_letter,
+    ).start()
+
+    target = service
+    if args.workers > 0:
+        from frame_router import FrameRouter
+
+        target = FrameRouter(service, workers=args.workers, processes=args.processes).start()
+
+    t0 = time.perf_counter()
+    try:
+        if args.serial:
+            feed_ports(target, args.serial, args.baudrate)
+        elif args.input == "-":
+            target.feed(sys.stdin)
+        else:
+            with open(args.input, "r", encoding="utf-8") as f:
+                target.feed(f)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if target is not service:
+            target.stop()
+        service.stop()
+
+    elapsed = time.perf_counter() - t0
+    print(f"Lineas leidas: {service.lines} (descartadas: {service.skipped})")
+    if service.bad_frames:
+        print(f"Tramas delta corruptas descartadas: {service.bad_frames}")
+    if target is not service and target.lost:
+        print(f"Lineas perdidas por decodificadores detenidos: {target.lost}")
+    print(f"Filas escritas: {service.rows_written} en {service.batches} lotes")
+    if service.rows_failed:
+        print(f"Filas descartadas por errores de escritura: {service.rows_failed}")
+    if sink.spooled:
+        print(f"Filas al spool: {sink.spooled} (reenviadas: {sink.replayed})")
+    if elapsed > 0:
+        print(f"Tasa: {service.rows_written / elapsed:.0f} filas/s")
+    if service.dedup is not None:
+        print(f"Deduplicacion: {service.dedup.snapshot()}")
+    if registry is not None:
+        print(f"Lecturas de nodos no registrados: {service.unknown_nodes}")
+        print(f"Registro: {registry.snapshot()}")
+        registry.close()
+    if service.stats is not None:
+        for node, s in sorted(service.stats.snapshot().items()):
+            pdr = "-" if s["pdr"] is None else f"{100 * s['pdr']:.1f}%"
+            print(f"Nodo {node}: PDR {pdr} dup {s['duplicates']} reord {s['reordered']} "
+                  f"RSSI {s['rssi']} dBm")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Link-quality metrics from packet logs with a transmitter sequence counter.
+
+The transmitter (``examples/test_transmitter.py``) embeds a monotonic counter
+in every frame (``Envio #N``), so losses are counted exactly from gaps in the
+received counters instead of being estimated from the observed time window.
+Every metric is computed with vectorized pandas/NumPy group operations over
+the whole log at once, so millions of packets across thousands of runs are
+processed without Python-level loops.
+
+Usage:
+    from ensayos import load_ensayos
+    from link_metrics import link_metrics
+
+    metricas = link_metrics(load_ensayos("../ensayos"))
+"""
+
+import numpy as np
+import pandas as pd
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _prepare(df, by, counter, time):
+    """Keep packets with a counter, sorted by run and arrival time."""
+    d = df.dropna(subset=[counter]).copy()
+    d[counter] = d[counter].astype("int64")
+    return d.sort_values([by, time], kind="stable").reset_index(drop=True)
+
+
+def packet_flags(df, by="archivo", counter="mensaje_recibido", time="fecha"):
+    """Per-packet flags in arrival order.
+
+    Adds to a copy of ``df`` (packets without counter are dropped):
+        duplicado: counter already received earlier in the run.
+        reordenado: counter lower than one received earlier (not duplicate).
+        perdidos_antes: packets lost between this counter and the previous
+            highest counter of the run.
+        intervalo_s: seconds since the previous packet of the run.
+
+    Returns:
+        DataFrame sorted by ``by`` and ``time``.
+    """
+    d = _prepare(df, by, counter, time)
+    groups = d.groupby(by, sort=False)
+    prev_max = groups[counter].cummax().groupby(d[by], sort=False).shift()
+
+    d["duplicado"] = d.duplicated([by, counter])
+    d["reordenado"] = (d[counter] < prev_max) & ~d["duplicado"]
+    gap = (d[counter] - prev_max - 1).clip(lower=0)
+    d["perdidos_antes"] = gap.fillna(0).astype("int64")
+    d["intervalo_s"] = groups[time].diff().dt.total_seconds()
+    return d
+
+
+def burst_lengths(df, by="archivo", counter="mensaje_recibido", time="fecha"):
+    """Length of every loss burst (run of consecutive missing counters).
+
+    Returns:
+        DataFrame with columns ``by``, ``desde`` (first lost counter) and
+        ``largo`` (number of consecutive counters lost).
+    """
+    d = _prepare(df, by, counter, time)
+    unique = d.drop_duplicates([by, counter]).sort_values([by, counter], kind="stable")
+    gaps = unique.groupby(by, sort=False)[counter].diff() - 1
+    mask = gaps > 0
+    return pd.DataFrame({
+        by: unique.loc[mask, by].to_numpy(),
+        "desde": (unique.loc[mask, counter] - gaps[mask]).astype("int64").to_numpy(),
+        "largo": gaps[mask].astype("int64").to_numpy(),
+    })
+
+
+def burst_distribution(df, by="archivo", counter="mensaje_recibido", time="fecha"):
+    """Histogram of loss-burst lengths per run.
+
+    Returns:
+        DataFrame with columns ``by``, ``largo`` and ``rafagas`` (count).
+    """
+    bursts = burst_lengths(df, by, counter, time)
+    return (
+        bursts.groupby([by, "largo"], as_index=False)
+        .size()
+        .rename(columns={"size": "rafagas"})
+    )
+
+
+def _quantiles(series, groups, prefix, quantiles):
+    q = series.groupby(groups, sort=False).quantile(list(quantiles)).unstack()
+    q.columns = [f"{prefix}_p{int(round(x * 100))}" for x in q.columns]
+    return q
+
+
+def link_metrics(df, by="archivo", counter="mensaje_recibido", time="fecha",
+                 rssi="rssi", snr=None, quantiles=QUANTILES):
+    """Exact link metrics per run.
+
+    Losses before the first and after the last received counter of a run are
+    not observable and are not counted.
+
+    Args:
+        df: Packet log, one row per received packet.
+        by: Column identifying the run (file, node, ...).
+        counter: Transmitter sequence counter column.
+        time: Arrival timestamp column (datetime64).
+        rssi: RSSI column in dBm.
+        snr: Optional SNR column in dB.
+        quantiles: Quantiles reported for inter-arrival time, RSSI and SNR.
+
+    Returns:
+        DataFrame, one row per run, with received/unique/duplicate/reordered
+        counts, expected and lost packets, exact PDR, loss-burst statistics,
+        inter-arrival time statistics and RSSI/SNR statistics.
+    """
+    d = packet_flags(df, by, counter, time)
+    groups = d.groupby(by, sort=False)
+
+    out = groups.agg(
+        recibidos=(counter, "size"),
+        duplicados=("duplicado", "sum"),
+        reordenados=("reordenado", "sum"),
+        primero=(counter, "min"),
+        ultimo=(counter, "max"),
+        intervalo_prom_s=("intervalo_s", "mean"),
+        jitter_s=("intervalo_s", "std"),
+    )
+    out["unicos"] = out["recibidos"] - out["duplicados"]
+    out["esperados"] = out["ultimo"] - out["primero"] + 1
+    out["perdidos"] = out["esperados"] - out["unicos"]
+    out["pdr"] = out["unicos"] / out["esperados"]
+
+    bursts = burst_lengths(d, by, counter, time).groupby(by, sort=False)["largo"]
+    out["rafagas"] = bursts.size().reindex(out.index, fill_value=0)
+    out["rafaga_max"] = bursts.max().reindex(out.index, fill_value=0)
+    out["rafaga_prom"] = bursts.mean().reindex(out.index)
+
+    parts = [out, _quantiles(d["intervalo_s"], d[by], "intervalo_s", quantiles)]
+    for column, prefix in ((rssi, "rssi"), (snr, "snr")):
+        if column is None or column not in d:
+            continue
+        values = d.loc[~d["duplicado"], column].astype("float64")
+        keys = d.loc[~d["duplicado"], by]
+        stats = values.groupby(keys, sort=False).agg(["mean", "std", "min", "max"])
+        stats.columns = [f"{prefix}_{c}" for c in ("prom", "std", "min", "max")]
+        parts.append(stats)
+        parts.append(_quantiles(values, keys, prefix, quantiles))
+
+    result = pd.concat(parts, axis=1)
+    result.index.name = by
+    return result.reset_index()
+
+
+def pdr_by(metrics, keys):
+    """Aggregate exact PDR over several runs (e.g. per distance and antenna).
+
+    Sums unique and expected packets instead of averaging per-run ratios, so
+    long runs weigh more than short ones.
+
+    Args:
+        metrics: Output of ``link_metrics`` joined with the grouping columns.
+        keys: Column or list of columns to group by.
+
+    Returns:
+        DataFrame with ``unicos``, ``esperados``, ``perdidos`` and ``pdr``.
+    """
+    agg = metrics.groupby(keys, as_index=False)[["unicos", "esperados", "perdidos"]].sum()
+    agg["pdr"] = np.where(agg["esperados"] > 0, agg["unicos"] / agg["esperados"], np.nan)
+    return agg
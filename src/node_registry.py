@@ -0,0 +1,161 @@
+"""
+In-memory registry of nodes and sensor types for the ingestion path.
+
+Readings arrive tagged only with ``node_id`` (a string in JSON payloads, one
+byte in delta frames) and ``sensor_type_id``. The registry resolves them to
+the ``device_nodes`` row (model, activation date, sensor ROM such as
+``ds_rom`` when the table has it) and the ``sensor_types`` row (name, unit
+of measure, optional ``scale``/``offset`` calibration columns) without a
+database round trip per packet:
+
+- Nodes live in an LRU cache of ``max_nodes`` entries; each entry is reloaded
+  from the database after ``ttl`` seconds, and unknown ids are cached too so
+  a noisy or foreign node does not query the database on every frame.
+- Sensor types are few: the whole table is loaded at once and reloaded
+  every ``ttl`` seconds.
+
+If the database is unreachable, the last known entries keep being served.
+Lookups are thread-safe (``FrameRouter`` thread workers share one registry)
+and go through a ``db.Database`` pool, so they may run on any thread.
+
+Example:
+    registry = NodeRegistry(db.Database.postgres(max_connections=1))
+    node = registry.node("64")            # device_nodes row as dict, or None
+    schema = registry.schema(1)           # SensorSchema
+    value = schema.apply(raw_value)       # scale/offset applied
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+NODES_TABLE = "device_nodes"
+SENSOR_TYPES_TABLE = "sensor_types"
+
+_SchemaBase = namedtuple("SensorSchema", ["sensor_type_id", "name", "unit", "scale", "offset"])
+
+
+class SensorSchema(_SchemaBase):
+    """Meaning of a ``sensor_type_id``: name, unit and value calibration."""
+
+    __slots__ = ()
+
+    def apply(self, value):
+        """Raw reading converted to the sensor unit."""
+        if self.scale == 1.0 and self.offset == 0.0:
+            return value
+        return value * self.scale + self.offset
+
+
+def _unknown_schema(sensor_type_id):
+    return SensorSchema(sensor_type_id, None, None, 1.0, 0.0)
+
+
+class NodeRegistry:
+    """LRU/TTL cache over ``device_nodes`` and ``sensor_types``.
+
+    Args:
+        db: ``db.Database`` the lookups run on; ``close()`` closes it.
+        max_nodes: Node entries kept; the least recently used is evicted.
+        ttl: Seconds before an entry (or the sensor type table) is reloaded.
+    """
+
+    def __init__(self, db, max_nodes=1024, ttl=300.0,
+                 nodes_table=NODES_TABLE, sensor_types_table=SENSOR_TYPES_TABLE):
+        self.db = db
+        self.max_nodes = max_nodes
+        self.ttl = ttl
+        self._node_sql = "SELECT * FROM %s WHERE node_id = %s" % (nodes_table, db.placeholder)
+        self._types_sql = "SELECT * FROM %s" % sensor_types_table
+        self._lock = threading.Lock()
+        self._nodes = OrderedDict()   # node_id -> (row or None, loaded_at)
+        self._schemas = {}
+        self._schemas_at = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _query(self, sql, params=()):
+        # The pool ends the transaction and drops connections that failed
+        return self.db.query(sql, params)
+
+    def _failed(self, e):
+        self.errors += 1
+        print(f"Error al consultar el registro de nodos: {e}", file=sys.stderr)
+
+    def node(self, node_id):
+        """``device_nodes`` row of a node as a dict, or None if unknown."""
+        key = str(node_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._nodes.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._nodes.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            try:
+                rows = self._query(self._node_sql, (key,))
+            except Exception as e:
+                self._failed(e)
+                # Serve the stale entry (if any) and retry after another ttl
+                rows = [] if entry is None else [entry[0]]
+            row = rows[0] if rows else None
+            self._nodes[key] = (row, now)
+            self._nodes.move_to_end(key)
+            if len(self._nodes) > self.max_nodes:
+                self._nodes.popitem(last=False)
+                self.evictions += 1
+            return row
+
+    def is_known(self, node_id):
+        return self.node(node_id) is not None
+
+    def schema(self, sensor_type_id):
+        """SensorSchema of a sensor type (unit None and no scaling if unknown)."""
+        now = time.monotonic()
+        with self._lock:
+            if self._schemas_at is None or now - self._schemas_at >= self.ttl:
+                self._load_schemas(now)
+            schema = self._schemas.get(sensor_type_id)
+        return schema if schema is not None else _unknown_schema(sensor_type_id)
+
+    def _load_schemas(self, now):
+        try:
+            rows = self._query(self._types_sql)
+        except Exception as e:
+            self._failed(e)
+            self._schemas_at = now
+            return
+        schemas = {}
+        for r in rows:
+            scale = r.get("scale")
+            offset = r.get("offset")
+            sid = int(r["sensor_type_id"])
+            schemas[sid] = SensorSchema(
+                sid, r.get("name"), r.get("unit_of_measure"),
+                1.0 if scale is None else float(scale),
+                0.0 if offset is None else float(offset),
+            )
+        self._schemas = schemas
+        self._schemas_at = now
+
+    def invalidate(self, node_id=None):
+        """Drop one node (or every node and the sensor types) from the cache."""
+        with self._lock:
+            if node_id is None:
+                self._nodes.clear()
+                self._schemas_at = None
+            else:
+                self._nodes.pop(str(node_id), None)
+
+    def snapshot(self):
+        """Cache counters."""
+        with self._lock:
+            return {"nodes": len(self._nodes), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "errors": self.errors}
+
+    def close(self):
+        self.db.close()
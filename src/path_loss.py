@@ -0,0 +1,197 @@
+"""
+Log-distance path-loss model fitted to field data, and link-budget predictions.
+
+The model is
+
+    RSSI(d) = P0[antena] - 10 * n * log10(d / d0) + X,   X ~ N(0, sigma^2)
+
+with one intercept per antenna type, a common path-loss exponent ``n`` and
+log-normal shadowing ``X``. It is fitted by ordinary least squares over all
+packets at once. Predicted RSSI, SNR (against the thermal noise floor of the
+bandwidth) and the probability of SNR staying above the demodulation floor of
+each spreading factor give the expected PDR, the usable range per SF and how
+many nodes fit on a channel.
+
+Usage:
+    from ensayos import load_ensayos
+    from path_loss import fit_path_loss, plan_capacity
+
+    model = fit_path_loss(load_ensayos("../ensayos"))
+    model.pdr(300, "antena grande", sf=9)
+    plan_capacity(model, "antena grande", 300, payload_len=80, period_s=10)
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Minimum SNR for demodulation per spreading factor (SX1276 datasheet)
+SNR_LIMIT_DB = {6: -5.0, 7: -7.5, 8: -10.0, 9: -12.5, 10: -15.0, 11: -17.5, 12: -20.0}
+THERMAL_NOISE_DBM_HZ = -174.0
+NOISE_FIGURE_DB = 6.0
+
+
+def noise_floor_dbm(bw=125000, noise_figure=NOISE_FIGURE_DB):
+    """Receiver noise floor in dBm for a bandwidth in Hz."""
+    return THERMAL_NOISE_DBM_HZ + 10 * np.log10(bw) + noise_figure
+
+
+def time_on_air_s(payload_len, sf, bw=125000, cr=5, preamble=8, explicit_header=True,
+                  crc=True, low_data_rate_opt=None):
+    """LoRa packet time on air in seconds (Semtech AN1200.13 formula).
+
+    Args:
+        payload_len: Payload bytes.
+        sf: Spreading factor (6-12).
+        bw: Bandwidth in Hz.
+        cr: Coding rate denominator (5-8, i.e. 4/5..4/8).
+        preamble: Programmed preamble symbols.
+        explicit_header: Explicit header mode (the driver's default).
+        crc: Payload CRC enabled.
+        low_data_rate_opt: Force low data rate optimization; by default on
+            when the symbol time exceeds 16 ms.
+    """
+    t_sym = (2 ** sf) / bw
+    if low_data_rate_opt is None:
+        low_data_rate_opt = t_sym > 0.016
+    de = 1 if low_data_rate_opt else 0
+    ih = 0 if explicit_header else 1
+    num = 8 * payload_len - 4 * sf + 28 + (16 if crc else 0) - 20 * ih
+    n_payload = 8 + max(int(np.ceil(num / (4 * (sf - 2 * de)))) * cr, 0)
+    return (preamble + 4.25) * t_sym + n_payload * t_sym
+
+
+class PathLossModel:
+    """Fitted log-distance model. Build it with ``fit_path_loss``.
+
+    Attributes:
+        p0: Dictionary antenna -> RSSI at the reference distance (dBm).
+        exponent: Path-loss exponent ``n``.
+        exponent_se: Standard error of ``n``.
+        sigma: Pooled shadowing standard deviation (dB).
+        sigma_by_antenna: Dictionary antenna -> residual standard deviation.
+        d0: Reference distance (m).
+        samples: Packets used in the fit.
+    """
+
+    def __init__(self, p0, exponent, exponent_se, sigma, sigma_by_antenna, d0, samples):
+        self.p0 = p0
+        self.exponent = exponent
+        self.exponent_se = exponent_se
+        self.sigma = sigma
+        self.sigma_by_antenna = sigma_by_antenna
+        self.d0 = d0
+        self.samples = samples
+
+    def __repr__(self):
+        offsets = ", ".join(f"{k}: {v:.1f}" for k, v in self.p0.items())
+        return (f"PathLossModel(n={self.exponent:.2f}±{self.exponent_se:.2f}, "
+                f"sigma={self.sigma:.1f} dB, P0=[{offsets}], N={self.samples})")
+
+    def _sigma(self, antenna):
+        return self.sigma_by_antenna.get(antenna, self.sigma)
+
+    def rssi(self, distance_m, antenna):
+        """Expected RSSI in dBm at ``distance_m`` (scalar or array)."""
+        distance_m = np.asarray(distance_m, dtype=float)
+        return self.p0[antenna] - 10 * self.exponent * np.log10(distance_m / self.d0)
+
+    def snr(self, distance_m, antenna, bw=125000, tx_power_offset_db=0.0):
+        """Expected SNR in dB (RSSI over the noise floor of ``bw``).
+
+        Args:
+            tx_power_offset_db: Transmit power relative to the field tests.
+        """
+        return self.rssi(distance_m, antenna) + tx_power_offset_db - noise_floor_dbm(bw)
+
+    def pdr(self, distance_m, antenna, sf=7, bw=125000, tx_power_offset_db=0.0):
+        """Probability that shadowing keeps SNR above the SF demodulation floor."""
+        margin = self.snr(distance_m, antenna, bw, tx_power_offset_db) - SNR_LIMIT_DB[sf]
+        return stats.norm.cdf(margin / self._sigma(antenna))
+
+    def max_distance(self, antenna, sf=7, bw=125000, target_pdr=0.9, tx_power_offset_db=0.0):
+        """Largest distance in m where the predicted PDR reaches ``target_pdr``."""
+        fade_margin = stats.norm.ppf(target_pdr) * self._sigma(antenna)
+        budget = (self.p0[antenna] + tx_power_offset_db - noise_floor_dbm(bw)
+                  - SNR_LIMIT_DB[sf] - fade_margin)
+        return self.d0 * 10 ** (budget / (10 * self.exponent))
+
+
+def fit_path_loss(df, distance="distancia", rssi="rssi", antenna="nombre", d0=1.0):
+    """Fit the log-distance model by least squares over every packet.
+
+    Args:
+        df: One row per packet (e.g. ``load_ensayos()`` output).
+        distance: Distance column in meters.
+        rssi: RSSI column in dBm.
+        antenna: Antenna type column (one intercept per value).
+        d0: Reference distance in meters.
+
+    Returns:
+        PathLossModel.
+    """
+    d = df[[distance, rssi, antenna]].dropna()
+    d = d[d[distance] > 0]
+    codes, names = pd.factorize(d[antenna], sort=True)
+    n_obs, n_groups = len(d), len(names)
+    if n_obs <= n_groups + 1 or d[distance].nunique() < 2:
+        raise ValueError("Need at least two distances and more packets than parameters")
+
+    # Design matrix: one-hot intercept per antenna plus -10*log10(d/d0)
+    a = np.zeros((n_obs, n_groups + 1))
+    a[np.arange(n_obs), codes] = 1.0
+    a[:, -1] = -10 * np.log10(d[distance].to_numpy(dtype=float) / d0)
+    y = d[rssi].to_numpy(dtype=float)
+
+    coef, _, _, _ = np.linalg.lstsq(a, y, rcond=None)
+    residuals = y - a @ coef
+    dof = n_obs - n_groups - 1
+    sigma = float(np.sqrt(residuals @ residuals / dof))
+    cov = sigma ** 2 * np.linalg.pinv(a.T @ a)
+
+    sigma_by_antenna = (
+        pd.Series(residuals).groupby(codes).std(ddof=1).rename(index=dict(enumerate(names)))
+    )
+    return PathLossModel(
+        p0={name: float(coef[i]) for i, name in enumerate(names)},
+        exponent=float(coef[-1]),
+        exponent_se=float(np.sqrt(cov[-1, -1])),
+        sigma=sigma,
+        sigma_by_antenna={k: float(v) for k, v in sigma_by_antenna.dropna().items()},
+        d0=d0,
+        samples=n_obs,
+    )
+
+
+def plan_capacity(model, antenna, distance_m, payload_len, period_s, bw=125000, cr=5,
+                  target_pdr=0.9, sfs=tuple(SNR_LIMIT_DB)):
+    """Link budget and channel capacity per spreading factor at one distance.
+
+    Collisions follow pure ALOHA: with ``k`` nodes each sending one packet of
+    time on air ``T`` every ``period_s``, a packet survives with probability
+    ``exp(-2 k T / period_s)``.
+
+    Returns:
+        DataFrame per SF with expected RSSI/SNR, link PDR, time on air, the
+        maximum range for ``target_pdr`` and the number of nodes the channel
+        holds before the combined PDR drops below ``target_pdr``.
+    """
+    rows = []
+    for sf in sfs:
+        toa = time_on_air_s(payload_len, sf, bw, cr)
+        link_pdr = float(model.pdr(distance_m, antenna, sf, bw))
+        if link_pdr > target_pdr:
+            # link_pdr * exp(-2 k toa / period) >= target_pdr
+            max_nodes = int(np.log(link_pdr / target_pdr) * period_s / (2 * toa))
+        else:
+            max_nodes = 0
+        rows.append({
+            "sf": sf,
+            "rssi_dbm": float(model.rssi(distance_m, antenna)),
+            "snr_db": float(model.snr(distance_m, antenna, bw)),
+            "pdr_enlace": link_pdr,
+            "time_on_air_ms": 1000 * toa,
+            "alcance_m": model.max_distance(antenna, sf, bw, target_pdr),
+            "nodos_max": max_nodes,
+        })
+    return pd.DataFrame(rows)
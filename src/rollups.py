@@ -0,0 +1,294 @@
+"""
+Incremental rollups of the measurements table.
+
+For every node, sensor type and 1-minute, 1-hour and 1-day bucket, the
+tables ``measurements_1m``, ``measurements_1h`` and ``measurements_1d`` keep
+the sample count, sum, minimum, maximum and sum of squares. They are updated
+in the same transaction as the raw insert (``MeasurementWriter(...,
+rollups=Rollups())``): each batch is aggregated in memory and upserted, one
+row per touched bucket. Mean, min, max and standard deviation of any range
+aligned to a bucket are then read from the coarsest table that can answer
+it, so month-scale questions read a few hundred rows instead of every
+reading.
+
+Usage:
+    python src/rollups.py --rebuild --sqlite data/ingest.db
+    python src/rollups.py --start 2026-01-01 --end 2026-02-01 --resolution 1d
+
+    from rollups import Rollups
+    df = Rollups().query(db, "2026-01-01", "2026-02-01", resolution="1d")
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db import DATE_FORMAT, MEASUREMENTS_TABLE, Database
+
+LEVELS = (("1m", 60), ("1h", 3600), ("1d", 86400))
+ROLLUP_COLUMNS = ("samples", "total", "minimum", "maximum", "sum_squares")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _naive_utc(t):
+    """Aware datetimes (``timestamptz`` from psycopg2) as naive UTC."""
+    if t.tzinfo is not None:
+        return t.astimezone(timezone.utc).replace(tzinfo=None)
+    return t
+
+
+def _as_datetime(t):
+    if isinstance(t, datetime):
+        return _naive_utc(t)
+    return datetime.strptime(str(t)[:19], DATE_FORMAT)
+
+
+def bucket_start(t, seconds):
+    """Start of the ``seconds``-long bucket containing ``t``.
+
+    Naive datetimes are taken as they are; aware ones are converted to UTC,
+    so buckets are always naive.
+    """
+    t = _naive_utc(t)
+    offset = int((t - _EPOCH).total_seconds()) % seconds
+    return t.replace(microsecond=0) - timedelta(seconds=offset)
+
+
+def _seconds(resolution):
+    if resolution is None or isinstance(resolution, (int, float)):
+        return resolution
+    for name, seconds in LEVELS:
+        if name == resolution:
+            return seconds
+    return int(pd.Timedelta(resolution).total_seconds())
+
+
+class Rollups:
+    """Rollup tables of one measurements table.
+
+    Args:
+        table: Raw measurements table; rollups are ``<table>_<level>``.
+        levels: ``(name, seconds)`` pairs, finest first.
+    """
+
+    def __init__(self, table=MEASUREMENTS_TABLE, levels=LEVELS):
+        self.table = table
+        self.levels = levels
+
+    def table_name(self, level):
+        return "%s_%s" % (self.table, level)
+
+    def ensure_tables(self, db):
+        """Create the rollup tables if they do not exist."""
+        if db.backend == "postgres":
+            types = ("text", "integer", "timestamp", "bigint", "double precision")
+        else:
+            types = ("TEXT", "INTEGER", "TEXT", "INTEGER", "REAL")
+        for name, _ in self.levels:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS %s (node_id %s NOT NULL, sensor_type_id %s NOT NULL, "
+                "bucket %s NOT NULL, samples %s NOT NULL, total %s, minimum %s, maximum %s, "
+                "sum_squares %s, PRIMARY KEY (node_id, sensor_type_id, bucket))"
+                % ((self.table_name(name),) + types[:4] + (types[4],) * 4)
+            )
+
+    def aggregate(self, rows):
+        """Per-level bucket aggregates of ``(node_id, sensor_type_id, value, timestamp)`` rows.
+
+        Returns:
+            Dictionary level -> {(node_id, sensor_type_id, bucket): [count,
+            sum, min, max, sum of squares]}.
+        """
+        finest, finest_s = self.levels[0]
+        acc = {}
+        for node_id, sensor_type_id, value, t in rows:
+            if value is None:
+                continue
+            key = (node_id, sensor_type_id, bucket_start(_as_datetime(t), finest_s))
+            a = acc.get(key)
+            if a is None:
+                acc[key] = [1, value, value, value, value * value]
+            else:
+                a[0] += 1
+                a[1] += value
+                if value < a[2]:
+                    a[2] = value
+                if value > a[3]:
+                    a[3] = value
+                a[4] += value * value
+        out = {finest: acc}
+        # Coarser levels are merged from the finest buckets
+        for name, seconds in self.levels[1:]:
+            merged = {}
+            for (node_id, sensor_type_id, bucket), a in acc.items():
+                key = (node_id, sensor_type_id, bucket_start(bucket, seconds))
+                m = merged.get(key)
+                if m is None:
+                    merged[key] = list(a)
+                else:
+                    m[0] += a[0]
+                    m[1] += a[1]
+                    m[2] = min(m[2], a[2])
+                    m[3] = max(m[3], a[3])
+                    m[4] += a[4]
+            out[name] = merged
+        return out
+
+    def _upsert_sql(self, db, level):
+        t = self.table_name(level)
+        least, greatest = ("LEAST", "GREATEST") if db.backend == "postgres" else ("MIN", "MAX")
+        p = db.placeholder
+        return (
+            "INSERT INTO {t} AS r (node_id, sensor_type_id, bucket, samples, total, minimum, "
+            "maximum, sum_squares) VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}) "
+            "ON CONFLICT (node_id, sensor_type_id, bucket) DO UPDATE SET "
+            "samples = r.samples + excluded.samples, total = r.total + excluded.total, "
+            "minimum = {least}(r.minimum, excluded.minimum), "
+            "maximum = {greatest}(r.maximum, excluded.maximum), "
+            "sum_squares = r.sum_squares + excluded.sum_squares"
+        ).format(t=t, p=p, least=least, greatest=greatest)
+
+    def update(self, db, conn, rows):
+        """Add a batch of raw rows to the rollups on ``conn`` (caller commits)."""
+        sqlite = db.backend == "sqlite"
+        cur = conn.cursor()
+        try:
+            for level, buckets in self.aggregate(rows).items():
+                params = [
+                    (node_id, sensor_type_id,
+                     bucket.strftime(DATE_FORMAT) if sqlite else bucket,
+                     a[0], a[1], a[2], a[3], a[4])
+                    for (node_id, sensor_type_id, bucket), a in buckets.items()
+                ]
+                if params:
+                    cur.executemany(self._upsert_sql(db, level), params)
+        finally:
+            cur.close()
+
+    def rebuild(self, db, chunk_size=50000):
+        """Recompute every rollup from the raw table (initial backfill).
+
+        Returns:
+            Number of raw rows read.
+        """
+        self.ensure_tables(db)
+        total = 0
+        with db.connection() as conn:
+            cur = conn.cursor()
+            for name, _ in self.levels:
+                cur.execute("DELETE FROM %s" % self.table_name(name))
+            cur.close()
+            # Server-side cursor on PostgreSQL: only one chunk in memory
+            cur = conn.cursor(name="rollup_rebuild") if db.backend == "postgres" else conn.cursor()
+            cur.execute("SELECT node_id, sensor_type_id, value, timestamp FROM %s" % self.table)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                self.update(db, conn, [(str(n), s, v, t) for n, s, v, t in rows])
+                total += len(rows)
+            cur.close()
+        return total
+
+    def level_for(self, start, end, resolution=None):
+        """Coarsest level whose buckets tile ``[start, end)`` and the resolution."""
+        resolution = _seconds(resolution)
+        best = None
+        for name, seconds in self.levels:
+            if resolution is not None and resolution % seconds:
+                continue
+            if bucket_start(start, seconds) != start or bucket_start(end, seconds) != end:
+                continue
+            best = name
+        if best is None:
+            raise ValueError("range not aligned to any rollup level; use the raw table")
+        return best
+
+    def query(self, db, start, end, resolution=None, node_ids=None, sensor_type_ids=None):
+        """Statistics per node and sensor type from the rollups.
+
+        Args:
+            db: Database.
+            start: Range start (inclusive), datetime or ``"YYYY-MM-DD[ HH:MM:SS]"``.
+            end: Range end (exclusive).
+            resolution: Bucket of the result (``"1m"``, ``"1h"``, ``"1d"``, a
+                pandas offset like ``"15min"``, or seconds); None summarizes the
+                whole range.
+            node_ids: Optional node ids to keep.
+            sensor_type_ids: Optional sensor types to keep.
+
+        Returns:
+            DataFrame with node_id, sensor_type_id, bucket (if resolution),
+            count, mean, min, max and std.
+        """
+        start = _naive_utc(pd.Timestamp(start).to_pydatetime())
+        end = _naive_utc(pd.Timestamp(end).to_pydatetime())
+        level = self.level_for(start, end, resolution)
+        p = db.placeholder
+        sqlite = db.backend == "sqlite"
+        where = ["bucket >= %s" % p, "bucket < %s" % p]
+        params = [start.strftime(DATE_FORMAT) if sqlite else start,
+                  end.strftime(DATE_FORMAT) if sqlite else end]
+        if node_ids is not None:
+            node_ids = [str(n) for n in node_ids]
+            where.append("node_id IN (%s)" % ", ".join([p] * len(node_ids)))
+            params += node_ids
+        if sensor_type_ids is not None:
+            sensor_type_ids = list(sensor_type_ids)
+            where.append("sensor_type_id IN (%s)" % ", ".join([p] * len(sensor_type_ids)))
+            params += sensor_type_ids
+        rows = db.query(
+            "SELECT node_id, sensor_type_id, bucket, samples, total, minimum, maximum, sum_squares "
+            "FROM %s WHERE %s" % (self.table_name(level), " AND ".join(where)),
+            tuple(params),
+        )
+        df = pd.DataFrame(rows, columns=["node_id", "sensor_type_id", "bucket"] + list(ROLLUP_COLUMNS))
+        df["bucket"] = pd.to_datetime(df["bucket"])
+
+        keys = ["node_id", "sensor_type_id"]
+        seconds = _seconds(resolution)
+        if seconds is not None:
+            df["bucket"] = df["bucket"].dt.floor(pd.Timedelta(seconds=seconds))
+            keys.append("bucket")
+        g = df.groupby(keys, sort=True).agg(
+            count=("samples", "sum"), total=("total", "sum"), min=("minimum", "min"),
+            max=("maximum", "max"), sum_squares=("sum_squares", "sum"),
+        ).reset_index()
+        g["mean"] = g["total"] / g["count"]
+        var = (g["sum_squares"] - g["total"] * g["mean"]) / (g["count"] - 1)
+        g["std"] = var.clip(lower=0).pow(0.5).where(g["count"] > 1)
+        return g[keys + ["count", "mean", "min", "max", "std"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tablas de agregados de mediciones")
+    parser.add_argument("--sqlite", help="usar SQLite en lugar de PostgreSQL")
+    parser.add_argument("--table", default=MEASUREMENTS_TABLE)
+    parser.add_argument("--rebuild", action="store_true", help="recalcular desde la tabla cruda")
+    parser.add_argument("--start", help="inicio del rango (YYYY-MM-DD)")
+    parser.add_argument("--end", help="fin del rango, exclusivo (YYYY-MM-DD)")
+    parser.add_argument("--resolution", help="1m, 1h, 1d o un intervalo de pandas (p. ej. 15min)")
+    parser.add_argument("--node", action="append", help="nodo a consultar (repetible)")
+    args = parser.parse_args()
+
+    db = Database.sqlite(args.sqlite) if args.sqlite else Database.postgres()
+    rollups = Rollups(args.table)
+    try:
+        if args.rebuild:
+            n = rollups.rebuild(db)
+            print(f"Agregados recalculados a partir de {n} filas")
+        if args.start and args.end:
+            df = rollups.query(db, args.start, args.end, args.resolution, args.node)
+            with pd.option_context("display.max_rows", 200, "display.width", 120):
+                print(df)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Host-side SX127x simulator.
+
+Provides a stand-in ``machine`` module (Pin, SPI, SoftSPI) and a register-level
+model of the SX127x so that ``library/sx127x.py`` runs unmodified on CPython.
+Several radios can share one simulated SPI bus; a transfer issued while more
+than one chip select is low is counted as a collision and corrupts the data
+seen by every selected device, like a real shared bus would.
+
+Example:
+    import sx127x_sim
+    sx127x_sim.install()
+
+    from machine import SoftSPI, Pin
+    from sx127x import LoRa
+
+    air = sx127x_sim.SimAir()
+    spi = SoftSPI(baudrate=3000000, sck=Pin(5), mosi=Pin(27), miso=Pin(19))
+    sx127x_sim.SimRadio(spi, cs=18, reset=14, dio0=26, air=air)
+    lora = LoRa(spi, cs_pin=18, reset_pin=14, dio0_pin=26)
+"""
+
+import sys
+import threading
+import types
+from collections import deque
+
+REG_FIFO = 0x00
+REG_OP_MODE = 0x01
+REG_FIFO_ADDR_PTR = 0x0d
+REG_FIFO_TX_BASE_ADDR = 0x0e
+REG_FIFO_RX_BASE_ADDR = 0x0f
+REG_FIFO_RX_CURRENT_ADDR = 0x10
+REG_IRQ_FLAGS = 0x12
+REG_RX_NB_BYTES = 0x13
+REG_PKT_SNR_VALUE = 0x19
+REG_PKT_RSSI_VALUE = 0x1a
+REG_PAYLOAD_LENGTH = 0x22
+REG_VERSION = 0x42
+
+IRQ_RX_DONE_MASK = 0x40
+IRQ_TX_DONE_MASK = 0x08
+IRQ_PAYLOAD_CRC_ERROR_MASK = 0x20
+
+MODE_STDBY = 0x01
+MODE_TX = 0x03
+MODE_RX_CONTINUOUS = 0x05
+
+RSSI_OFFSET = 157
+
+
+class Pin:
+    """Stand-in for ``machine.Pin``.
+
+    Pins are singletons per id, so ``Pin(18)`` in the driver and in the
+    simulator refer to the same object.
+    """
+
+    IN = 0
+    OUT = 1
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    _pins = {}
+
+    def __new__(cls, id, *args, **kwargs):
+        if isinstance(id, Pin):
+            return id
+        pin = cls._pins.get(id)
+        if pin is None:
+            pin = object.__new__(cls)
+            pin.id = id
+            pin._value = 1
+            pin._handler = None
+            pin._listeners = []
+            cls._pins[id] = pin
+        return pin
+
+    def __init__(self, id, mode=-1, *args, **kwargs):
+        pass
+
+    def __repr__(self):
+        return "Pin(%r)" % (self.id,)
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        old, self._value = self._value, 1 if v else 0
+        if old != self._value:
+            for listener in self._listeners:
+                listener(self, self._value)
+
+    def irq(self, handler=None, trigger=IRQ_RISING):
+        self._handler = handler
+
+    def fire(self):
+        """Raise a rising edge on the pin and run its IRQ handler."""
+        self._value = 1
+        if self._handler:
+            self._handler(self)
+        self._value = 0
+
+
+class SPI:
+    """Stand-in for ``machine.SPI``/``machine.SoftSPI`` shared by SimRadios."""
+
+    def __init__(self, id=-1, *args, **kwargs):
+        self.devices = []
+        self.transfers = 0
+        self.collisions = 0
+
+    def attach(self, device):
+        self.devices.append(device)
+
+    def _transfer(self, data):
+        selected = [d for d in self.devices if d.selected()]
+        self.transfers += 1
+        if len(selected) > 1:
+            self.collisions += 1
+        out = bytearray(len(data))
+        for device in selected:
+            reply = device.transfer(data)
+            for i in range(len(out)):
+                out[i] ^= reply[i]
+        return out
+
+    def write(self, buf):
+        self._transfer(bytes(buf))
+
+    def read(self, nbytes, write=0x00):
+        return bytes(self._transfer(bytes([write]) * nbytes))
+
+    def readinto(self, buf, write=0x00):
+        buf[:] = self._transfer(bytes([write]) * len(buf))
+
+    def write_readinto(self, write_buf, read_buf):
+        read_buf[:] = self._transfer(bytes(write_buf))
+
+
+SoftSPI = SPI
+
+
+def install():
+    """Register the simulated ``machine`` module if the real one is missing."""
+    try:
+        import machine  # noqa: F401
+    except ImportError:
+        module = types.ModuleType("machine")
+        module.Pin = Pin
+        module.SPI = SPI
+        module.SoftSPI = SoftSPI
+        sys.modules["machine"] = module
+
+
+def reset():
+    """Forget every simulated pin (call between independent scenarios)."""
+    Pin._pins.clear()
+
+
+class SimRadio:
+    """Register-level model of one SX127x chip attached to a simulated bus.
+
+    Args:
+        spi: Simulated SPI bus the chip sits on.
+        cs: Chip-select pin id (or Pin).
+        reset: Reset pin id (or Pin), optional.
+        dio0: DIO0 pin id (or Pin); RX_DONE raises an edge on it.
+        air: Optional SimAir medium shared with other radios.
+    """
+
+    def __init__(self, spi, cs, reset=None, dio0=None, air=None):
+        self.regs = bytearray(0x80)
+        self.regs[REG_VERSION] = 0x12
+        self.fifo = bytearray(256)
+        self.cs = Pin(cs)
+        self.dio0 = Pin(dio0) if dio0 is not None else None
+        self.reset_pin = Pin(reset) if reset is not None else None
+        self.transmitted = []
+        self.dropped = 0
+        self.delivered = 0
+        self.overruns = 0
+        self._addr = None
+        self._write = False
+        spi.attach(self)
+        self.cs._listeners.append(self._on_cs)
+        self.air = air
+        if air is not None:
+            air.join(self)
+
+    def selected(self):
+        return self.cs._value == 0
+
+    def _on_cs(self, pin, value):
+        if value == 0:
+            self._addr = None
+
+    def transfer(self, data):
+        reply = bytearray(len(data))
+        for i, byte in enumerate(data):
+            if self._addr is None:
+                self._addr = byte & 0x7f
+                self._write = bool(byte & 0x80)
+                continue
+            if self._write:
+                self._write_reg(self._addr, byte)
+            else:
+                reply[i] = self._read_reg(self._addr)
+            if self._addr != REG_FIFO:
+                self._addr = (self._addr + 1) & 0x7f
+        return reply
+
+    def _write_reg(self, addr, value):
+        regs = self.regs
+        if addr == REG_FIFO:
+            ptr = regs[REG_FIFO_ADDR_PTR]
+            self.fifo[ptr] = value
+            regs[REG_FIFO_ADDR_PTR] = (ptr + 1) & 0xff
+        elif addr == REG_IRQ_FLAGS:
+            regs[addr] &= ~value & 0xff
+        elif addr == REG_OP_MODE:
+            regs[addr] = value
+            if value & 0x07 == MODE_TX:
+                self._transmit()
+        else:
+            regs[addr] = value
+
+    def _read_reg(self, addr):
+        regs = self.regs
+        if addr == REG_FIFO:
+            ptr = regs[REG_FIFO_ADDR_PTR]
+            regs[REG_FIFO_ADDR_PTR] = (ptr + 1) & 0xff
+            return self.fifo[ptr]
+        return regs[addr]
+
+    def mode(self):
+        return self.regs[REG_OP_MODE] & 0x07
+
+    def _transmit(self):
+        regs = self.regs
+        base = regs[REG_FIFO_TX_BASE_ADDR]
+        length = regs[REG_PAYLOAD_LENGTH]
+        payload = bytes(self.fifo[(base + i) & 0xff] for i in range(length))
+        self.transmitted.append(payload)
+        regs[REG_OP_MODE] = (regs[REG_OP_MODE] & 0xf8) | MODE_STDBY
+        regs[REG_IRQ_FLAGS] |= IRQ_TX_DONE_MASK
+        if self.air is not None:
+            self.air.broadcast(self, payload)
+
+    def deliver(self, payload, rssi=-60, snr=8.0, crc_error=False):
+        """Place a frame in the RX FIFO and raise DIO0, as a received packet.
+
+        Frames arriving while the chip is not in continuous RX are dropped.
+        A frame arriving before the previous RX_DONE was cleared overwrites
+        the unread one in the FIFO, counted in ``overruns``.
+
+        Returns:
+            True if the frame was delivered, False if it was dropped.
+        """
+        if self.mode() != MODE_RX_CONTINUOUS:
+            self.dropped += 1
+            return False
+        regs = self.regs
+        self.delivered += 1
+        if regs[REG_IRQ_FLAGS] & IRQ_RX_DONE_MASK:
+            self.overruns += 1
+        base = regs[REG_FIFO_RX_BASE_ADDR]
+        for i, byte in enumerate(payload):
+            self.fifo[(base + i) & 0xff] = byte
+        regs[REG_FIFO_RX_CURRENT_ADDR] = base
+        regs[REG_RX_NB_BYTES] = len(payload)
+        regs[REG_PKT_RSSI_VALUE] = max(0, min(255, int(rssi) + RSSI_OFFSET))
+        regs[REG_PKT_SNR_VALUE] = int(round(snr * 4)) & 0xff
+        flags = IRQ_RX_DONE_MASK
+        if crc_error:
+            flags |= IRQ_PAYLOAD_CRC_ERROR_MASK
+        regs[REG_IRQ_FLAGS] |= flags
+        if self.dio0 is not None:
+            self.dio0.fire()
+        return True
+
+
+class SimAir:
+    """Shared radio medium that hands every transmitted frame to the others.
+
+    By default frames are delivered synchronously from the transmitting call.
+    After ``start()`` they are delivered from a background thread instead, so
+    DIO0 interrupts land at arbitrary points of the receiver's main code, as
+    they do on hardware.
+    """
+
+    def __init__(self, rssi=-60, snr=8.0):
+        self.radios = []
+        self.rssi = rssi
+        self.snr = snr
+        self._queue = deque()
+        self._event = threading.Event()
+        self._thread = None
+        self._running = False
+
+    def join(self, radio):
+        self.radios.append(radio)
+
+    def broadcast(self, sender, payload):
+        for radio in self.radios:
+            if radio is sender:
+                continue
+            if self._running:
+                self._queue.append((radio, payload))
+                self._event.set()
+            else:
+                radio.deliver(payload, self.rssi, self.snr)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while self._running or self._queue:
+            if not self._queue:
+                self._event.wait(0.01)
+                self._event.clear()
+                continue
+            radio, payload = self._queue.popleft()
+            radio.deliver(payload, self.rssi, self.snr)
@@ -0,0 +1,132 @@
+"""
+Host test for the BMP180 driver against the datasheet example.
+
+A fake I2C bus serves the calibration EEPROM and conversion results of the
+Bosch datasheet example (section 3.5: UT = 27898, UP = 23843, oss = 0),
+which must compensate to 15.0 C and 69964 Pa through every read path. The
+benchmark then reports the cost per compensation and per read (conversion
+sleeps skipped) and the I2C transactions each one needs.
+
+Run from the repository root:
+    python test/bmp180_host_test.py
+    python test/bmp180_host_test.py --iterations 100000
+"""
+
+import argparse
+import asyncio
+import struct
+import sys
+import time
+
+sys.path.append('./library')
+import bmp180
+from bmp180 import BMP180
+
+CALIBRATION = (408, -72, -14383, 32741, 32757, 23153, 6190, 4, -32768, -8711, 2868)
+UT = 27898
+UP = 23843
+EXPECTED = (15.0, 69964)
+
+
+class FakeI2C:
+    """BMP180 register file answering like the datasheet example."""
+
+    def __init__(self):
+        self.mem = bytearray(256)
+        self.mem[0xD0] = 0x55
+        self.mem[0xAA:0xAA + 22] = struct.pack('>hhhHHHhhhhh', *CALIBRATION)
+        self.reads = 0
+        self.writes = 0
+
+    def writeto_mem(self, addr, reg, buf):
+        self.writes += 1
+        cmd = buf[0]
+        if cmd == 0x2E:
+            self.mem[0xF6:0xF8] = struct.pack('>H', UT)
+        else:
+            up = UP << (8 - (cmd >> 6))
+            self.mem[0xF6:0xF9] = bytes(((up >> 16) & 0xFF, (up >> 8) & 0xFF, up & 0xFF))
+
+    def readfrom_mem(self, addr, reg, n):
+        self.reads += 1
+        return bytes(self.mem[reg:reg + n])
+
+
+def check(label, got, failures):
+    ok = got == EXPECTED
+    print('%-14s %s %s' % (label, got, 'OK' if ok else 'esperado %s' % (EXPECTED,)))
+    if not ok:
+        failures.append(label)
+
+
+def run_checks():
+    failures = []
+    i2c = FakeI2C()
+    sensor = BMP180(i2c)
+    init_reads = i2c.reads
+    sensor.oversample_sett = 0
+
+    calibration_ok = sensor.compvaldump()[:11] == list(CALIBRATION)
+    print('calibracion    %s' % ('OK' if calibration_ok else 'FALLA'))
+    if not calibration_ok:
+        failures.append('calibracion')
+    print('lecturas I2C en init: %d' % init_reads)
+
+    check('read()', sensor.read(), failures)
+    check('read_async()', asyncio.run(sensor.read_async()), failures)
+
+    sensor.gauge = sensor.makegauge()
+    while next(sensor.gauge) is None:
+        time.sleep(0.001)
+    check('gauge', (sensor.temperature, sensor.pressure), failures)
+    return failures
+
+
+def benchmark(iterations):
+    i2c = FakeI2C()
+    sensor = BMP180(i2c)
+    sensor.oversample_sett = 0
+    sensor.read()
+
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        sensor._dirty = True
+        sensor._compensate()
+    compensate_us = (time.perf_counter() - t0) / iterations * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        sensor.temperature
+        sensor.pressure
+    cached_us = (time.perf_counter() - t0) / iterations * 1e6
+
+    sleep_ms = bmp180.sleep_ms
+    bmp180.sleep_ms = lambda ms: None  # only bus and arithmetic cost
+    try:
+        reads, writes = i2c.reads, i2c.writes
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            sensor.read()
+        read_us = (time.perf_counter() - t0) / iterations * 1e6
+    finally:
+        bmp180.sleep_ms = sleep_ms
+
+    print('compensacion:        %.2f us' % compensate_us)
+    print('temperature+pressure (cache): %.2f us' % cached_us)
+    print('read() sin esperas:  %.2f us, %.0f lecturas + %.0f escrituras I2C' % (
+        read_us, (i2c.reads - reads) / iterations, (i2c.writes - writes) / iterations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    failures = run_checks()
+    benchmark(args.iterations)
+    print('PASS' if not failures else 'FAIL: %s' % ', '.join(failures))
+    sys.exit(0 if not failures else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark of the CSV export against the original fetchall() implementation.
+
+Generates a measurements-like table in PostgreSQL (connection from .env),
+exports it with each method in a separate process and reports wall time,
+rows/s and peak resident memory.
+
+Run from the repository root:
+    python test/export_benchmark.py --rows 5000000
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append('./src')
+import export_to_csv
+from db import Database
+
+BENCH_TABLE = "export_bench"
+
+
+def create_dataset(db, rows):
+    with db.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cur.execute(
+            f"""
+            CREATE TABLE {BENCH_TABLE} AS
+            SELECT g AS measurement_id,
+                   TIMESTAMP '2026-01-01' + g * INTERVAL '1 second' AS timestamp,
+                   (g % 200)::text AS node_id,
+                   (g % 3 + 1) AS sensor_type_id,
+                   random() * 100 AS value
+            FROM generate_series(1, %s) AS g
+            """,
+            (rows,),
+        )
+
+
+def export_fetchall(path):
+    """Original implementation: materialize the whole table, then write."""
+    db = Database.postgres(max_connections=1)
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT * FROM {BENCH_TABLE}")
+        rows = cur.fetchall()
+        colnames = [desc[0] for desc in cur.description]
+        cur.close()
+    db.close()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(colnames)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def _run(method, path, results):
+    t0 = time.perf_counter()
+    if method == "fetchall":
+        rows = export_fetchall(path)
+    else:
+        rows = export_to_csv.export_table_to_csv(BENCH_TABLE, path, method=method)
+    elapsed = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((method, rows, elapsed, peak_kb))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de export_to_csv")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--keep", action="store_true", help="no borrar la tabla generada")
+    args = parser.parse_args()
+
+    db = Database.postgres(max_connections=1)
+    create_dataset(db, args.rows)
+    results = multiprocessing.Queue()
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for method in ("fetchall", "cursor", "copy"):
+            path = os.path.join(tmp, f"{method}.csv")
+            proc = multiprocessing.Process(target=_run, args=(method, path, results))
+            proc.start()
+            proc.join()
+            report.append(results.get())
+
+    print(f"\n{'metodo':<10} {'filas':>10} {'tiempo s':>9} {'filas/s':>10} {'RSS pico MB':>12}")
+    for method, rows, elapsed, peak_kb in report:
+        print(f"{method:<10} {rows:>10} {elapsed:>9.2f} {rows / elapsed:>10.0f} {peak_kb / 1024:>12.1f}")
+
+    if not args.keep:
+        db.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
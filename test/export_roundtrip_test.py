@@ -0,0 +1,92 @@
+"""
+Round trip of the columnar export: export_measurements_columnar, then load_measurements.
+
+Generates a measurements-like table in PostgreSQL (connection from .env),
+exports it as Parquet and as Feather, loads each dataset back (whole and
+filtered by date and node) and compares rows, types and values with the
+database.
+
+Run from the repository root:
+    python test/export_roundtrip_test.py --rows 50000
+"""
+
+import argparse
+import sys
+import tempfile
+
+sys.path.append('./src')
+import export_to_csv
+from db import Database
+
+ROUNDTRIP_TABLE = "export_roundtrip"
+
+
+def create_dataset(db, rows):
+    with db.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {ROUNDTRIP_TABLE}")
+        cur.execute(
+            f"""
+            CREATE TABLE {ROUNDTRIP_TABLE} AS
+            SELECT g AS measurement_id,
+                   TIMESTAMP '2026-01-01' + g * INTERVAL '10 seconds' AS timestamp,
+                   (g % 20)::text AS node_id,
+                   (g % 3 + 1) AS sensor_type_id,
+                   round((random() * 100)::numeric, 2)::real AS value
+            FROM generate_series(1, %s) AS g
+            """,
+            (rows,),
+        )
+
+
+def scalar(db, query, params=None):
+    return next(iter(db.query(query, params)[0].values()))
+
+
+def check(db, fmt, output_dir):
+    exported = export_to_csv.export_measurements_columnar(ROUNDTRIP_TABLE, output_dir, fmt, db=db)
+    df = export_to_csv.load_measurements(output_dir, fmt=fmt)
+    start = scalar(db, f"SELECT min(timestamp)::date + 1 FROM {ROUNDTRIP_TABLE}").isoformat()
+    part = export_to_csv.load_measurements(output_dir, start=start, node_ids=[3, 7], fmt=fmt)
+    expected_part = scalar(
+        db,
+        f"SELECT count(*) FROM {ROUNDTRIP_TABLE} WHERE timestamp::date >= %s AND node_id IN ('3', '7')",
+        (start,),
+    )
+    total = scalar(db, f"SELECT sum(value) FROM {ROUNDTRIP_TABLE}")
+
+    results = {
+        "filas exportadas": exported == len(df),
+        "filas filtradas": len(part) == expected_part,
+        "ids unicos": df["measurement_id"].is_unique,
+        "node_id categorico": df["node_id"].dtype == "category",
+        "tipos": (str(df["sensor_type_id"].dtype), str(df["value"].dtype)) == ("int16", "float32"),
+        "suma de valores": abs(float(df["value"].astype("float64").sum()) - total) <= 1e-3 * abs(total) + 1,
+    }
+    for name, ok in results.items():
+        print(f"  {fmt:8s} {name:20s} {'ok' if ok else 'FALLA'}")
+    return all(results.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--keep', action='store_true', help="no borrar la tabla de prueba")
+    args = parser.parse_args()
+
+    db = Database.postgres(max_connections=1)
+    try:
+        create_dataset(db, args.rows)
+        ok = True
+        for fmt in ("parquet", "feather"):
+            with tempfile.TemporaryDirectory() as tmp:
+                ok &= check(db, fmt, tmp)
+        if not args.keep:
+            db.execute(f"DROP TABLE {ROUNDTRIP_TABLE}")
+    finally:
+        db.close()
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
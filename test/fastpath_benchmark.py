@@ -0,0 +1,136 @@
+"""
+Fast paths of the driver and framing loops against their pure Python versions.
+
+Runs on CPython and on MicroPython (unix port or a board), from the
+repository root:
+    python test/fastpath_benchmark.py
+    micropython test/fastpath_benchmark.py
+
+Times the ring log CRC16 and the FIFO payload to string conversion, viper
+versions from ``library/fastpath.py`` against the pure Python ones (on
+CPython both are the pure Python version). With the simulated radio
+(CPython) it also compares reading a packet from the FIFO one register
+access per byte against one SPI burst.
+"""
+
+import sys
+
+sys.path.append('./library')
+sys.path.append('./src')
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:  # CPython
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+import ring_log
+
+try:
+    import sx127x_sim
+    sx127x_sim.install()
+except ImportError:  # MicroPython
+    sx127x_sim = None
+
+REG_FIFO = 0x00
+REG_FIFO_ADDR_PTR = 0x0d
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+
+def timed(func, *args):
+    """Microseconds per call of ``func(*args)`` over RUNS calls."""
+    func(*args)
+    t0 = ticks_us()
+    for _ in range(RUNS):
+        func(*args)
+    return ticks_diff(ticks_us(), t0) / RUNS
+
+
+def join_chr(payload):
+    return ''.join([chr(byte) for byte in payload])
+
+
+try:
+    import sx127x
+    payload_str = sx127x.payload_str
+except ImportError:  # unix port: no machine.Pin, same check as the driver
+    sx127x = None
+    try:
+        from fastpath import is_ascii
+    except (ImportError, SyntaxError, ValueError):
+        is_ascii = None
+
+    def payload_str(payload):
+        if is_ascii is not None and is_ascii(payload, len(payload)):
+            return payload.decode()
+        return join_chr(payload)
+
+
+def report(label, slow, fast=None):
+    if fast is None:
+        print("%-26s python %8.1f us" % (label, slow))
+        return
+    print("%-26s python %8.1f us  rapido %8.1f us  x%.1f" % (label, slow, fast, slow / fast))
+
+
+def bench_fifo():
+    """Per-byte vs burst FIFO read on the simulated radio (CPython only)."""
+    from machine import SoftSPI, Pin
+
+    spi = SoftSPI(baudrate=3000000, sck=Pin(5), mosi=Pin(27), miso=Pin(19))
+    radio = sx127x_sim.SimRadio(spi, cs=18, reset=14, dio0=26)
+    lora = sx127x.LoRa(spi, cs_pin=18, reset_pin=14, dio0_pin=26)
+    payload = bytes(range(sx127x.MAX_PKT_LENGTH))
+    radio.fifo[0:len(payload)] = payload
+
+    def per_byte():
+        lora.write_register(REG_FIFO_ADDR_PTR, 0)
+        return bytes([lora.read_register(REG_FIFO) for _ in range(len(payload))])
+
+    def burst():
+        lora.write_register(REG_FIFO_ADDR_PTR, 0)
+        return lora.read_fifo(len(payload))
+
+    ok = per_byte() == payload and burst() == payload
+    counts = []
+    for func in (per_byte, burst):
+        before = spi.transfers
+        func()
+        counts.append(spi.transfers - before)
+    report("FIFO %d B (sim)" % len(payload), timed(per_byte), timed(burst))
+    print("%-26s python %8d      rapido %8d" % ("transferencias SPI", counts[0], counts[1]))
+    return ok
+
+
+def main():
+    fast = ring_log.crc16 is not ring_log.crc16_py
+    print("fastpath (viper):", "si" if fast else "no, se usa la version Python")
+    ok = True
+
+    record = bytes((i * 37) & 0xFF for i in range(96))
+    # Check value of CRC-16/CCITT-FALSE
+    ok &= ring_log.crc16(b"123456789") == ring_log.crc16_py(b"123456789") == 0x29B1
+    ok &= ring_log.crc16(record) == ring_log.crc16_py(record)
+    report("crc16 96 B", timed(ring_log.crc16_py, record),
+           timed(ring_log.crc16, record) if fast else None)
+
+    text = b'{"node_id":64,"seq":1234,"t":21.75,"p":101325,"h":48.2}'
+    binary = bytes(range(128, 192))
+    for payload in (text, binary):
+        ok &= payload_str(payload) == join_chr(payload)
+    report("payload_str ASCII %d B" % len(text), timed(join_chr, text),
+           timed(payload_str, text) if fast else None)
+
+    if sx127x_sim is not None:
+        ok &= bench_fifo()
+
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+main()
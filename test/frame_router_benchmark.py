@@ -0,0 +1,103 @@
+"""
+Benchmark: inline decoding versus the FrameRouter worker pool.
+
+Generates gateway records from many nodes (JSON readings and delta frames),
+ingests them inline, with worker threads and with worker processes into an
+in-memory sink, and reports lines/s. Every mode must produce the same rows
+with each node's readings in arrival order.
+
+Run from the repository root:
+    python test/frame_router_benchmark.py
+    python test/frame_router_benchmark.py --lines 200000 --nodes 500 --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append('./library')
+sys.path.append('./src')
+from delta_codec import DeltaEncoder
+from frame_router import FrameRouter
+from ingest_gateway import IngestService
+
+
+class MemorySink:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, rows):
+        self.rows.extend(rows)
+
+    def close(self):
+        pass
+
+
+def record_lines(n, nodes):
+    enc = DeltaEncoder(0, 2)
+    for i in range(n):
+        node = i % nodes
+        fecha = "2026-01-01 %02d:%02d:%02d" % (i // 3600 % 24, i // 60 % 60, i % 60)
+        if i % 10 == 9:
+            enc.node_id = node % 256
+            enc.reset(seq=i & 0xFFFF)
+            for k in range(8):
+                enc.append(1000 * k, 20 + (i + k) % 50 / 10)
+            mensaje = "".join(chr(b) for b in enc.frame())
+        else:
+            mensaje = json.dumps({"node_id": str(node), "sensor_type_id": 1,
+                                  "value": i / 100, "seq": i})
+        yield json.dumps({"fecha": fecha, "mensaje_recibido": mensaje, "rssi": -70, "snr": 7.5})
+
+
+def per_node(rows):
+    nodes = {}
+    for row in rows:
+        nodes.setdefault(row[0], []).append(row)
+    return nodes
+
+
+def run(label, lines, workers=0, processes=False):
+    sink = MemorySink()
+    service = IngestService(sink, queue_size=20000).start()
+    t0 = time.perf_counter()
+    if workers:
+        router = FrameRouter(service, workers=workers, processes=processes).start()
+        router.feed(lines)
+        router.stop()
+    else:
+        service.feed(lines)
+    service.stop()
+    elapsed = time.perf_counter() - t0
+    print("%-22s %8.0f lineas/s  %d filas  %.2f s" % (
+        label, len(lines) / elapsed, len(sink.rows), elapsed))
+    return sink.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=50000)
+    parser.add_argument('--nodes', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    lines = list(record_lines(args.lines, args.nodes))
+    print("%d lineas, %d nodos, %d workers (%d CPU)" % (
+        len(lines), args.nodes, args.workers, os.cpu_count() or 1))
+
+    reference = per_node(run("en linea", lines))
+    ok = True
+    for label, processes in (("hilos", False), ("procesos", True)):
+        rows = per_node(run(label, lines, args.workers, processes))
+        if rows != reference:
+            print("  orden por nodo distinto al de referencia")
+            ok = False
+
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
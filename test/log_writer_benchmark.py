@@ -0,0 +1,95 @@
+"""
+Benchmark: per-packet open/append/close versus the buffered LogWriter.
+
+Writes the same gateway records both ways into a temporary directory and
+reports the mean and worst per-packet cost (the time reception is blocked)
+plus the number of file opens. Both outputs must load identically.
+
+Run from the repository root (CPython, or MicroPython's unix port):
+    python test/log_writer_benchmark.py
+    python test/log_writer_benchmark.py --records 20000 --buffer 8192
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append('./library')
+from log_writer import LogWriter
+
+
+def format_datetime():
+    t = time.localtime()
+    return "{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(
+        t[0], t[1], t[2], t[3], t[4], t[5]
+    )
+
+
+def save_per_packet(filename, mensaje, rssi, snr):
+    # Previous examples/test_receiver.py behaviour
+    line = json.dumps(
+        {"fecha": format_datetime(), "mensaje_recibido": mensaje, "rssi": rssi, "snr": snr}
+    )
+    with open(filename, "a") as f:
+        f.write(line)
+        f.write("\n")
+
+
+def records(n):
+    for i in range(n):
+        mensaje = json.dumps({"node_id": "64", "sensor_type_id": 1, "value": 21.5,
+                              "timestamp": 1000 * i, "seq": i})
+        yield mensaje, -60 - i % 40, 7.25
+
+
+def timed(label, n, write, finish):
+    worst = 0.0
+    t0 = time.perf_counter()
+    for mensaje, rssi, snr in records(n):
+        t = time.perf_counter()
+        write(mensaje, rssi, snr)
+        dt = time.perf_counter() - t
+        if dt > worst:
+            worst = dt
+    finish()
+    total = time.perf_counter() - t0
+    print("%-12s %8.1f us/paquete  peor %8.1f us  total %.3f s" % (
+        label, total / n * 1e6, worst * 1e6, total))
+    return total
+
+
+def load(path):
+    rows = []
+    with open(path) as f:
+        for line in f:
+            r = json.loads(line)
+            rows.append((r["mensaje_recibido"], r["rssi"], r["snr"]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--buffer', type=int, default=4096)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "ensayo_old.txt")
+        new_path = os.path.join(tmp, "ensayo_new.txt")
+
+        old = timed("por paquete", args.records,
+                    lambda m, r, s: save_per_packet(old_path, m, r, s), lambda: None)
+        log = LogWriter(new_path, buffer_size=args.buffer, max_file_size=1 << 30)
+        new = timed("LogWriter", args.records, log.write, log.close)
+
+        print("aperturas: %d vs %d (x%.1f mas rapido)" % (args.records, log.flushes, old / new))
+        same = load(old_path) == load(new_path)
+        print("mismo contenido:", "OK" if same else "FALLA")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -25,6 +25,10 @@ from sx127x import LoRa
 # --- DS18B20 libs ---
 import onewire
 import ds18x20
+from ds18b20 import DS18B20Reader
+from aggregator import Aggregator
+from delta_codec import DeltaEncoder
+from ring_log import RingLog
 
 # --- BMP180 lib ---
 from bmp180 import BMP180
@@ -54,7 +58,31 @@ I2C_SDA_PIN = 32
 NODE_ID = "64"
 
 
-SEND_INTERVAL_S = 10
+# Muestreo rápido; al aire solo van agregados por ventana (media/min/max/n)
+SAMPLE_INTERVAL_MS = 1000
+WINDOW_S = 60
+HEARTBEAT_S = 600          # envía aunque no haya cambios
+TEMP_DEADBAND_C = 0.1      # no envía si la media cambió menos que esto
+PRES_DEADBAND_PA = 20
+TEMP_EVENT_C = 1.0         # una muestra que salta esto cierra la ventana ya
+PRES_EVENT_PA = 200
+
+# >0: junta las medias de N ventanas en una trama binaria delta (delta_codec)
+# en lugar de una trama JSON por ventana; sin min/max y con un solo DS18B20
+BATCH_READINGS = 0
+
+# Store-and-forward: cada trama se guarda en flash hasta que el gateway la
+# confirma; lo pendiente se reenvía de a una trama cada DRAIN_INTERVAL_MS,
+# intercalado con el tráfico en vivo. El gateway espera a que termine la
+# ráfaga (PRES, TEMP...) y manda un solo "ACK:<nodo>:<a>-<b>,<c>" con los
+# tramos de secuencias recibidas, así ningún ACK llega mientras el nodo
+# transmite ni pisa a otro en el FIFO
+STORE_FORWARD = True
+RING_FILE = "ring.log"
+RING_SLOTS = 256
+RING_RECORD_SIZE = 264     # entra una trama LoRa completa (255 bytes)
+DRAIN_INTERVAL_MS = 2000
+RETRY_MS = 30000           # espera al ACK antes de reenviar la misma trama
 
 DS18B20_RETRIES = 3
 BMP180_RETRIES  = 3
@@ -79,39 +107,6 @@ GC_EVERY_N_SENDS = 10
 # -----------------------------
 # Helpers
 # -----------------------------
-def valid_ds_temp(t):
-    # 85.0 = default after power-up / conversion issue
-    # -127.0 = typical error value
-    if t is None:
-        return False
-    if t == 85.0 or t == -127.0:
-        return False
-    return (-60.0 <= t <= 130.0)
-
-
-def read_ds18b20(ds, roms, retries=3):
-    """
-    Returns: (temp_c, rom_hex) or (None, rom_hex/None)
-    """
-    if not roms:
-        return (None, None)
-
-    rom = roms[0]
-    rom_hex = rom.hex()
-
-    for _ in range(retries):
-        try:
-            ds.convert_temp()
-            time.sleep_ms(750)
-            t = ds.read_temp(rom)
-            if valid_ds_temp(t):
-                return (float(t), rom_hex)
-        except Exception:
-            time.sleep_ms(100)
-
-    return (None, rom_hex)
-
-
 def read_bmp180(bmp, retries=3):
     """
     Returns: (temp_c, pressure_pa) or (None, None)
@@ -121,9 +116,7 @@ def read_bmp180(bmp, retries=3):
 
     for _ in range(retries):
         try:
-            bmp.blocking_read()
-            t = bmp.temperature
-            p = bmp.pressure  # Pa (por implementación)
+            t, p = bmp.read()  # misma muestra, Pa
             if p is not None and p > 10000:
                 return (float(t), float(p))
         except Exception:
@@ -148,16 +141,101 @@ def build_payload(counter, uptime_s, ds_temp, ds_rom, bmp_temp, bmp_pres_pa):
     return "{" + ",".join(parts) + "}"
 
 
-def build_measurement(node_id, sensor_type_id, value, uptime_ms):
+def build_measurement(node_id, sensor_type_id, value, uptime_ms, seq, rom=None, window=None):
     msg = {
         "node_id": node_id,
         "sensor_type_id": sensor_type_id,
         "value": value,
-        "timestamp": uptime_ms  # <-- útil para orden y debug
+        "timestamp": uptime_ms,  # <-- útil para orden y debug
+        "seq": seq  # contador de tramas: PDR, duplicados y reordenamiento en el gateway
     }
+    if rom is not None:
+        msg["rom"] = rom  # varios DS18B20 en el bus
+    if window is not None:
+        # agregado de la ventana: value es la media
+        msg["min"] = window[0]
+        msg["max"] = window[1]
+        msg["n"] = window[2]
     return ujson.dumps(msg)
 
 
+def next_seq():
+    """Secuencia de la próxima trama: la del ring log si está activo."""
+    global tx_seq
+    if ring is not None:
+        return ring.head
+    tx_seq += 1
+    return tx_seq - 1
+
+
+def transmit(label, payload):
+    seq = None
+    if ring is not None:
+        try:
+            seq = ring.append(payload)
+        except Exception as e:
+            print("RING FAIL:", e)
+    try:
+        lora.send(payload)
+        print("TX %s OK" % label)
+        if seq is not None:
+            ring.mark_sent(seq)
+    except Exception as e:
+        print("TX %s FAIL:" % label, e)
+
+
+def send_frame(label, enc):
+    frame = bytes(enc.frame(next_seq()))
+    print("TX %s: %d lecturas, %d bytes" % (label, enc.count, len(frame)))
+    transmit(label, frame)
+    enc.reset()
+
+
+def queue_reading(label, enc, value, uptime_ms):
+    if not enc.append(uptime_ms, value):
+        send_frame(label, enc)
+        enc.append(uptime_ms, value)
+    if enc.count >= BATCH_READINGS:
+        send_frame(label, enc)
+
+
+def send_measurement(label, sensor_type_id, value, uptime_ms, rom=None, window=None):
+    payload = build_measurement(NODE_ID, sensor_type_id, value, uptime_ms, next_seq(), rom, window)
+    print("TX %s:" % label, payload)
+    transmit(label, payload)
+
+
+def handle_downlink():
+    """Procesa los ACK del gateway recibidos desde el último ciclo."""
+    packet = lora.get_packet()
+    while packet:
+        msg = packet["payload"]
+        if ring is not None and msg.startswith("ACK:"):
+            try:
+                _, node, ranges = msg.split(":")
+                if node == NODE_ID:
+                    for part in ranges.split(","):
+                        first, _, last = part.partition("-")
+                        ring.ack_range(int(first), int(last or first), bits=16)
+            except ValueError:
+                pass
+        packet = lora.get_packet()
+
+
+def drain_backlog(now_ms):
+    global last_drain_ms
+    if ring is None or time.ticks_diff(now_ms, last_drain_ms) < DRAIN_INTERVAL_MS:
+        return
+    last_drain_ms = now_ms
+    item = ring.next_to_drain(now_ms)
+    if item is not None:
+        seq, payload = item
+        print("TX BACKLOG #%d (%d pendientes)" % (seq, ring.pending()))
+        try:
+            lora.send(payload)
+        except Exception as e:
+            print("TX BACKLOG FAIL:", e)
+
 
 # -----------------------------
 # Init LoRa
@@ -196,6 +274,9 @@ try:
 except Exception:
     ds_roms = []
 
+# Una conversión broadcast para todos los sensores; se lee al terminar
+ds_reader = DS18B20Reader(ds, ds_roms, retries=DS18B20_RETRIES)
+
 
 # -----------------------------
 # Init BMP180 (I2C)
@@ -217,41 +298,87 @@ print("LoRa Sensor Sender Started")
 print("Node:", NODE_ID)
 print("DS18B20 ROMs:", [r.hex() for r in ds_roms] if ds_roms else "NONE")
 print("BMP180:", "OK" if bmp else "INIT FAIL")
-print("Interval:", SEND_INTERVAL_S, "s")
+
+ring = None
+if STORE_FORWARD:
+    try:
+        ring = RingLog(RING_FILE, slots=RING_SLOTS, record_size=RING_RECORD_SIZE,
+                       retry_ms=RETRY_MS)
+        print("Ring log: %d pendientes, próxima seq %d" % (ring.pending(), ring.head))
+    except Exception as e:
+        print("Ring log INIT FAIL:", e)
+last_drain_ms = time.ticks_ms()
+print("Sample:", SAMPLE_INTERVAL_MS, "ms  Window:", WINDOW_S, "s")
+
+# Canal 0 = presión, 1.. = un DS18B20 cada uno
+CH_PRES = 0
+rom_channel = {}
+for i, rom in enumerate(ds_roms):
+    rom_channel[rom.hex()] = 1 + i
+multi = len(ds_roms) > 1
+
+agg = Aggregator(
+    channels=1 + len(ds_roms),
+    window_ms=WINDOW_S * 1000,
+    deadband=[PRES_DEADBAND_PA] + [TEMP_DEADBAND_C] * len(ds_roms),
+    event_delta=[PRES_EVENT_PA] + [TEMP_EVENT_C] * len(ds_roms),
+    heartbeat_ms=HEARTBEAT_S * 1000,
+)
+
+# Un codificador por canal, con su buffer de 255 bytes preasignado
+encoders = None
+if BATCH_READINGS > 0:
+    encoders = [DeltaEncoder(NODE_ID, 3, decimals=0)]
+    encoders += [DeltaEncoder(NODE_ID, 1, decimals=2) for _ in ds_roms]
 
 counter = 0
+tx_seq = 0
 t0 = time.ticks_ms()
 
 while True:
-    uptime_ms = time.ticks_ms()
+    cycle_start = time.ticks_ms()
 
-    ds_temp, ds_rom = read_ds18b20(ds, ds_roms, DS18B20_RETRIES)
-    bmp_temp, bmp_pres = read_bmp180(bmp, BMP180_RETRIES)
+    # Arranca la conversión (750 ms) y trabaja mientras tanto
+    ds_reader.start()
 
-    # TEMPERATURA (1)
-    if ds_temp is not None:
-        payload_t = build_measurement(NODE_ID, 1, round(ds_temp, 2), uptime_ms)
-        print("TX TEMP:", payload_t)
-        try:
-            lora.send(payload_t)
-            print("TX TEMP OK")
-        except Exception as e:
-            print("TX TEMP FAIL:", e)
+    bmp_temp, bmp_pres = read_bmp180(bmp, BMP180_RETRIES)
+    if bmp_pres is not None:
+        agg.add(CH_PRES, bmp_pres, cycle_start)
 
     # PRESION (3)
-    if bmp_pres is not None:
-        payload_p = build_measurement(NODE_ID, 3, int(bmp_pres), uptime_ms)
-        print("TX PRES:", payload_p)
-        try:
-            lora.send(payload_p)
-            print("TX PRES OK")
-        except Exception as e:
-            print("TX PRES FAIL:", e)
+    out = agg.poll(CH_PRES, cycle_start)
+    if out is not None:
+        if encoders:
+            queue_reading("PRES", encoders[CH_PRES], out[0], cycle_start)
+        else:
+            send_measurement("PRES", 3, int(out[0]), cycle_start,
+                             window=(int(out[1]), int(out[2]), out[3]))
+
+    # TEMPERATURA (1)
+    for rom_hex, ch in rom_channel.items():
+        out = agg.poll(ch, cycle_start)
+        if out is None:
+            continue
+        if encoders:
+            queue_reading("TEMP", encoders[ch], out[0], cycle_start)
+        else:
+            send_measurement("TEMP", 1, round(out[0], 2), cycle_start,
+                             rom_hex if multi else None,
+                             (round(out[1], 2), round(out[2], 2), out[3]))
+
+    # ACKs recibidos y, si hay atraso, una trama pendiente
+    handle_downlink()
+    drain_backlog(cycle_start)
+
+    # Solo espera lo que falte de la conversión
+    for rom_hex, t in ds_reader.collect().items():
+        if t is not None:
+            agg.add(rom_channel[rom_hex], t, cycle_start)
 
     counter += 1
 
     if (counter % GC_EVERY_N_SENDS) == 0:
         gc.collect()
 
-    time.sleep(SEND_INTERVAL_S)
-
+    elapsed_ms = time.ticks_diff(time.ticks_ms(), cycle_start)
+    time.sleep_ms(max(0, SAMPLE_INTERVAL_MS - elapsed_ms))
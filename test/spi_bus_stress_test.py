@@ -0,0 +1,158 @@
+"""
+Host stress test: two simulated SX127x radios sharing one SPI bus.
+
+Both radios transmit to each other from their own threads while DIO0
+interrupts arrive from the simulated air at arbitrary points. With the
+SPIBus arbiter no transfer may overlap another device's chip select,
+every received frame must be intact and none may be lost: frames delivered
+while in RX, minus those overwritten before being read (in the chip FIFO or
+in the driver before get_packet()), must equal the frames received.
+
+Run from the repository root:
+    python test/spi_bus_stress_test.py            # with SPIBus
+    python test/spi_bus_stress_test.py --no-bus   # shows the corruption
+"""
+
+import argparse
+import re
+import sys
+import threading
+import time
+
+sys.path.append('./library')
+sys.path.append('./src')
+import sx127x_sim
+
+sx127x_sim.install()
+
+from machine import SoftSPI, Pin
+from spi_bus import SPIBus
+import sx127x
+from sx127x import LoRa
+
+FRAME_RE = re.compile(r'^[AB]#\d{5}$')
+
+
+class CountingLoRa(LoRa):
+    """LoRa counting packets replaced before get_packet() returned them."""
+
+    __slots__ = ('overwritten', '_state_lock')
+
+    def __init__(self, *args, **kwargs):
+        self.overwritten = 0
+        self._state_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _read_packet(self):
+        with self._state_lock:
+            pending = self.packet_received
+            raw = self.received_raw
+            super()._read_packet()
+            if pending and self.received_raw is not raw:
+                self.overwritten += 1
+
+    def get_packet(self, *args, **kwargs):
+        with self._state_lock:
+            return super().get_packet(*args, **kwargs)
+
+
+def register_map_mismatches():
+    """Simulator constants whose value differs from the driver's."""
+    mismatches = []
+    for name in dir(sx127x_sim):
+        if name.startswith(('REG_', 'IRQ_', 'MODE_')) or name == 'RSSI_OFFSET':
+            driver = getattr(sx127x, '_' + name, None)
+            if driver is not None and driver != getattr(sx127x_sim, name):
+                mismatches.append('%s: sim 0x%02x, driver 0x%02x'
+                                  % (name, getattr(sx127x_sim, name), driver))
+    return mismatches
+
+
+def run(frames, use_bus, listen_ms):
+    sx127x_sim.reset()
+    air = sx127x_sim.SimAir()
+    spi = SoftSPI(baudrate=3000000, sck=Pin(5), mosi=Pin(27), miso=Pin(19))
+    sim_a = sx127x_sim.SimRadio(spi, cs=18, reset=14, dio0=26, air=air)
+    sim_b = sx127x_sim.SimRadio(spi, cs=17, reset=16, dio0=4, air=air)
+    bus = SPIBus(spi) if use_bus else None
+    radio_a = CountingLoRa(spi, cs_pin=18, reset_pin=14, dio0_pin=26, bus=bus)
+    radio_b = CountingLoRa(spi, cs_pin=17, reset_pin=16, dio0_pin=4, bus=bus)
+
+    received = {'A': [], 'B': []}
+    errors = []
+
+    def worker(name, radio):
+        try:
+            for i in range(frames):
+                radio.send('%s#%05d' % (name, i))
+                deadline = time.perf_counter() + listen_ms / 1000
+                while time.perf_counter() < deadline:
+                    packet = radio.get_packet()
+                    if packet:
+                        received[name].append(packet['payload'])
+        except Exception as e:
+            errors.append('%s: %r' % (name, e))
+
+    air.start()
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=('A', radio_a), daemon=True),
+               threading.Thread(target=worker, args=('B', radio_b), daemon=True)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        # A corrupted OP_MODE write can leave send() polling TX_DONE forever
+        t.join(timeout=30)
+        if t.is_alive():
+            errors.append('%s: stalled' % t.name)
+    air.stop()
+    for name, radio in (('A', radio_a), ('B', radio_b)):
+        packet = radio.get_packet()
+        if packet:
+            received[name].append(packet['payload'])
+    elapsed = time.perf_counter() - t0
+
+    corrupted = [p for name in received for p in received[name]
+                 if not FRAME_RE.match(p) or p[0] == name]
+    total_rx = len(received['A']) + len(received['B'])
+    delivered = sim_a.delivered + sim_b.delivered
+    overwritten = (sim_a.overruns + sim_b.overruns
+                   + radio_a.overwritten + radio_b.overwritten)
+    lost = delivered - overwritten - total_rx
+    mismatches = register_map_mismatches()
+    print('Mode:            ', 'SPIBus' if use_bus else 'no arbitration')
+    print('Frames sent:     ', len(sim_a.transmitted) + len(sim_b.transmitted))
+    print('Frames received: ', total_rx)
+    print('Dropped (not RX):', sim_a.dropped + sim_b.dropped)
+    print('Delivered in RX: ', delivered)
+    print('Overwritten:     ', overwritten)
+    print('Lost:            ', lost)
+    print('SPI transfers:   ', spi.transfers)
+    print('Bus collisions:  ', spi.collisions)
+    print('Corrupted frames:', len(corrupted))
+    print('Driver errors:   ', len(errors))
+    for m in mismatches:
+        print('Register map:    ', m)
+    print('Elapsed:          %.2f s (%.0f transfers/s)' % (elapsed, spi.transfers / elapsed))
+    if bus is not None:
+        print('Deferred dropped:', bus.dropped)
+    return (spi.collisions == 0 and not corrupted and not errors and total_rx > 0
+            and lost == 0 and not mismatches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--listen-ms', type=float, default=2.0,
+                        help='time each radio listens after a transmission')
+    parser.add_argument('--no-bus', action='store_true')
+    args = parser.parse_args()
+
+    # Switch threads often so IRQs land inside register transactions
+    sys.setswitchinterval(1e-5)
+    ok = run(args.frames, not args.no_bus, args.listen_ms)
+    print('PASS' if ok else 'FAIL')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Concurrent AsyncDatabase writes while a spool is pending.
+
+Spools a batch during a simulated outage of a SQLite database, then runs
+several ``write_measurements`` calls at once (each in its own thread, as
+``AsyncDatabase`` does) with slow inserts so they overlap. The spool must be
+replayed exactly once: no errors, no duplicated or missing rows, and no
+spool file left behind.
+
+Run from the repository root:
+    python test/spool_concurrency_test.py
+    python test/spool_concurrency_test.py --writers 8 --rows 500
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append('./src')
+from db import AsyncDatabase, Database
+
+TABLE = "spool_test"
+
+
+class FlakyDatabase(Database):
+    """SQLite pool that can be taken down and whose inserts are slow."""
+
+    def __init__(self, path, delay):
+        super().__init__(self._open, "sqlite", disconnect_errors=(ConnectionError,))
+        self.path = path
+        self.delay = delay
+        self.down = False
+
+    def _open(self):
+        if self.down:
+            raise ConnectionError("base caida (simulada)")
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def insert_measurements(self, conn, rows, table=TABLE):
+        time.sleep(self.delay)
+        super().insert_measurements(conn, rows, table)
+
+
+def batch(start, n):
+    t0 = datetime(2026, 1, 1)
+    return [(str(i % 7), 1, float(i), t0 + timedelta(seconds=i)) for i in range(start, start + n)]
+
+
+async def run(db, spool, writers, rows):
+    adb = AsyncDatabase(db, TABLE, spool)
+    adb.writer.retry_interval = 0
+
+    db.down = True
+    db.close()
+    spooled = await adb.write_measurements(batch(0, rows))
+    db.down = False
+
+    results = await asyncio.gather(
+        *[adb.write_measurements(batch((k + 1) * rows, rows)) for k in range(writers)],
+        return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    counts = await adb.query("SELECT count(*) AS n, count(DISTINCT value) AS d FROM %s" % TABLE)
+    await adb.close()
+    return spooled, errors, counts[0], adb.writer.replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.05, help="segundos por insercion")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = os.path.join(tmp, "spool.csv")
+        db = FlakyDatabase(os.path.join(tmp, "ingest.db"), args.delay)
+        spooled, errors, counts, replayed = asyncio.run(run(db, spool, args.writers, args.rows))
+        expected = (args.writers + 1) * args.rows
+        results = {
+            "lote al spool": spooled is False,
+            "sin errores": not errors,
+            "filas": counts["n"] == expected,
+            "sin duplicados": counts["d"] == counts["n"],
+            "spool reenviado una vez": replayed == args.rows,
+            "spool borrado": not os.path.exists(spool),
+        }
+    for e in errors:
+        print("  error:", repr(e))
+    print("  %d filas (esperadas %d), %d reenviadas del spool" % (counts["n"], expected, replayed))
+    for name, ok in results.items():
+        print(f"  {name:24s} {'ok' if ok else 'FALLA'}")
+    ok = all(results.values())
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
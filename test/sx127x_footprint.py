@@ -0,0 +1,105 @@
+"""
+Import time and RAM footprint of library/sx127x.py on the simulated radio.
+
+Each measurement runs in a fresh interpreter: compile time of the source,
+import time of the precompiled module (the .mpy / frozen case on the
+device), memory allocated by the import (tracemalloc), memory allocated by
+one LoRa instance including its attributes, and the time of a register-heavy call
+(``set_mode_standby`` + ``get_rssi``) that reads the driver constants.
+With ``--baseline <git rev>`` the same numbers are measured for the
+sx127x.py of that revision, for a before/after comparison.
+
+Run from the repository root:
+    python test/sx127x_footprint.py
+    python test/sx127x_footprint.py --baseline HEAD~1 --runs 10
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import tempfile
+
+CHILD = r"""
+import sys, time, tracemalloc
+sys.path.insert(0, sys.argv[1])
+sys.path.append('./src')
+import sx127x_sim
+sx127x_sim.install()
+from machine import SoftSPI, Pin
+
+with open(sys.argv[1] + "/sx127x.py") as f:
+    source = f.read()
+t0 = time.perf_counter()
+compile(source, "sx127x.py", "exec")
+compile_ms = (time.perf_counter() - t0) * 1000
+
+tracemalloc.start()
+t0 = time.perf_counter()
+import sx127x
+import_ms = (time.perf_counter() - t0) * 1000
+import_bytes = tracemalloc.get_traced_memory()[0]
+
+spi = SoftSPI(baudrate=3000000, sck=Pin(5), mosi=Pin(27), miso=Pin(19))
+sx127x_sim.SimRadio(spi, cs=18, reset=14, dio0=26)
+before = tracemalloc.get_traced_memory()[0]
+lora = sx127x.LoRa(spi, cs_pin=18, reset_pin=14, dio0_pin=26)
+instance_bytes = tracemalloc.get_traced_memory()[0] - before
+tracemalloc.stop()
+
+attrs = getattr(lora, "__dict__", None)
+attr_bytes = sys.getsizeof(attrs) if attrs is not None else 0
+
+n = 2000
+t0 = time.perf_counter()
+for _ in range(n):
+    lora.set_mode_standby()
+    lora.get_rssi()
+call_us = (time.perf_counter() - t0) / n * 1e6
+
+print(repr({"compile_ms": compile_ms, "import_ms": import_ms, "import_bytes": import_bytes,
+            "instance_bytes": instance_bytes, "attr_dict_bytes": attr_bytes,
+            "call_us": call_us}))
+"""
+
+
+def measure(library_dir, runs):
+    # Bytecode is written even with PYTHONDONTWRITEBYTECODE set
+    subprocess.run([sys.executable, "-m", "compileall", "-q", os.path.join(library_dir, "sx127x.py")],
+                   check=True)
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", CHILD, library_dir],
+                             capture_output=True, text=True, check=True).stdout
+        results.append(ast.literal_eval(out.strip().splitlines()[-1]))
+    # Median of every metric
+    return {k: sorted(r[k] for r in results)[len(results) // 2] for k in results[0]}
+
+
+def report(label, m):
+    print("%-8s compilar %5.2f ms  import %5.2f ms %7d B  instancia %5d B (dict %5d B)  llamada %5.1f us" % (
+        label, m["compile_ms"], m["import_ms"], m["import_bytes"], m["instance_bytes"],
+        m["attr_dict_bytes"], m["call_us"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--baseline', help="revision git a comparar (p. ej. HEAD~1)")
+    args = parser.parse_args()
+
+    current = measure(os.path.abspath("library"), args.runs)
+    if args.baseline:
+        source = subprocess.run(["git", "show", "%s:library/sx127x.py" % args.baseline],
+                                capture_output=True, text=True, check=True).stdout
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "sx127x.py"), "w") as f:
+                f.write(source)
+            base = measure(tmp, args.runs)
+        report(args.baseline, base)
+    report("actual", current)
+
+
+if __name__ == "__main__":
+    main()